@@ -0,0 +1,34 @@
+import os
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date
+
+import polars as pl
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def business_days(start: date, end: date = date(2024, 12, 31)) -> pl.Series:
+    days = pl.date_range(start, end, "1d", eager=True)
+    return days.filter(days.dt.weekday() < 6)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def timed(label: str):
+    start = time.perf_counter()
+    yield
+    print(f"{label}: {time.perf_counter() - start:.2f}s")
+
+
+def run_variants(module: str, variants: list[str], *args: str) -> None:
+    """Run each variant in its own interpreter, so peak RSS is measured per variant."""
+    for variant in variants:
+        subprocess.run([sys.executable, "-m", module, variant, *args], cwd=REPO_ROOT, check=True)
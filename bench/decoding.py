@@ -0,0 +1,69 @@
+"""Decoding a historical-price-full payload: the old json + float loop path against decode_records.
+
+    python -m bench.decoding [rows] [runs]
+"""
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import polars as pl
+
+from data.models.decoding import PRICES_SCHEMA, decode_records
+
+FLOAT_FIELDS_PRICES = ["OPEN", "HIGH", "LOW", "CLOSE", "adjClose"]  # As it was in constants.py
+
+
+def make_payload(rows: int) -> bytes:
+    random.seed(0)
+    records = [
+        {
+            "date": (date(2000, 1, 3) + timedelta(i)).isoformat(),
+            "open": 100 + random.random(),
+            "high": 101.5,
+            "low": 99,
+            "close": 100.25,
+            "adjClose": 98.1 + random.random(),
+            "volume": 12345678,
+            "unadjustedVolume": 12345678,
+            "change": 0.1,
+            "changePercent": 0.12,
+            "vwap": 100.1,
+            "label": "January 03, 00",
+            "changeOverTime": 0.0012,
+        }
+        for i in range(rows)
+    ]
+    return json.dumps({"symbol": "AAPL", "historical": records}).encode()
+
+
+def old_process_raw_prices(raw: bytes) -> pl.DataFrame:
+    # PriceDataHandler.process_raw_prices before decode_records, fed the parsed dict
+    data = json.loads(raw)
+    for record in data.get("historical", []):
+        for field in FLOAT_FIELDS_PRICES:
+            record[field] = float(record.get(field, 0))
+    df = pl.DataFrame(data["historical"])
+    return df.with_columns(pl.col("date").str.strptime(pl.Datetime))
+
+
+def new_process_raw_prices(raw: bytes) -> pl.DataFrame:
+    df = decode_records(raw, PRICES_SCHEMA, record_key="historical")
+    return df.with_columns(pl.col("date").str.strptime(pl.Date, "%Y-%m-%d"))
+
+
+def mean_ms(func, raw: bytes, runs: int) -> float:
+    func(raw)  # Warm up
+    start = time.perf_counter()
+    for _ in range(runs):
+        func(raw)
+    return (time.perf_counter() - start) / runs * 1000
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 6500
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    raw = make_payload(rows)
+    for func in (old_process_raw_prices, new_process_raw_prices):
+        print(f"{func.__name__}: {mean_ms(func, raw, runs):.1f} ms, mean of {runs} runs over {rows} rows")
@@ -0,0 +1,48 @@
+"""get_field's old chained full joins against build_field_panel's single pivot.
+
+    python -m bench.field_panel [symbol counts...]
+
+Each symbol gets a random start date between 2000 and 2012, running to 2024, and both outputs are checked equal.
+The join loop grows quadratically with the symbol count, so 5000 takes minutes.
+"""
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import polars as pl
+
+from bench.common import business_days
+from data.utils import build_field_panel
+
+
+def old_get_field(frames: list[tuple[str, pl.DataFrame]], field: str) -> pl.DataFrame:
+    # GenericDataHandler.get_field before build_field_panel
+    merged = frames[0][1].rename({field: frames[0][0]})
+    for symbol, frame in frames[1:]:
+        merged = merged.join(frame.rename({field: symbol}), how="full", on="date", coalesce=True)
+    return merged.unique(keep="first", subset="date").sort("date")
+
+
+def make_frames(symbols: int, rng: np.random.Generator) -> list[tuple[str, pl.DataFrame]]:
+    dates = business_days(date(2000, 1, 1))
+    frames = []
+    for i in range(symbols):
+        symbol_dates = dates[rng.integers(0, len(dates) // 2):]
+        frames.append((f"S{i:05d}", pl.DataFrame({"date": symbol_dates, "adjClose": rng.random(len(symbol_dates))})))
+    return frames
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    for symbols in map(int, sys.argv[1:] or ["500"]):
+        frames = make_frames(symbols, rng)
+        start = time.perf_counter()
+        new = build_field_panel(frames, "adjClose")
+        new_time = time.perf_counter() - start
+        start = time.perf_counter()
+        old = old_get_field(frames, "adjClose")
+        old_time = time.perf_counter() - start
+
+        assert new.equals(old.select(new.columns)), "build_field_panel doesn't match the join loop"
+        print(f"{symbols} symbols, {new.shape}: old {old_time:.2f}s, new {new_time:.2f}s ({old_time / new_time:.1f}x)")
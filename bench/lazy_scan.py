@@ -0,0 +1,116 @@
+"""Eager reads against DataStore.scan, building Torikano's long (date, symbol) frame from wide core_data frames.
+
+    python -m bench.lazy_scan [store_dir]
+
+Writes 5 wide frames (500 symbols, daily 1995-2024) into store_dir/core_data if they aren't there yet, then runs
+each variant in its own interpreter, so the peak RSS is per variant, and checks their outputs match:
+
+- eager: how build_required_data used to work, each frame read whole, melted, joined, then filtered by date.
+- lazy: the same plan over DataStore.scan, with the date filter pushed into the scans and one streaming collect.
+
+Both share TorikanoDataProcessor.sanitise_data_types from the current tree.
+"""
+import logging
+import os
+import sys
+import tempfile
+from datetime import date
+
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from bench.common import peak_rss_mb, run_variants, timed
+from data.models.general import DataStore
+from data.models.torikano import TorikanoDataProcessor
+
+VARIANTS = ("eager", "lazy")
+# core_data file -> the column it becomes, in the order build_required_data joined them onto ptb
+FRAMES = {
+    "ptb": "book_price",
+    "stp": "sales_price",
+    "cftp": "cf_price",
+    "marketcap": "market_cap",
+    "total_return": "asset_returns",
+}
+START_DATE = date(2015, 1, 1)
+
+
+def generate(store_dir: str) -> None:
+    core_data = os.path.join(store_dir, "core_data")
+    if all(os.path.exists(os.path.join(core_data, f"{name}.parquet")) for name in FRAMES):
+        return
+    os.makedirs(core_data, exist_ok=True)
+    dates = pl.date_range(date(1995, 1, 1), date(2024, 1, 1), "1d", eager=True)
+    rng = np.random.default_rng(0)
+    symbols = [f"S{i:03d}" for i in range(500)]
+    for name in FRAMES:
+        frame = pl.DataFrame({"date": dates, **{symbol: rng.standard_normal(len(dates)) for symbol in symbols}})
+        frame.write_parquet(os.path.join(core_data, f"{name}.parquet"))
+
+
+def _sanitise(processor: TorikanoDataProcessor, frame: pl.LazyFrame) -> pl.LazyFrame:
+    return processor.sanitise_data_types(
+        frame,
+        features=tuple(FRAMES.values()),
+        sort_col="date",
+        over_col="symbol",
+        fill_cols=("book_price", "sales_price", "cf_price", "market_cap"),
+    )
+
+
+def _join(melted: list) -> pl.DataFrame | pl.LazyFrame:
+    combined = melted[0]
+    for frame in melted[1:]:
+        combined = combined.join(frame, on=["date", "symbol"], how="left")
+    return combined
+
+
+def build_eager(data_store: DataStore) -> pl.DataFrame:
+    # build_required_data before DataStore.scan: every frame read whole and melted before the date filter
+    melted = [
+        data_store.read_parquet("core_data", f"{name}.parquet").unpivot(
+            index="date", variable_name="symbol", value_name=column
+        )
+        for name, column in FRAMES.items()
+    ]
+    combined = _join(melted).filter(pl.col("date") >= START_DATE)
+    return _sanitise(TorikanoDataProcessor(data_store), combined).collect()
+
+
+def build_lazy(data_store: DataStore) -> pl.DataFrame:
+    melted = [
+        data_store.scan("core_data", f"{name}.parquet")
+        .filter(pl.col("date") >= START_DATE)
+        .unpivot(index="date", variable_name="symbol", value_name=column)
+        for name, column in FRAMES.items()
+    ]
+    return _sanitise(TorikanoDataProcessor(data_store), _join(melted)).collect(streaming=True)
+
+
+def run(variant: str, store_dir: str) -> None:
+    data_store = DataStore(base_location=store_dir, universe_provider=lambda: [])
+    build = build_eager if variant == "eager" else build_lazy
+    with timed(variant):
+        out = build(data_store)
+    print(f"{variant}: {out.shape}, peak RSS {peak_rss_mb():.0f} MB")
+    out.write_parquet(os.path.join(store_dir, f"{variant}.parquet"))
+
+
+def compare(store_dir: str) -> None:
+    eager, lazy = (
+        pl.read_parquet(os.path.join(store_dir, f"{variant}.parquet")).sort(["date", "symbol"]) for variant in VARIANTS
+    )
+    assert_frame_equal(lazy, eager)
+    print("Outputs identical")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] in VARIANTS:
+        run(sys.argv[1], sys.argv[2])
+    else:
+        store_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.gettempdir(), "bench_lazy_scan")
+        generate(store_dir)
+        run_variants("bench.lazy_scan", list(VARIANTS), store_dir)
+        compare(store_dir)
@@ -0,0 +1,67 @@
+"""Throughput of DataGatherer's shared token bucket against a local fake FMP server.
+
+    python -m bench.rate_limiter [requests] [rate_limit]
+
+Runs the requests twice at rate_limit requests per minute, once clean and once with three 429s
+(Retry-After 2s) partway through. The clean run should take (requests - rate_limit/60) / (rate_limit/60)
+seconds once the first second's burst is spent, the throttled one that plus one pause per 429.
+"""
+import asyncio
+import logging
+import sys
+import time
+
+import aiohttp
+import polars as pl
+from aiohttp import web
+
+from data.models.general import DataGatherer
+
+HOST, PORT = "127.0.0.1", 8765
+RETRY_AFTER = 2
+
+
+async def run(requests: int, rate_limit: int, throttled_hits: tuple[int, ...]) -> None:
+    hits = []
+
+    async def handler(request):
+        hits.append(time.monotonic())
+        if len(hits) in throttled_hits:
+            return web.Response(status=429, headers={"Retry-After": str(RETRY_AFTER)})
+        return web.json_response([{"symbol": request.match_info["symbol"]}])
+
+    app = web.Application()
+    app.router.add_get("/{symbol}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+
+    try:
+        # The re-queued request takes the next slot, so one symbol eats every 429, give it room to succeed
+        gatherer = DataGatherer(
+            "unused", [f"S{i}" for i in range(requests)], rate_limit=rate_limit, data_handler=None,
+            max_retries=len(throttled_hits) + 1,
+        )
+        start = time.monotonic()
+        async with aiohttp.ClientSession() as session:
+            results = await asyncio.gather(*[
+                gatherer._fetch_data(session, symbol, f"http://{HOST}:{PORT}/{symbol}", pl.DataFrame)
+                for symbol in gatherer.symbols
+            ])
+        elapsed = time.monotonic() - start
+    finally:
+        await runner.cleanup()
+
+    failed = sum(frame is None for _, frame in results)
+    print(
+        f"{len(throttled_hits)} x 429: {len(hits)} requests in {elapsed:.2f}s, "
+        f"{len(hits) / elapsed:.1f} req/s (budget {rate_limit / 60:.0f} req/s), {failed} failed"
+    )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rate_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 1200
+    asyncio.run(run(requests, rate_limit, ()))
+    asyncio.run(run(requests, rate_limit, (30, 31, 32)))
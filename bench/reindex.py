@@ -0,0 +1,114 @@
+"""_reindex_dataframes_to_base before (pandas reindex_like) and after (lazy Polars joins), on a synthetic full set.
+
+    python -m bench.reindex [store_dir]
+
+The base frame has 500 symbols from 2000, prices/total_return/marketcap 510 symbols from 1990 and the five financial
+fields 480 symbols from 2009, with 5% NaNs. Each version runs in its own interpreter so the peak RSS growth is its
+own, writes its outputs, and the outputs are compared at the end. The pandas version is a copy of the old code.
+"""
+import logging
+import os
+import sys
+import tempfile
+import warnings
+from datetime import date
+
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from bench.common import business_days, peak_rss_mb, run_variants, timed
+from data.models.general import DataStore
+
+VARIANTS = ("pandas", "polars")
+MARKET_FRAMES = ("prices", "total_return", "marketcap")
+FINANCIAL_FRAMES = ("Revenue_1", "Revenue_2", "ShareholdersEquity", "OperatingCashFlow", "DilutedNOS")
+
+
+def _wide(rng: np.random.Generator, dates: pl.Series, symbols: list[str], nan_fraction: float) -> pl.DataFrame:
+    columns = {}
+    for symbol in symbols:
+        values = rng.random(len(dates))
+        values[rng.random(len(dates)) < nan_fraction] = np.nan
+        columns[symbol] = values
+    return pl.DataFrame({"date": dates, **columns})
+
+
+def generate(store_dir: str) -> None:
+    inputs = os.path.join(store_dir, "inputs")
+    if os.path.isdir(inputs):
+        return
+    os.makedirs(inputs)
+    rng = np.random.default_rng(0)
+    symbols = [f"S{i:03d}" for i in range(520)]
+    data_store = DataStore(base_location=store_dir, universe_provider=lambda: [])
+    data_store.write_parquet(_wide(rng, business_days(date(2000, 1, 3)), symbols[:500], 0.0), "core_data",
+                             "base_frame.parquet")
+    for name in MARKET_FRAMES:
+        _wide(rng, business_days(date(1990, 1, 1)), symbols[:510], 0.05).write_parquet(f"{inputs}/{name}.parquet")
+    for name in FINANCIAL_FRAMES:
+        _wide(rng, business_days(date(2009, 1, 2)), symbols[20:500], 0.05).write_parquet(f"{inputs}/{name}.parquet")
+
+
+def find_common_dates_and_columns(dataframes) -> tuple[list, list[str]]:
+    # FinancialDataProcessor._find_common_dates_and_columns, standardise_data ran it before reindexing
+    all_dates = []
+    all_columns = []
+    for df in dataframes:
+        all_dates.extend(df.with_columns(pl.col("date").dt.date().alias("date"))["date"].to_list())
+        all_columns.extend(df.columns)
+    return sorted(set(all_dates)), sorted(set(x for x in all_columns if x != "date"))
+
+
+def pandas_reindex_dataframes_to_base(data_store: DataStore, dataframes_dict) -> dict[str, pl.DataFrame]:
+    # FinancialDataProcessor._reindex_dataframes_to_base before it moved onto Polars joins
+    base_frame = data_store.read_parquet("core_data", "base_frame.parquet").to_pandas().set_index("date")
+    reindexed_frames = {}
+    for dataframe_name, dataframe in dataframes_dict.items():
+        pandas_df = dataframe.to_pandas().set_index("date")
+        reindexed_frames[dataframe_name] = pl.from_pandas(pandas_df.reindex_like(base_frame).reset_index())
+    return reindexed_frames
+
+
+def run(variant: str, store_dir: str) -> None:
+    data_store = DataStore(base_location=store_dir, universe_provider=lambda: [])
+    frames = {
+        name: pl.read_parquet(os.path.join(store_dir, "inputs", f"{name}.parquet"))
+        for name in MARKET_FRAMES + FINANCIAL_FRAMES
+    }
+    rss_before = peak_rss_mb()
+    if variant == "pandas":
+        with timed(variant):
+            find_common_dates_and_columns(frames.values())
+            out = pandas_reindex_dataframes_to_base(data_store, frames)
+    else:
+        from data.models.processed_financials import FinancialDataProcessor
+        with timed(variant):
+            out = FinancialDataProcessor(data_store)._reindex_dataframes_to_base(frames)
+    print(f"{variant}: peak RSS +{peak_rss_mb() - rss_before:.0f} MB")
+
+    out_dir = os.path.join(store_dir, variant)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, frame in out.items():
+        frame.with_columns(pl.col("date").cast(pl.Date)).write_parquet(os.path.join(out_dir, f"{name}.parquet"))
+
+
+def compare(store_dir: str) -> None:
+    for name in MARKET_FRAMES + FINANCIAL_FRAMES:
+        expected, actual = (
+            pl.read_parquet(os.path.join(store_dir, variant, f"{name}.parquet")) for variant in VARIANTS
+        )
+        assert_frame_equal(actual, expected)
+    print(f"All {len(MARKET_FRAMES + FINANCIAL_FRAMES)} outputs identical")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    warnings.filterwarnings("ignore")
+    if len(sys.argv) > 1 and sys.argv[1] in VARIANTS:
+        run(sys.argv[1], sys.argv[2])
+    else:
+        store_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.gettempdir(), "bench_reindex")
+        generate(store_dir)
+        run_variants("bench.reindex", list(VARIANTS), store_dir)
+        compare(store_dir)
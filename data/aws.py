@@ -1,18 +1,34 @@
+import io
 import pandas as pd
-import boto3
 import os
-from _secrets import AWP_ACCESS_KEY, AWP_SECRET_KEY
+from data.storage import S3Storage
+
 
 class AWSHandler:
     def __init__(self, aws_access_key_id, aws_secret_access_key, bucket_name, s3_directory):
-        self.s3_client = boto3.client(
-            's3',
+        # The boto3 client is only created on first use, nothing talks to AWS at construction
+        self.storage = S3Storage(
+            bucket_name,
             aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key
+            aws_secret_access_key=aws_secret_access_key,
         )
         self.bucket_name = bucket_name
         self.s3_directory = s3_directory
 
+    @classmethod
+    def from_secrets(cls, bucket_name="maybrick-capital-ldn", s3_directory="prices"):
+        """Build a handler from the keys in _secrets, only imported when actually asked for."""
+        from _secrets import AWP_ACCESS_KEY, AWP_SECRET_KEY
+
+        return cls(AWP_ACCESS_KEY, AWP_SECRET_KEY, bucket_name, s3_directory)
+
+    @property
+    def s3_client(self):
+        return self.storage.client
+
+    def _s3_key(self, s3_file_name):
+        return f"{self.s3_directory}/{s3_file_name}"
+
     def load_parquet(self, file_path):
         """Load a Parquet file from the local file system into a Pandas DataFrame."""
         try:
@@ -25,7 +41,7 @@ class AWSHandler:
 
     def save_parquet(self, file_path, s3_file_name=None):
         """
-        Upload a Parquet file to the specified S3 bucket.
+        Upload a Parquet file to the specified S3 bucket, multipart and in parallel for big files.
         Optionally provide a custom S3 file name, otherwise the local file name is used.
         """
         try:
@@ -33,33 +49,24 @@ class AWSHandler:
             if not s3_file_name:
                 s3_file_name = os.path.basename(file_path)
 
-            s3_path = os.path.join(self.s3_directory, s3_file_name)
+            s3_path = self._s3_key(s3_file_name)
 
             # Upload the file to S3
-            self.s3_client.upload_file(file_path, self.bucket_name, s3_path)
+            self.s3_client.upload_file(file_path, self.bucket_name, s3_path, Config=self.storage.transfer_config)
             print(f"Uploaded {file_path} to s3://{self.bucket_name}/{s3_path}")
         except Exception as e:
             print(f"Failed to upload file: {file_path} to S3. Error: {e}")
 
     def save_dataframe_to_parquet(self, df, s3_file_name):
-        """Save a Pandas DataFrame as a Parquet file and upload it to S3."""
+        """Serialise a Pandas DataFrame to Parquet in memory and upload it to S3, no temp file involved."""
         try:
-            # Create a temporary file for the DataFrame
-            temp_file_path = f"/tmp/{s3_file_name}"
-            df.to_parquet(temp_file_path)
-
-            # Upload the parquet file to S3
-            self.save_parquet(temp_file_path, s3_file_name)
-
-            # Optionally, delete the local temp file after upload (if necessary)
-            os.remove(temp_file_path)
-            print(f"Temporary file {temp_file_path} deleted.")
+            buffer = io.BytesIO()
+            df.to_parquet(buffer)
+            self.storage.write_bytes(self._s3_key(s3_file_name), buffer.getbuffer())
+            print(f"Uploaded DataFrame to s3://{self.bucket_name}/{self._s3_key(s3_file_name)}")
         except Exception as e:
             print(f"Failed to save DataFrame to Parquet and upload to S3. Error: {e}")
 
-# Initialize the AWSHandler
-aws_handler = AWSHandler(
-    aws_access_key_id=AWP_ACCESS_KEY,
-    aws_secret_access_key=AWP_SECRET_KEY,
-bucket_name="maybrick-capital-ldn",
-s3_directory="prices")
+    def sync_directory(self, local_store, max_workers=8):
+        """Push every parquet file under local_store/<s3_directory> whose contents differ from what's in S3."""
+        return self.storage.sync_from_local(local_store, prefix=self.s3_directory, max_workers=max_workers)
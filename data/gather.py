@@ -1,5 +1,10 @@
+import asyncio
+import logging
 import click
+import polars as pl
 from data.models.general import DataGatherer, DataStore
+from data.models.response_cache import ResponseCache
+from data.models.journal import GatherJournal
 from _secrets import FMP_API_KEY
 from data.models.prices import PricesDataHandler
 from data.models.profile import ProfileDataHandler
@@ -8,37 +13,71 @@ from data.models.market_cap import MarketCapDataHandler
 from datetime import datetime as dt
 
 
+ENDPOINTS = ['prices', 'profiles', 'marketcap', 'financials']
+
+
+async def refresh_endpoints(data_gatherer, handlers, full):
+    """Run every endpoint's refresh in one event loop over one shared session and rate budget."""
+    refreshes = {
+        'prices': lambda h: h.gather_and_store_data(h.build_url, h.process_raw_prices, incremental=not full),
+        'profiles': lambda h: h.gather_and_store_data(h.build_url, h.process_response),
+        'marketcap': lambda h: h.backfill_market_caps(),
+        'financials': lambda h: h.gather_and_store_data(),
+    }
+    names = list(handlers)
+    async with data_gatherer.session():
+        results = await asyncio.gather(*[refreshes[name](handlers[name]) for name in names],
+                                       return_exceptions=True)
+
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            logging.error(f"Refresh of {name} failed: {result!r}")
+
+
 @click.command()
 @click.option('--no-refresh', is_flag=False, default=False, help='Skip data refresh and processing.')
 @click.option('--fields', multiple=True, default=['adjClose', 'volume'],
               help='Fields to process (can specify multiple fields).')
 @click.option('--engine', default='polars', help='Engine to use for reading/writing data (polars or pandas).')
 @click.option('--folder', default='local_store', help='Folder where data files are stored.')
-def refresh_data(fields, engine, folder, no_refresh):
+@click.option('--full', is_flag=True, default=False, help='Re-download full history instead of appending new rows.')
+@click.option('--chunk-days', default=500, help='Days of history per market cap request.')
+@click.option('--no-cache', is_flag=True, default=False, help='Always hit the API, ignoring cached responses.')
+@click.option('--offline', is_flag=True, default=False, help='Replay cached responses only, never touch the network.')
+@click.option('--resume', is_flag=True, default=False, help='Continue the last run, skipping units it already finished.')
+@click.option('--endpoints', multiple=True, type=click.Choice(ENDPOINTS), default=ENDPOINTS,
+              help='Endpoints to refresh (can specify multiple), they all run concurrently.')
+def refresh_data(fields, engine, folder, no_refresh, full, chunk_days, no_cache, offline, resume, endpoints):
     # Initialize DataHandler and DataStore
 
-    # TODO: Now we have dt metadata, load data, check if more than 1 day then only refresh whats needed -have override too for refresh all
-
     data_store = DataStore(base_location='data/local_store', engine="polars")
-    data_gatherer = DataGatherer(api_key=FMP_API_KEY, symbols=data_store.symbols, rate_limit=275,
-                                 data_handler=data_store, max_retries=3)
+    response_cache = None if no_cache else ResponseCache(offline=offline)
+    data_gatherer = DataGatherer(api_key=FMP_API_KEY, symbols=None, rate_limit=275,
+                                 data_handler=data_store, max_retries=3, response_cache=response_cache,
+                                 journal=GatherJournal(resume=resume))
 
     prices_data_handler = PricesDataHandler(data_gatherer, data_store, interval="historical-price-full",
                                             sub_directory="prices")
     market_cap_data_handler = MarketCapDataHandler(data_gatherer, data_store, start_date=dt(1990, 1, 1),
                                                    interval="historical-market-capitalization",
-                                                   sub_directory="marketcap_v2")
+                                                   sub_directory="marketcap_v2", chunk_days=chunk_days)
 
     profiles_data_handler = ProfileDataHandler(data_gatherer, data_store)
     financial_statements_data_handler = FinancialStatementsDataHandler(data_gatherer, data_store,
                                                                        periods=['annual', 'quarter'])
 
+    handlers = {
+        'prices': prices_data_handler,
+        'profiles': profiles_data_handler,
+        'marketcap': market_cap_data_handler,
+        'financials': financial_statements_data_handler,
+    }
+
     if not no_refresh:
-        click.echo(f"Refreshing Data")
-        prices_data_handler.update_data(prices_data_handler.build_url, prices_data_handler.process_raw_prices)
-        # profiles_data_handler.update_data()
-        # financial_statements_data_handler.update_data()
-        # market_cap_data_handler.synchronously_backfill_market_caps()
+        click.echo(f"Refreshing Data: {', '.join(endpoints)}")
+        # Categorical symbols of the frames merged on save need to share one string cache
+        with pl.StringCache():
+            asyncio.run(refresh_endpoints(data_gatherer, {e: handlers[e] for e in endpoints}, full))
 
 
 if __name__ == '__main__':
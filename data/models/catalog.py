@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime as dt
+from typing import List, Optional
+
+import pyarrow.parquet as pq
+
+CATALOG_FILENAME = "catalog.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    symbol TEXT,
+    rows INTEGER NOT NULL,
+    min_date TEXT,
+    max_date TEXT,
+    schema_hash TEXT NOT NULL,
+    received_dt TEXT,
+    checksum TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    metadata TEXT NOT NULL,
+    written_dt TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_endpoint_symbol ON files (endpoint, symbol);
+CREATE INDEX IF NOT EXISTS files_dates ON files (min_date, max_date);
+CREATE INDEX IF NOT EXISTS files_received ON files (endpoint, received_dt);
+"""
+
+
+def _to_iso_date(value) -> Optional[str]:
+    # Dates come through as strings, dates or datetimes depending on the endpoint, keep the day only
+    return None if value is None else str(value)[:10]
+
+
+def _file_checksum(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StoreCatalog:
+    """SQLite index of every parquet file in the store: what it holds, what dates it covers and when it was fetched.
+
+    Answers staleness and coverage questions with one indexed query instead of opening every file's footer.
+    Paths are relative to the store folder. The database is only created on the first write, so a store that's
+    just read from never gets one, queries against a missing catalog come back empty.
+    """
+
+    def __init__(self, folder_path: str, filename: str = CATALOG_FILENAME):
+        self.folder_path = folder_path
+        self.path = os.path.join(folder_path, filename)
+        self._lock = threading.Lock()
+        self._created = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _connect_for_write(self) -> sqlite3.Connection:
+        """Connection to write with, creating the database and its tables first if need be. Call holding _lock."""
+        if not self._created:
+            os.makedirs(self.folder_path, exist_ok=True)
+            with closing(self._connect()) as conn, conn:
+                # WAL lets research processes read while a pipeline run is writing
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+            self._created = True
+        return self._connect()
+
+    def _relative(self, filepath: str) -> str:
+        return os.path.relpath(filepath, self.folder_path).replace(os.sep, "/")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[dict]:
+        if not self._created and not os.path.exists(self.path):
+            return []
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def record(
+        self,
+        filepath: str,
+        endpoint: str,
+        rows: int,
+        schema: str,
+        metadata: Optional[dict] = None,
+        min_date=None,
+        max_date=None,
+    ) -> None:
+        """Upsert the entry for a file that has just been written."""
+        metadata = metadata or {}
+        stat = os.stat(filepath)
+        entry = (
+            self._relative(filepath),
+            endpoint,
+            metadata.get("symbol"),
+            rows,
+            _to_iso_date(min_date),
+            _to_iso_date(max_date),
+            hashlib.sha256(schema.encode()).hexdigest(),
+            metadata.get("recieved_dt"),
+            _file_checksum(filepath),
+            stat.st_size,
+            stat.st_mtime_ns,
+            json.dumps(metadata),
+            dt.now().strftime("%Y-%m-%d %H:%M:%S"),
+        )
+        with self._lock, closing(self._connect_for_write()) as conn, conn:
+            conn.execute(f"INSERT OR REPLACE INTO files VALUES ({', '.join('?' * len(entry))})", entry)
+
+    def record_existing(self, filepath: str, endpoint: str) -> None:
+        """Catalog a file from its footer alone, date range comes from row group statistics where they exist."""
+        parquet_file = pq.ParquetFile(filepath)
+        file_metadata = parquet_file.metadata
+        metadata = {k.decode(): v.decode() for k, v in (file_metadata.metadata or {}).items()}
+        metadata.pop("ARROW:schema", None)
+
+        min_date = max_date = None
+        if "date" in parquet_file.schema_arrow.names:
+            column_index = parquet_file.schema_arrow.get_field_index("date")
+            statistics = [
+                file_metadata.row_group(i).column(column_index).statistics for i in range(file_metadata.num_row_groups)
+            ]
+            if statistics and all(s is not None and s.has_min_max for s in statistics):
+                min_date, max_date = min(s.min for s in statistics), max(s.max for s in statistics)
+            else:
+                dates = parquet_file.read(columns=["date"]).column("date")
+                if len(dates):
+                    min_date, max_date = min(dates.to_pylist()), max(dates.to_pylist())
+
+        self.record(
+            filepath,
+            endpoint,
+            file_metadata.num_rows,
+            str(parquet_file.schema_arrow.remove_metadata()),
+            metadata,
+            min_date,
+            max_date,
+        )
+
+    def rebuild(self) -> int:
+        """Re-catalog every parquet file in the store, for stores written before the catalog existed."""
+        count = 0
+        with self._lock, closing(self._connect_for_write()) as conn, conn:
+            conn.execute("DELETE FROM files")
+        for root, _, names in os.walk(self.folder_path):
+            for name in names:
+                if not name.endswith(".parquet"):
+                    continue
+                filepath = os.path.join(root, name)
+                # Hive partitions (year=2020) belong to the dataset above them
+                endpoint = "/".join(
+                    part for part in os.path.dirname(self._relative(filepath)).split("/") if "=" not in part
+                )
+                try:
+                    self.record_existing(filepath, endpoint)
+                    count += 1
+                except Exception as e:
+                    logging.error(f"Failed to catalog {filepath}: {e}")
+        logging.info(f"Catalogued {count} files in {self.folder_path}")
+        return count
+
+    def remove(self, filepath: str) -> None:
+        with self._lock, closing(self._connect_for_write()) as conn, conn:
+            conn.execute("DELETE FROM files WHERE path = ?", (self._relative(filepath),))
+
+    def get(self, filepath: str, validate: bool = True) -> Optional[dict]:
+        """Entry for a file, or None if it's missing or (when validating) the file changed behind our back."""
+        rows = self._query("SELECT * FROM files WHERE path = ?", (self._relative(filepath),))
+        if not rows:
+            return None
+        entry = rows[0]
+        if validate:
+            try:
+                stat = os.stat(filepath)
+            except FileNotFoundError:
+                return None
+            if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+                return None
+        entry["metadata"] = json.loads(entry["metadata"])
+        return entry
+
+    def files(self, endpoint: Optional[str] = None, symbol: Optional[str] = None) -> List[dict]:
+        sql, params = "SELECT * FROM files WHERE 1=1", []
+        if endpoint is not None:
+            sql += " AND endpoint = ?"
+            params.append(endpoint)
+        if symbol is not None:
+            sql += " AND symbol = ?"
+            params.append(symbol)
+        return self._query(sql + " ORDER BY path", tuple(params))
+
+    def stale(self, endpoint: str, older_than: dt) -> List[dict]:
+        """Files for an endpoint whose data was received before older_than, or never stamped at all."""
+        return self._query(
+            "SELECT * FROM files WHERE endpoint = ? AND (received_dt IS NULL OR received_dt < ?) ORDER BY path",
+            (endpoint, older_than.strftime("%Y-%m-%d %H:%M:%S")),
+        )
+
+    def covering(self, date, endpoint: Optional[str] = None) -> List[dict]:
+        """Files whose date range includes date."""
+        sql, params = "SELECT * FROM files WHERE min_date <= ? AND max_date >= ?", [_to_iso_date(date)] * 2
+        if endpoint is not None:
+            sql += " AND endpoint = ?"
+            params.append(endpoint)
+        return self._query(sql + " ORDER BY path", tuple(params))
+
+    def coverage(self, endpoint: str) -> dict:
+        """symbol -> (min_date, max_date) for every file of an endpoint, e.g. to plan an incremental refresh."""
+        rows = self._query(
+            "SELECT symbol, min_date, max_date FROM files WHERE endpoint = ? AND symbol IS NOT NULL", (endpoint,)
+        )
+        return {row["symbol"]: (row["min_date"], row["max_date"]) for row in rows}
@@ -0,0 +1,121 @@
+import json
+import logging
+from typing import Optional
+
+import polars as pl
+
+# Declared schemas for the FMP endpoints we pull, so responses decode straight into typed columns
+PRICES_SCHEMA = {
+    "date": pl.String,
+    "open": pl.Float64,
+    "high": pl.Float64,
+    "low": pl.Float64,
+    "close": pl.Float64,
+    "adjClose": pl.Float64,
+    "volume": pl.Float64,
+    "unadjustedVolume": pl.Float64,
+    "change": pl.Float64,
+    "changePercent": pl.Float64,
+    "vwap": pl.Float64,
+    "label": pl.String,
+    "changeOverTime": pl.Float64,
+}
+
+MARKET_CAP_SCHEMA = {
+    "symbol": pl.String,
+    "date": pl.String,
+    "marketCap": pl.Float64,
+}
+
+PROFILE_SCHEMA = {
+    "symbol": pl.String,
+    "price": pl.Float64,
+    "beta": pl.Float64,
+    "volAvg": pl.Float64,
+    "mktCap": pl.Float64,
+    "lastDiv": pl.Float64,
+    "range": pl.String,
+    "changes": pl.Float64,
+    "companyName": pl.String,
+    "currency": pl.String,
+    "cik": pl.String,
+    "isin": pl.String,
+    "cusip": pl.String,
+    "exchange": pl.String,
+    "exchangeShortName": pl.String,
+    "industry": pl.String,
+    "website": pl.String,
+    "description": pl.String,
+    "ceo": pl.String,
+    "sector": pl.String,
+    "country": pl.String,
+    "fullTimeEmployees": pl.String,
+    "phone": pl.String,
+    "address": pl.String,
+    "city": pl.String,
+    "state": pl.String,
+    "zip": pl.String,
+    "dcfDiff": pl.Float64,
+    "dcf": pl.Float64,
+    "image": pl.String,
+    "ipoDate": pl.String,
+    "defaultImage": pl.Boolean,
+    "isEtf": pl.Boolean,
+    "isActivelyTrading": pl.Boolean,
+    "isAdr": pl.Boolean,
+    "isFund": pl.Boolean,
+}
+
+SEC_FILINGS_SCHEMA = {
+    "symbol": pl.String,
+    "fillingDate": pl.String,
+    "acceptedDate": pl.String,
+    "cik": pl.String,
+    "type": pl.String,
+    "link": pl.String,
+    "finalLink": pl.String,
+}
+
+# As-reported statements carry hundreds of company specific fields, so only pin the keys we join on
+FINANCIAL_STATEMENTS_OVERRIDES = {
+    "date": pl.String,
+    "symbol": pl.String,
+    "period": pl.String,
+    "documenttype": pl.String,
+}
+
+
+def decode_records(
+    raw: bytes,
+    schema: Optional[dict] = None,
+    record_key: Optional[str] = None,
+    schema_overrides: Optional[dict] = None,
+) -> pl.DataFrame:
+    """Decode a JSON array of records (optionally nested under record_key) straight into a typed frame.
+
+    Parsing happens in Polars' native JSON reader, we only fall back to the stdlib parser for payloads it rejects.
+    """
+    if record_key is None and raw.lstrip()[:1] != b"[":
+        # FMP answers unknown symbols/errors with an object instead of a list
+        logging.warning(f"Expected a list of records, got: {raw[:200]!r}")
+        return pl.DataFrame(schema=schema)
+
+    try:
+        if record_key:
+            frame = pl.read_json(raw, schema={record_key: pl.List(pl.Struct(schema))})
+            frame = frame.explode(record_key).unnest(record_key)
+            # An empty or missing list explodes into a single all-null row
+            frame = frame.filter(~pl.all_horizontal(pl.all().is_null()))
+        else:
+            frame = pl.read_json(raw, schema=schema, infer_schema_length=None)
+    except pl.exceptions.PolarsError as e:
+        logging.warning(f"Native JSON decode failed, falling back to the slow path. Error: {e}")
+        data = json.loads(raw)
+        records = (data.get(record_key) or []) if record_key else data
+        frame = pl.DataFrame(records, schema=schema, strict=False, infer_schema_length=None)
+
+    if schema_overrides:
+        frame = frame.with_columns(
+            [pl.col(col).cast(dtype) for col, dtype in schema_overrides.items() if col in frame.columns]
+        )
+    return frame
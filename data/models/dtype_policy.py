@@ -0,0 +1,58 @@
+from typing import Optional, Sequence, Union
+
+import polars as pl
+
+# Frames of returns, where Float32's ~7 significant digits are plenty. The pipeline's store opts them in, ratios
+# now live as columns of the long panel rather than as frames of their own
+FLOAT32_FRAMES = ("total_return",)
+
+
+class DtypePolicy:
+    """How frames are typed in memory and on disk, applied by DataStore whenever it writes or reads.
+
+    Defaults: daily Datetime date columns become Date, symbol columns become Categorical, and parquet is zstd
+    compressed in row groups small enough for date pruning. Float32 is opt-in per frame via float32_frames.
+    Categorical symbols from different frames only join without remapping under a shared string cache, which the
+    CLI entry points hold open with pl.StringCache() for the run.
+    """
+
+    def __init__(
+        self,
+        daily_dates: bool = True,
+        symbol_dtype: Optional[pl.DataType] = pl.Categorical,
+        float32_frames: Sequence[str] = (),
+        compression: str = "zstd",
+        compression_level: Optional[int] = 3,  # None for codecs without levels, e.g. snappy
+        row_group_size: int = 4_096,  # ~16 years of daily rows, so wide frames still split into prunable groups
+    ):
+        self.daily_dates = daily_dates
+        self.symbol_dtype = symbol_dtype
+        self.float32_frames = set(float32_frames)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.row_group_size = row_group_size
+
+    def apply(self, df: Union[pl.DataFrame, pl.LazyFrame], name: Optional[str] = None) -> Union[pl.DataFrame, pl.LazyFrame]:
+        """Cast a frame (eager or lazy) to the policy, name is the frame's file stem e.g. "total_return"."""
+        schema = df.collect_schema()
+        casts = []
+        if self.daily_dates and isinstance(schema.get("date"), pl.Datetime):
+            casts.append(pl.col("date").cast(pl.Date))
+        if self.symbol_dtype is not None and schema.get("symbol") == pl.String:
+            casts.append(pl.col("symbol").cast(self.symbol_dtype))
+        if name in self.float32_frames:
+            casts.append(pl.col(pl.Float64).cast(pl.Float32))
+        return df.with_columns(casts) if casts else df
+
+    def signature(self) -> str:
+        """Identifies the settings, so derived copies (e.g. the IPC mirror) know to rebuild when they change."""
+        return (
+            f"{self.daily_dates}|{self.symbol_dtype}|{sorted(self.float32_frames)}|"
+            f"{self.compression}|{self.compression_level}|{self.row_group_size}"
+        )
+
+    def write_options(self) -> dict:
+        options = {"compression": self.compression}
+        if self.compression_level is not None:
+            options["compression_level"] = self.compression_level
+        return options
@@ -1,6 +1,9 @@
 import asyncio
 import polars as pl
 from collections import defaultdict
+from functools import partial
+from data.utils import build_field_panel
+from data.models.decoding import decode_records, FINANCIAL_STATEMENTS_OVERRIDES, SEC_FILINGS_SCHEMA
 
 
 class FinancialStatementsDataHandler():
@@ -32,34 +35,33 @@ class FinancialStatementsDataHandler():
         return self.build_financials_url(symbol, period)
 
     async def gather_and_store_data(self):
-        """Fetch data for all symbols and store it."""
-        # Fetch financial statements data
-        for period in self.periods:
-            # Use the build_url method instead of a lambda
-            await self.data_gatherer._fetch_all_data(
-                lambda symbol: self.build_financials_url(symbol, period),
+        """Fetch statements for every period and filings for every SEC type side by side, and store them."""
+        # partial rather than a lambda, the loop variable has to be bound now as these all run concurrently
+        fetches = [
+            self.data_gatherer._fetch_all_data(
+                partial(self.build_financials_url, period=period),
                 self._process_financial_data,
                 f"{self.sub_directory}/{period}",
             )
+            for period in self.periods
+        ] + [
+            self.data_gatherer._fetch_all_data(
+                partial(self.build_sec_url, sec_type=sec_type),
+                self._process_sec_data,
+                f"{self.sub_directory}/SEC/{sec_type}",
+            )
+            for sec_type in ["10-K", "10-Q"]
+        ]
+        async with self.data_gatherer.session():
+            await asyncio.gather(*fetches)
 
-        # Fetch SEC filings data
-        for sec_type in ["10-K", "10-Q"]:
-            for sec_type in ["10-K", "10-Q"]:
-                await self.data_gatherer._fetch_all_data(
-                    lambda symbol: self.build_sec_url(symbol, sec_type),
-                    self._process_sec_data,
-                    f"{self.sub_directory}/SEC/{sec_type}",
-                )
-
-    def _process_financial_data(self, data):
-        """Process the financial data into a DataFrame."""
-        df = pl.DataFrame(data)
-        return df
+    def _process_financial_data(self, raw):
+        """Decode the financial data into a DataFrame, fields vary by company so only the keys are pinned."""
+        return decode_records(raw, schema_overrides=FINANCIAL_STATEMENTS_OVERRIDES)
 
-    def _process_sec_data(self, data):
-        """Process the SEC filings data into a DataFrame."""
-        df = pl.DataFrame(data)
-        return df
+    def _process_sec_data(self, raw):
+        """Decode the SEC filings data into a DataFrame."""
+        return decode_records(raw, SEC_FILINGS_SCHEMA)
 
     def update_data(self):
         """Run the async gathering and storing process for all symbols."""
@@ -78,34 +80,22 @@ class FinancialStatementsDataHandler():
     def read_raw_data(self, symbol, period):
         """Load raw data for a specific symbol and period from the data store and cache it."""
         sub_directory = f"{self.sub_directory}/{symbol}/{period}"
-        all_data = self.data_store.real_all_in_directory(sub_directory)
-        self.data_cache[sub_directory] = all_data
-        return all_data
+        all_data = self.data_store.read_all_in_directory(sub_directory)
+        self.data_cache[sub_directory] = {name: frame_data["data"] for name, frame_data in all_data.items()}
+        return self.data_cache[sub_directory]
 
     def _get_list_of_field_frames(self, key, field):
-        """Fetch and process data for a specific field using cached data."""
+        """(symbol, frame) pairs holding date and a specific field, from the cached data."""
         if key not in self.data_cache:
             raise ValueError(f"No data available for key: {key}")
 
         all_frames = self.data_cache[key]
-        dfs = []
-
-        for frame_name, frame_data in all_frames.items():
-            symbol = frame_name.split("/")[2]
-            data = frame_data[["date", field]].rename({field: symbol})
-            dfs.append(data)
-
-        return dfs
+        return [
+            (frame_name.split("/")[2], frame_data.select(["date", field]))
+            for frame_name, frame_data in all_frames.items()
+        ]
 
     def get_field(self, symbol, field, period):
-        """Get a merged DataFrame of a specific field across all periods for a symbol."""
+        """Get a wide DataFrame of a specific field across all periods for a symbol, pivoted in one pass."""
         key = f"{self.sub_directory}/{symbol}/{period}"
-        list_of_frames = self._get_list_of_field_frames(key, field)
-        if not list_of_frames:
-            return pl.DataFrame()  # Return an empty DataFrame if no frames available
-
-        merged_df = list_of_frames[0]
-        for df in list_of_frames[1:]:
-            merged_df = merged_df.join(df, on="date", how="outer", coalesce=True)
-
-        return merged_df
+        return build_field_panel(self._get_list_of_field_frames(key, field), field)
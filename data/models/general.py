@@ -4,19 +4,39 @@ from pathlib import Path
 from typing import List, Callable, Union, Dict, Optional
 import pandas as pd
 import polars as pl
+import hashlib
 import logging
+import math
 import os
+import re
 from constants import ROOT_DIR
 from data.models.symbols import get_sp500_symbols
-from datetime import datetime as dt
+from data.models.rate_limiter import TokenBucketRateLimiter
+from data.models.response_cache import ResponseCache
+from data.models.journal import GatherJournal
+from data.models.catalog import StoreCatalog
+from data.models.read_cache import ReadCache
+from data.models.dtype_policy import DtypePolicy
+from data.storage import LocalStorage
+from data.models.parquet_pruning import prune_row_groups, column_chunk_ranges, comparable_bound
+from data.utils import build_field_panel, pivot_long_panel
+from datetime import datetime as dt, date, timedelta
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
 from typing import Union
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
+import pyarrow.feather as feather
 
 
 
 
+DATASET_DIRECTORY = "dataset"  # Long, year partitioned datasets live under here, one per endpoint
+MIRROR_DIRECTORY = "ipc_mirror"  # Uncompressed Arrow IPC copies of hot wide frames, opened memory mapped
+
 # Set up basic configuration for logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -24,40 +44,104 @@ logging.basicConfig(
 
 # TODO: This has become really messy from rushed incremental functionality, and needs refactoring
 class DataStore:
-    def __init__(self, base_location="data/local_store", engine="polars"):
+    def __init__(
+            self,
+            base_location="data/local_store",
+            engine="polars",
+            universe_provider: Callable = get_sp500_symbols,
+            catalog: bool = True,
+            read_cache_bytes: Optional[int] = None,
+            storage=None,
+            dtype_policy: Optional[DtypePolicy] = None,
+    ):
         self.base_location: Path = Path(base_location)
         self.engine: str = engine
         self.folder_path: str = os.path.join(ROOT_DIR, self.base_location)
         self.all_data: dict = {}
-        self.symbols: List[str] = get_sp500_symbols() # Fetch symbols during initialization # TODO: EXPOSE and CACHE This...
+        self.universe_provider = universe_provider
+        self._symbols: Optional[List[str]] = None
+        # Where the files actually live, local disk unless e.g. an S3Storage is passed in
+        self.storage = storage or LocalStorage(self.folder_path)
+        # Index of what every local file holds, kept up to date by write_parquet/write_dataset. Its database is
+        # only created on the first write, so read-only use never touches disk
+        self.catalog: Optional[StoreCatalog] = (
+            StoreCatalog(self.folder_path) if catalog and self.storage.is_local else None
+        )
+        # Compact dtypes and parquet settings applied on every write and read
+        self.dtype_policy: DtypePolicy = dtype_policy if dtype_policy is not None else DtypePolicy()
+        # Opt in, repeated reads of the same file within a process are then served from memory
+        self.read_cache: Optional[ReadCache] = ReadCache(read_cache_bytes) if read_cache_bytes else None
 
         # Log the initialization
-        logging.info(f"Initialized DataStore with base folder: {self.folder_path}")
+        logging.info(f"Initialized DataStore with base folder: {self.storage.uri('')}")
+
+    @property
+    def symbols(self) -> List[str]:
+        """Symbol universe, loaded on first access so read-only workflows never touch the network."""
+        if self._symbols is None:
+            self._symbols = self.universe_provider()
+        return self._symbols
+
+    @symbols.setter
+    def symbols(self, symbols: List[str]) -> None:
+        self._symbols = symbols
 
     def _get_full_path(self, sub_directory: str, filename: str) -> str:
         """Construct the full file path including subdirectory."""
         subdir_path = os.path.join(self.folder_path, sub_directory)
         return os.path.join(subdir_path, filename)
 
+    @staticmethod
+    def _key(sub_directory: str, filename: str) -> str:
+        """Storage key for a file, "/" separated whatever the platform."""
+        return "/".join(part for part in [*Path(sub_directory).parts, filename] if part)
+
+    def exists(self, sub_directory: str, filename: str) -> bool:
+        return self.storage.exists(self._key(sub_directory, filename))
+
+    def _typed(self, df, filename: str):
+        """Apply the dtype policy to a Polars frame, pandas frames are passed through untouched."""
+        if isinstance(df, (pl.DataFrame, pl.LazyFrame)):
+            return self.dtype_policy.apply(df, Path(filename).stem)
+        return df
+
+    def _typed_with_metadata(self, frame_and_metadata: tuple, filename: str) -> tuple:
+        df, metadata = frame_and_metadata
+        return self._typed(df, filename), metadata
+
+    def _cached_read(self, key: str, cache_key: tuple, loader: Callable):
+        """Run loader through the read cache, if enabled. The cache key gets the file's size and version added."""
+        if self.read_cache is None:
+            return loader()
+        return self.read_cache.get_or_load((key, *self.storage.stat(key)) + cache_key, loader)
+
     def read_parquet(
         self, sub_directory: str, filename: str, engine="polars"
     ) -> Optional[Union[pl.DataFrame, pd.DataFrame]]:
         engine = engine or self.engine
-        filepath = self._get_full_path(sub_directory, filename)
+        key = self._key(sub_directory, filename)
 
-        if not os.path.exists(filepath):
+        if not self.storage.exists(key):
             logging.error(
                 f"Failed to read {filename}: File does not exist in {sub_directory}"
             )
-            available_files = os.listdir(os.path.dirname(filepath))
+            available_files = [Path(k).name for k in self.storage.list(sub_directory)]
             logging.info(f"Available files in {sub_directory}: {available_files}")
             return None
 
         try:
             if engine == "polars":
-                return pl.read_parquet(filepath)
+                return self._cached_read(
+                    key,
+                    ("read_parquet", engine),
+                    lambda: self._typed(pl.read_parquet(self.storage.open_input(key)), filename),
+                )
             elif engine == "pandas":
-                return pd.read_parquet(filepath, engine="pyarrow")
+                return self._cached_read(
+                    key,
+                    ("read_parquet", engine),
+                    lambda: pd.read_parquet(self.storage.open_input(key), engine="pyarrow"),
+                )
             else:
                 raise ValueError("Unsupported engine. Use 'polars' or 'pandas'.")
         except Exception as e:
@@ -69,121 +153,553 @@ class DataStore:
             df: Union[pd.DataFrame, pl.DataFrame],
             sub_directory: str,
             filename: str,
-            metadata: dict,  # Add metadata as an optional parameter
+            metadata: Optional[dict] = None,  # Add metadata as an optional parameter
         log: bool = True,
-    ) -> None:
-        filepath = self._get_full_path(sub_directory, filename)
+    ) -> bool:
+        key = self._key(sub_directory, filename)
 
         try:
             # Convert DataFrame to PyArrow Table based on the input type
             if isinstance(df, pd.DataFrame):
                 arrow_table = pa.Table.from_pandas(df)
             elif isinstance(df, pl.DataFrame):
-                arrow_table = df.to_arrow()
+                arrow_table = self._typed(df, filename).to_arrow()
             else:
                 raise TypeError("Data must be either a pandas or polars DataFrame.")
 
             # Add metadata to the schema, if provided
             if metadata:
-                schema_with_metadata = arrow_table.schema.add_metadata(metadata)
+                # with_metadata replaces, so keep whatever the conversion put there (e.g. the pandas index)
+                encoded = {str(k).encode(): str(v).encode() for k, v in metadata.items()}
+                schema_with_metadata = arrow_table.schema.with_metadata(
+                    {**(arrow_table.schema.metadata or {}), **encoded}
+                )
             else:
                 schema_with_metadata = arrow_table.schema
 
-            # Write the parquet file with (or without) metadata
-            with pq.ParquetWriter(filepath, schema=schema_with_metadata) as writer:
-                writer.write_table(arrow_table)
+            # Write the parquet file with (or without) metadata. Locally via a tmp file, remotely from memory
+            with self.storage.open_output(key) as sink:
+                with pq.ParquetWriter(sink, schema=schema_with_metadata, **self.dtype_policy.write_options()) as writer:
+                    writer.write_table(arrow_table, row_group_size=self.dtype_policy.row_group_size)
 
+            if self.catalog is not None:
+                self._catalog_file(self.storage.path(key), sub_directory, arrow_table, metadata)
             if log:
-                logging.info(f"Successfully wrote data to {filepath}")
+                logging.info(f"Successfully wrote data to {self.storage.uri(key)}")
+            return True
         except Exception as e:
             logging.error(f"Failed to write {filename}: {e}")
+            return False
+
+    def _catalog_file(self, filepath: str, sub_directory: str, arrow_table: pa.Table, metadata: Optional[dict]) -> None:
+        try:
+            min_date = max_date = None
+            if "date" in arrow_table.column_names and arrow_table.num_rows:
+                date_range = pc.min_max(arrow_table.column("date"))
+                min_date, max_date = date_range["min"].as_py(), date_range["max"].as_py()
+            self.catalog.record(
+                filepath,
+                sub_directory,
+                arrow_table.num_rows,
+                str(arrow_table.schema.remove_metadata()),
+                metadata,
+                min_date,
+                max_date,
+            )
+        except Exception as e:
+            # The file itself is written fine, a rebuild_catalog will pick it up
+            logging.error(f"Failed to catalog {filepath}: {e}")
+
+    def rebuild_catalog(self) -> int:
+        """Index every file already in the store, only needs running once for stores that predate the catalog."""
+        return self.catalog.rebuild()
+
+    def read_metadata(self, sub_directory: str, filename: str) -> dict:
+        """Read the key/value metadata from the catalog, or the parquet footer if the catalog has nothing current."""
+        key = self._key(sub_directory, filename)
+        if self.catalog is not None:
+            entry = self.catalog.get(self.storage.path(key))
+            if entry is not None:
+                return entry["metadata"]
+        metadata = pq.read_metadata(self.storage.open_input(key)).metadata or {}
+        return {k.decode(): v.decode() for k, v in metadata.items()}
+
+    @staticmethod
+    def _read_file(
+            source,
+            engine: str,
+            columns: Optional[List[str]] = None,
+            use_threads: bool = True,
+    ) -> tuple[Union[pl.DataFrame, pd.DataFrame], dict]:
+        """Read data and key/value metadata in one pass, parsing the footer once. source is a path or file object."""
+        parquet_file = pq.ParquetFile(source)
+        if columns is not None:
+            # Not every file carries every field, project onto whatever this one has
+            columns = [col for col in columns if col in parquet_file.schema_arrow.names]
+        table = parquet_file.read(columns=columns, use_threads=use_threads)
+
+        metadata = parquet_file.metadata.metadata or {}
+        metadata_dict = {k.decode(): v.decode() for k, v in metadata.items()}
+
+        if engine == "polars":
+            return pl.from_arrow(table), metadata_dict
+        elif engine == "pandas":
+            return table.to_pandas(), metadata_dict
+        else:
+            raise ValueError("Unsupported engine. Use 'polars' or 'pandas'.")
 
     def read(
             self,
             sub_directory: str,
             filename: str,
             engine: Optional[str] = None,
-            return_metadata: bool = False  # Option to return metadata
+            return_metadata: bool = False,  # Option to return metadata
+            columns: Optional[List[str]] = None,
     ) -> Union[pl.DataFrame, pd.DataFrame, tuple[pl.DataFrame, dict], tuple[pd.DataFrame, dict]]:
         # Use the provided engine or fallback to the default one
         engine = engine or self.engine
 
-        # Construct the file path
-        filepath = self._get_full_path(sub_directory, filename)
+        # Construct the storage key
+        key = self._key(sub_directory, filename)
+        if self.storage.is_local and os.path.isdir(self.storage.path(key)):
+            print(self.storage.path(key), "is a directory!")
+            return (None, None) if return_metadata else None
 
-        # Handle Polars DataFrame
-        if engine == "polars":
-            if os.path.isdir(filepath):
-                print(filepath, "is a directory!")
-            else:
-                df = pl.read_parquet(filepath)
-                if return_metadata:
-                    # Read the metadata using pyarrow
-                    parquet_file = pq.ParquetFile(filepath)
-                    metadata = parquet_file.metadata.metadata  # Extract metadata
-                    metadata_dict = {k.decode(): v.decode() for k, v in metadata.items()}
-                    return df, metadata_dict  # Return the DataFrame and metadata
-                return df
-
-        # Handle Pandas DataFrame
-        elif engine == "pandas":
-            df = pd.read_parquet(filepath, engine="pyarrow")
-            if return_metadata:
-                # Read the metadata using pyarrow
-                parquet_file = pq.ParquetFile(filepath)
-                metadata = parquet_file.metadata.metadata  # Extract metadata
-                metadata_dict = {k.decode(): v.decode() for k, v in metadata.items()}
-                return df, metadata_dict  # Return the DataFrame and metadata
-            return df
+        df, metadata_dict = self._cached_read(
+            key,
+            ("read", engine, tuple(columns) if columns is not None else None),
+            lambda: self._typed_with_metadata(self._read_file(self.storage.open_input(key), engine, columns), filename),
+        )
+        if return_metadata:
+            return df, metadata_dict  # Return the DataFrame and metadata
+        return df
+
+    def read_filtered(
+            self,
+            sub_directory: str,
+            filename: str,
+            columns: Optional[List[str]] = None,
+            symbols: Optional[List[str]] = None,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+    ) -> pl.DataFrame:
+        """Read only the rows and columns needed, pruning row groups on their date/symbol statistics first.
+
+        Against S3 this fetches the footer, then just the surviving column chunks with concurrent ranged GETs,
+        so a narrow read never downloads the whole object.
+        """
+        return self._read_pruned(self._key(sub_directory, filename), columns, symbols, start_date, end_date)
+
+    def _read_pruned(self, key, columns=None, symbols=None, start_date=None, end_date=None) -> pl.DataFrame:
+        source = self.storage.open_ranged(key)
+        parquet_file = pq.ParquetFile(source)
+        names = parquet_file.schema_arrow.names
+        requested = columns
+        if columns is not None:
+            # The filter columns have to be read too, to drop the rows pruning couldn't
+            needed = set(columns)
+            if symbols is not None:
+                needed.add("symbol")
+            if start_date is not None or end_date is not None:
+                needed.add("date")
+            columns = [col for col in names if col in needed]
+
+        row_groups = prune_row_groups(parquet_file, start_date, end_date, symbols)
+        if hasattr(source, "prefetch"):
+            source.prefetch(column_chunk_ranges(parquet_file, row_groups, columns))
+        df = pl.from_arrow(parquet_file.read_row_groups(row_groups, columns=columns))
+
+        if "date" in df.columns:
+            date_dtype = df.schema["date"]
+            like = date(2000, 1, 1) if date_dtype == pl.Date else dt(2000, 1, 1) if date_dtype == pl.Datetime else ""
+            if start_date is not None:
+                df = df.filter(pl.col("date") >= comparable_bound(start_date, like))
+            if end_date is not None:
+                df = df.filter(pl.col("date") <= comparable_bound(end_date, like))
+        if symbols is not None and "symbol" in df.columns:
+            df = df.filter(pl.col("symbol").is_in(symbols))
+        if requested is not None:
+            df = df.select([col for col in requested if col in df.columns])
+        return df
+
+    def read_dataset(
+            self,
+            endpoint: str,
+            columns: Optional[List[str]] = None,
+            symbols: Optional[List[str]] = None,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+            max_workers: int = 8,
+    ) -> pl.DataFrame:
+        """Eager counterpart to scan_dataset, reading year partitions concurrently through read_filtered's pruning."""
+        all_keys = self.storage.list_recursive(self._dataset_key(endpoint), ".parquet")
+        if not all_keys:
+            return pl.DataFrame()
+        start_year = start_date.year if start_date is not None else None
+        end_year = end_date.year if end_date is not None else None
+        # With no partition in range, one is still read (just its footer, nothing survives pruning) for the columns
+        keys = [
+            key for key in all_keys
+            if (start_year is None or _partition_year(key) >= start_year)
+            and (end_year is None or _partition_year(key) <= end_year)
+        ] or all_keys[-1:]
+        if columns is not None:
+            columns = ["date", "symbol", *columns]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(
+                lambda key: self._read_pruned(key, columns, symbols, start_date, end_date), keys
+            ))
+        frames = [frame for frame in frames if frame.height] or frames[:1]
+        return pl.concat(frames, how="diagonal_relaxed").sort(["symbol", "date"])
 
+    def scan(
+            self,
+            sub_directory: str,
+            filename: str,
+            columns: Optional[List[str]] = None,
+            mirror: bool = False,
+    ) -> pl.LazyFrame:
+        """Lazily scan a single parquet file, so filters and projections get pushed down into the read.
+
+        With mirror=True the memory mapped Arrow IPC mirror is scanned instead, skipping decompression.
+        Scans don't go through the read cache, every collect reads from the file (or the mirror).
+        """
+        if mirror:
+            lf = pl.scan_ipc(self.ensure_mirror(sub_directory, filename), memory_map=True)
         else:
-            raise ValueError("Unsupported engine. Use 'polars' or 'pandas'.")
+            source, storage_options = self.storage.scan_source(self._key(sub_directory, filename))
+            lf = self._typed(pl.scan_parquet(source, storage_options=storage_options), filename)
+        if columns is not None:
+            lf = lf.select(columns)
+        return lf
 
     def read_all_in_directory(
-            self, sub_directory: str, return_metadata: bool
+            self,
+            sub_directory: str,
+            return_metadata: bool = False,
+            columns: Optional[List[str]] = None,
+            max_workers: int = 8,
     ) -> Dict[str, Dict[str, Union[pl.DataFrame, pd.DataFrame]]]:
-        """Load and cache all data files from a specific subdirectory, returning metadata and data."""
-        self.all_data = {}
-        # Create a Path object for the subdirectory
-        subdir_path = Path(self.folder_path) / sub_directory
-
-        existing_files = set(filepath for filepath in subdir_path.glob("*"))
-
-        # Iterate through each file in the subdirectory
-        for filepath in existing_files:
-            # Read parquet file and cache it
-            data, metadata = self.read(sub_directory, engine=self.engine, filename=filepath, return_metadata=return_metadata)
-            if data is not None:
-                self.all_data[f"{sub_directory}_{filepath.name}"] = {
-                    "metadata": metadata,
+        """Load and cache all data files from a specific subdirectory, returning metadata and data.
+
+        Files are read in parallel on a thread pool, pass columns to only decode the fields you need.
+        """
+        existing_files = self.storage.list(sub_directory, ".parquet")
+
+        def read_one(key):
+            # Parallelism comes from reading many files at once, so keep pyarrow single threaded per file
+            return self._cached_read(
+                key,
+                ("read_all_in_directory", self.engine, tuple(columns) if columns else None),
+                lambda: self._typed_with_metadata(
+                    self._read_file(self.storage.open_input(key), self.engine, columns, use_threads=False), key
+                ),
+            )
+
+        # Build locally and swap in at the end, pipeline stages call this from several threads at once
+        all_data = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for key, (data, metadata) in zip(existing_files, executor.map(read_one, existing_files)):
+                all_data[f"{sub_directory}_{Path(key).name}"] = {
+                    "metadata": metadata if return_metadata else None,
                     "data": data
                 }
 
-        return self.all_data
+        self.all_data = all_data
+        return all_data
+
+    def _mirror_path(self, sub_directory: str, filename: str, source_stamp: str) -> str:
+        # One file per version of the source, so a rebuild never replaces a mirror a reader still has mapped.
+        # Windows refuses to replace or delete a memory mapped file
+        version = hashlib.sha1(source_stamp.encode()).hexdigest()[:12]
+        return os.path.join(self.folder_path, MIRROR_DIRECTORY, sub_directory, f"{Path(filename).stem}.{version}.arrow")
+
+    def ensure_mirror(self, sub_directory: str, filename: str) -> str:
+        """Path to an up to date Arrow IPC mirror of a parquet file, (re)building it if the source has changed.
+
+        The mirror always lives on local disk, whatever storage the source is in.
+        """
+        key = self._key(sub_directory, filename)
+        source_stamp = "|".join(str(part) for part in [*self.storage.stat(key), self.dtype_policy.signature()])
+        mirror_path = self._mirror_path(sub_directory, filename, source_stamp)
+        if os.path.exists(mirror_path):
+            return mirror_path
+
+        # Typed before mirroring, so reads off the mirror stay zero copy
+        table = self._typed(pl.read_parquet(self.storage.open_input(key)), filename).to_arrow()
+        os.makedirs(os.path.dirname(mirror_path), exist_ok=True)
+        # Several research processes can race to rebuild, write then rename so none of them maps a partial file
+        tmp_path = f"{mirror_path}.{os.getpid()}.tmp"
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        try:
+            os.replace(tmp_path, mirror_path)
+        except PermissionError:
+            # Another process built this same version first and already has it mapped
+            os.remove(tmp_path)
+            if not os.path.exists(mirror_path):
+                raise
+        self._remove_stale_mirrors(mirror_path, filename)
+        logging.info(f"Rebuilt IPC mirror {mirror_path}")
+        return mirror_path
+
+    @staticmethod
+    def _remove_stale_mirrors(mirror_path: str, filename: str) -> None:
+        """Delete the older versions of a mirror, leaving any a reader still has mapped for the next rebuild."""
+        directory = os.path.dirname(mirror_path)
+        # Unversioned names are from before mirrors were versioned
+        version_pattern = re.compile(rf"{re.escape(Path(filename).stem)}(\.[0-9a-f]{{12}})?\.arrow")
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if path != mirror_path and version_pattern.fullmatch(name):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Still mapped on Windows
+
+    def read_mirror(
+            self,
+            sub_directory: str,
+            filename: str,
+            engine: Optional[str] = None,
+    ) -> Union[pl.DataFrame, pd.DataFrame]:
+        """Read a parquet file through its memory mapped IPC mirror.
+
+        The polars read is near zero copy and shared via the page cache. The pandas read goes through to_pandas,
+        which copies into pandas' own blocks, so it only saves the parquet decode.
+        """
+        engine = engine or self.engine
+        mirror_path = self.ensure_mirror(sub_directory, filename)
+        if engine == "polars":
+            return pl.read_ipc(mirror_path, memory_map=True)
+        elif engine == "pandas":
+            # The frame is a copy, so the mapping can be closed before handing it back
+            with pa.memory_map(mirror_path) as source:
+                return pa.ipc.open_file(source).read_all().to_pandas()
+        else:
+            raise ValueError("Unsupported engine. Use 'polars' or 'pandas'.")
+
+    def build_core_data_mirror(self) -> None:
+        """Bring the IPC mirror of every core_data frame up to date."""
+        for key in self.storage.list("core_data", ".parquet"):
+            self.ensure_mirror("core_data", Path(key).name)
+
+    def read_core_data(self, engine: Optional[str] = None) -> Dict[str, Union[pl.DataFrame, pd.DataFrame]]:
+        """Every core_data frame keyed by name, served from the IPC mirror."""
+        return {
+            Path(key).stem: self.read_mirror("core_data", Path(key).name, engine)
+            for key in self.storage.list("core_data", ".parquet")
+        }
+
 
-    def read_core_data(self) -> Dict[str, Union[pl.DataFrame, pd.DataFrame]]:
-        core_data_dict = self.read_all_in_directory("core_data")
-        clean_core_data_dict = {}
-        for k, v in core_data_dict.items():
-            clean_core_data_dict[k.replace("core_data_", "")] = v
-        return clean_core_data_dict
+    @staticmethod
+    def _dataset_key(endpoint: str) -> str:
+        return f"{DATASET_DIRECTORY}/{endpoint}"
+
+    def write_dataset(
+        self,
+        df: pl.DataFrame,
+        endpoint: str,
+        mode: str = "overwrite",
+        row_group_size: int = 16_384,  # ~65 symbols' worth of a year, small enough for stats to prune by symbol
+    ) -> None:
+        """Write a long (date, symbol, fields...) frame as a dataset partitioned by year.
+
+        Rows are sorted by symbol then date and symbol is dictionary encoded, so row group statistics let symbol
+        and date filters skip most of each file. mode="upsert" merges into existing partitions on (date, symbol)
+        instead of replacing the whole dataset.
+
+        mode="overwrite" replaces partitions one at a time and only then deletes the ones the frame has no rows for,
+        so a reader mid-write, or a failed write, sees a mix of old and new partitions but never an empty dataset.
+        """
+        if mode not in ("overwrite", "upsert"):
+            raise ValueError("Unsupported mode. Use 'overwrite' or 'upsert'.")
+
+        dataset_key = self._dataset_key(endpoint)
+        stale_keys = set(self.storage.list_recursive(dataset_key, ".parquet")) if mode == "overwrite" else set()
+
+        df = df.with_columns(pl.col("date").cast(pl.Date), pl.col("symbol").cast(pl.String)).select(
+            "date", "symbol", pl.exclude("date", "symbol")
+        )
+        partitions = df.with_columns(pl.col("date").dt.year().alias("year")).partition_by("year", as_dict=True)
+        for (year,), partition in partitions.items():
+            key = f"{dataset_key}/year={year}/part-0.parquet"
+            stale_keys.discard(key)
+
+            partition = partition.drop("year")
+            if mode == "upsert" and self.storage.exists(key):
+                existing = pl.read_parquet(self.storage.open_input(key))
+                partition = pl.concat([existing, partition], how="diagonal_relaxed").unique(
+                    subset=["date", "symbol"], keep="last"
+                )
+
+            table = partition.sort(["symbol", "date"]).to_arrow()
+            # Storage only publishes the partition once it's fully written, so readers never see half of one
+            with self.storage.open_output(key) as sink:
+                pq.write_table(
+                    table,
+                    sink,
+                    row_group_size=row_group_size,
+                    use_dictionary=["symbol"],
+                    write_statistics=True,
+                    **self.dtype_policy.write_options(),
+                )
+            if self.catalog is not None:
+                self._catalog_partition(self.storage.path(key), dataset_key)
+
+        for key in sorted(stale_keys):
+            self.storage.delete(key)
+            if self.catalog is not None:
+                try:
+                    self.catalog.remove(self.storage.path(key))
+                except Exception as e:
+                    # The stale entry fails validation on get() now its file is gone
+                    logging.error(f"Failed to clear catalog entry for {key}: {e}")
+
+        logging.info(f"Wrote {df.height} rows to dataset {endpoint} across {len(partitions)} partitions")
+
+    def _catalog_partition(self, filepath: str, dataset_key: str) -> None:
+        try:
+            self.catalog.record_existing(filepath, dataset_key)
+        except Exception as e:
+            # Like _catalog_file, never fail the write over the catalog, the rest of the partitions still go out
+            logging.error(f"Failed to catalog {filepath}: {e}")
+
+    def scan_dataset(
+        self,
+        endpoint: str,
+        columns: Optional[List[str]] = None,
+        symbols: Optional[List[str]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> pl.LazyFrame:
+        """Lazily scan a partitioned dataset, filters and projection get pushed down to the parquet reader."""
+        source, storage_options = self.storage.scan_source(f"{self._dataset_key(endpoint)}/year=*/*.parquet")
+        lf = pl.scan_parquet(source, hive_partitioning=True, storage_options=storage_options)
+        if start_date is not None:
+            start_date = start_date.date() if isinstance(start_date, dt) else start_date
+            lf = lf.filter(pl.col("year") >= start_date.year, pl.col("date") >= start_date)
+        if end_date is not None:
+            end_date = end_date.date() if isinstance(end_date, dt) else end_date
+            lf = lf.filter(pl.col("year") <= end_date.year, pl.col("date") <= end_date)
+        if symbols is not None:
+            lf = lf.filter(pl.col("symbol").is_in(symbols))
+        if columns is not None:
+            lf = lf.select(["date", "symbol", *columns])
+        else:
+            lf = lf.drop("year")
+        return lf
+
+    def read_directory_long(self, sub_directory: str) -> Optional[pl.DataFrame]:
+        """Stack a directory of per-symbol files into one long frame, tagged with each file's symbol."""
+        frames = []
+        for frame_data in self.read_all_in_directory(sub_directory, return_metadata=True).values():
+            df = frame_data["data"]
+            if df.height == 0:
+                continue
+            if "date" in df.columns:
+                if df.schema["date"] == pl.String:
+                    df = df.with_columns(pl.col("date").str.strptime(pl.Date, "%Y-%m-%d", strict=False))
+                df = df.with_columns(pl.col("date").cast(pl.Date))
+            df = df.with_columns(pl.lit(frame_data["metadata"]["symbol"]).cast(pl.String).alias("symbol"))
+            frames.append(df)
+
+        if not frames:
+            return None
+        return pl.concat(frames, how="diagonal_relaxed")
+
+    def build_dataset_from_directory(self, sub_directory: str, endpoint: str) -> None:
+        """Convert a directory of per-symbol files into one long, partitioned dataset."""
+        df = self.read_directory_long(sub_directory)
+        if df is None:
+            logging.error(f"No files to build dataset {endpoint} from in {sub_directory}")
+            return
+        self.write_dataset(df, endpoint, mode="overwrite")
+
+
+def _overlap_matches(stored: pl.DataFrame, fetched: pl.DataFrame, rel_tol: float = 1e-6) -> bool:
+    """True if the fetched overlap rows carry the same float values as the stored ones, give or take rounding.
+
+    FMP re-serialises its numbers, so a value can come back a few ulps off without the history having changed.
+    """
+    if fetched.height == 0 or fetched.height != stored.height:
+        return False
+    shared_columns = [col for col in stored.columns if col in fetched.columns and stored[col].dtype.is_float()]
+    return all(
+        a is b if a is None or b is None else math.isclose(a, b, rel_tol=rel_tol)
+        for col in shared_columns
+        for a, b in zip(stored[col].to_list(), fetched[col].to_list())
+    )
+
+
+def _partition_year(key: str) -> int:
+    # e.g. dataset/prices/year=2020/part-0.parquet -> 2020
+    return int(next(part for part in key.split("/") if part.startswith("year=")).split("=")[1])
 
 
 class DataGatherer:
     def __init__(
         self,
         api_key: str,
-        symbols: List[str],
+        symbols: Optional[List[str]],
         rate_limit: int,
         data_handler,
         max_retries=3,
+        max_concurrency=50,
+        writer_threads=4,
+        write_queue_size=16,
+        response_cache: Optional[ResponseCache] = None,
+        journal: Optional[GatherJournal] = None,
+        max_connections=100,
+        max_connections_per_host=50,
     ):
         self.api_key = api_key
-        self.symbols = symbols
-        self.rate_limit = rate_limit
-        self.semaphore = asyncio.Semaphore(rate_limit)
+        self._symbols = symbols
+        self.rate_limit = rate_limit  # Requests per minute, shared by every handler using this gatherer
+        self.rate_limiter = TokenBucketRateLimiter(rate_limit)
         self.data_handler = data_handler
         self.max_retries = max_retries
+        self.max_concurrency = max_concurrency  # Size of the fetch worker pool
+        self.writer_threads = writer_threads
+        # Fetched frames waiting to be written, fetchers block once it's full so memory stays flat
+        self.write_queue_size = write_queue_size
+        self.response_cache = response_cache
+        self.journal = journal  # Records finished units so a crashed run can be resumed
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def symbols(self) -> List[str]:
+        """Explicit symbols if given, otherwise the data store's universe, resolved only when we start fetching."""
+        if self._symbols is None:
+            return self.data_handler.symbols
+        return self._symbols
+
+    @symbols.setter
+    def symbols(self, symbols: List[str]) -> None:
+        self._symbols = symbols
+
+    @asynccontextmanager
+    async def session(self):
+        """One tuned session shared by every fetch made inside this block, so endpoints can run side by side."""
+        if self._session is not None:
+            yield self._session
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+            ssl=False,
+        )
+        async with aiohttp.ClientSession(connector=connector) as session:
+            self._session = session
+            try:
+                yield session
+            finally:
+                self._session = None
 
     async def _fetch_data(
         self,
@@ -191,18 +707,31 @@ class DataGatherer:
         symbol: str,
         url: str,
         process_response: Callable,
-    ) -> tuple[str, pl.DataFrame]:
+    ) -> tuple[str, Optional[pl.DataFrame]]:
+        if self.response_cache is not None:
+            # Cache hits don't spend rate limit budget
+            cached = await asyncio.to_thread(self.response_cache.get, url)
+            if cached is not None:
+                logging.info(f"Serving cached data for symbol: {symbol}")
+                return symbol, await asyncio.to_thread(process_response, cached)
+            if self.response_cache.offline:
+                logging.error(f"No cached response for symbol: {symbol} and running offline.")
+                return symbol, None
+
         attempt = 0
         while attempt < self.max_retries:
-            async with self.semaphore:
+            async with self.rate_limiter:
                 logging.info(
                     f"Starting to fetch data for symbol: {symbol} (Attempt {attempt + 1})"
                 )
                 try:
-                    async with session.get(url, ssl=False) as response:
+                    async with session.get(url) as response:
                         if response.status == 200:
-                            data = await response.json()
-                            df = process_response(data)
+                            raw = await response.read()
+                            if self.response_cache is not None:
+                                await asyncio.to_thread(self.response_cache.put, url, raw)
+                            # Decoding is columnar and releases the GIL, keep it off the event loop
+                            df = await asyncio.to_thread(process_response, raw)
                             logging.info(f"Fetched data for symbol: {symbol}")
                             return symbol, df
                         elif response.status == 429:  # Rate limit exceeded
@@ -210,9 +739,10 @@ class DataGatherer:
                                 response.headers.get("Retry-After", 60)
                             )  # Get Retry-After header or default to 60 seconds
                             logging.warning(
-                                f"Rate limit exceeded for symbol: {symbol}. Waiting for {wait_time} seconds."
+                                f"Rate limit exceeded for symbol: {symbol}. Backing off for {wait_time} seconds."
                             )
-                            await asyncio.sleep(wait_time)
+                            # Pause the shared bucket rather than sleeping here, so the gatherer backs off once
+                            self.rate_limiter.pause(wait_time)
                         else:
                             response.raise_for_status()
                 except aiohttp.ClientResponseError as e:
@@ -226,78 +756,277 @@ class DataGatherer:
         logging.error(
             f"Failed to fetch data for symbol: {symbol} after {self.max_retries} attempts."
         )
-        return symbol, pl.DataFrame()  # Return an empty DataFrame on failure
+        return symbol, None  # None on failure, so callers can tell it apart from an empty response
 
-    async def _fetch_all_data(
+    async def _fetch_incremental(
         self,
+        session: aiohttp.ClientSession,
+        symbol: str,
         build_url: Callable,
         process_response: Callable,
         file_suffix: str,
-        date_chunker: Optional[Callable] = False,
-    ) -> Dict[str, List[pl.DataFrame]]:
-        async with aiohttp.ClientSession() as session:
-            if date_chunker:
-                for symbol in self.symbols:
-                    all_date_chunks = date_chunker(
-                        dt(1990, 1, 1)
-                    )  # Adjust date as needed
-                    tasks = [
-                        self._fetch_data(
-                            session,
-                            symbol,
-                            build_url(symbol, date_chunk),
-                            process_response,
-                        )
-                        for date_chunk in all_date_chunks
-                    ]
+    ) -> tuple[str, Optional[pl.DataFrame]]:
+        """Only request rows from the last settled date we hold, and merge them into the stored history."""
+        filename = f"{symbol}.parquet"
+        if not self.data_handler.exists(file_suffix, filename):
+            return await self._fetch_data(session, symbol, build_url(symbol), process_response)
 
-                    chunk_results = await asyncio.gather(*tasks, return_exceptions=True)
+        stored_tail = await asyncio.to_thread(self._stored_tail, file_suffix, filename)
+        if stored_tail.height < 2:
+            return await self._fetch_data(session, symbol, build_url(symbol), process_response)
 
-                    all_data = []
-                    for result in chunk_results:
-                        symbol, data = result
-                        if data.shape[0]>0:
-                            all_data.append(data)
-                        else:
-                            print("Empty Frame for ", symbol)
+        # Ask from the second to last date: the last bar may have been partial, the one before is settled and
+        # lets us check the history hasn't been re-adjusted (splits/dividends) since we stored it
+        overlap_date = stored_tail["date"][-2]
+        symbol, new = await self._fetch_data(
+            session, symbol, build_url(symbol, start_date=overlap_date.strftime("%Y-%m-%d")), process_response
+        )
+        if new is None or new.height == 0:
+            return symbol, new
 
-                    symbol, df = symbol, pl.concat(all_data)
+        if not _overlap_matches(
+            stored_tail.filter(pl.col("date") == overlap_date), new.filter(pl.col("date") == overlap_date)
+        ):
+            logging.info(f"History for {symbol} has changed since last refresh, fetching in full.")
+            return await self._fetch_data(session, symbol, build_url(symbol), process_response)
 
-                    # TODO: Can just have in outer loop
-                    if df.height == 0:
-                        logging.error(f"No data for symbol: {symbol}. Skipping saving.")
-                        continue
+        # Only now is the whole file needed, to merge the new rows into it
+        existing = await asyncio.to_thread(self.data_handler.read, file_suffix, filename, engine="polars")
+        merged = pl.concat(
+            [existing.filter(pl.col("date") < new["date"].min()), new], how="diagonal_relaxed"
+        ).sort("date")
+        logging.info(f"Appended {merged.height - existing.height} rows for symbol: {symbol}")
+        return symbol, merged
 
-                    print(symbol)
-                    self.data_handler.write_parquet(
-                        df, sub_directory=file_suffix, filename=f"{symbol}.parquet", metadata={"symbol":symbol, "recieved_dt":dt.now().strftime("%Y-%m-%d %H:%M:%S")}
-                    )
-                    logging.info(f"Saved data for symbol: {symbol}")
+    def _stored_tail(self, file_suffix: str, filename: str, days: int = 14) -> pl.DataFrame:
+        """The last couple of weeks of a stored file, found from its covered_to metadata (via the catalog when it
+        has the file) so only the last row groups are read. Files written before covered_to existed are read whole.
+        """
+        covered_to = self.data_handler.read_metadata(file_suffix, filename).get("covered_to")
+        if covered_to is not None:
+            start_date = date.fromisoformat(covered_to[:10]) - timedelta(days=days)
+            tail = self.data_handler.read_filtered(file_suffix, filename, start_date=start_date).sort("date")
+            if tail.height >= 2:
+                return tail
+        return self.data_handler.read(file_suffix, filename, engine="polars").sort("date")
 
+    async def _fetch_all_chunks(
+        self,
+        session: aiohttp.ClientSession,
+        build_url: Callable,
+        process_response: Callable,
+        file_suffix: str,
+        date_chunker: Callable,
+        write_queue: asyncio.Queue,
+    ) -> None:
+        """Fetch (symbol, date_chunk) pairs for every symbol through one bounded worker pool.
+
+        Each symbol's frame is stitched together and written as soon as its last chunk lands.
+        """
+        queue = asyncio.Queue()
+        planned_chunks = {}
+        remaining = {}
+        for symbol in self.symbols:
+            chunks = date_chunker(symbol)
+            if self.journal is not None:
+                todo = [c for c in chunks if not self.journal.is_done(file_suffix, symbol, c)]
             else:
-                tasks = [
-                    self._fetch_data(
-                        session, symbol, build_url(symbol), process_response
+                todo = chunks
+            if not todo:
+                logging.info(f"All chunks already stored for symbol: {symbol}")
+                continue
+            planned_chunks[symbol] = chunks
+            remaining[symbol] = len(todo)
+            for date_chunk in todo:
+                queue.put_nowait((symbol, date_chunk))
+
+        chunk_frames = defaultdict(list)
+        fetched_chunks = defaultdict(list)
+        failed_symbols = set()
+
+        async def worker():
+            while not queue.empty():
+                symbol, date_chunk = queue.get_nowait()
+                try:
+                    _, df = await self._fetch_data(
+                        session, symbol, build_url(symbol, date_chunk), process_response
                     )
-                    for symbol in self.symbols
-                ]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
+                except Exception as e:
+                    logging.error(f"Error occurred for symbol: {symbol}, chunk: {date_chunk}. Error: {e}")
+                    df = None
+                if df is None:
+                    failed_symbols.add(symbol)
+                else:
+                    fetched_chunks[symbol].append(date_chunk)
+                    if df.height > 0:
+                        chunk_frames[symbol].append(df)
 
-                for result in results:
-                    if isinstance(result, Exception):
-                        logging.error(f"Error occurred: {result}")
-                        continue
+                remaining[symbol] -= 1
+                if remaining[symbol] == 0:
+                    await write_queue.put(
+                        partial(
+                            self._save_chunked_symbol,
+                            symbol,
+                            chunk_frames.pop(symbol, []),
+                            planned_chunks[symbol],
+                            fetched_chunks.pop(symbol, []),
+                            symbol not in failed_symbols,
+                            file_suffix,
+                        )
+                    )
 
-                    symbol, df = result
+        num_workers = min(self.max_concurrency, queue.qsize())
+        await asyncio.gather(*[worker() for _ in range(num_workers)])
 
-                    if df.height == 0:
-                        logging.error(f"No data for symbol: {symbol}. Skipping saving.")
-                        continue
+    def _save_chunked_symbol(
+        self,
+        symbol: str,
+        frames: List[pl.DataFrame],
+        chunks: List[tuple[str, str]],
+        fetched_chunks: List[tuple[str, str]],
+        complete: bool,
+        file_suffix: str,
+    ) -> None:
+        """Merge freshly fetched chunks with what's on disk and record the date range now covered."""
+        filename = f"{symbol}.parquet"
+        stored_metadata = {}
+        if self.data_handler.exists(file_suffix, filename):
+            existing, stored_metadata = self.data_handler.read(
+                file_suffix, filename, engine="polars", return_metadata=True
+            )
+            if existing.schema.get("date") == pl.String:
+                # Stored before market cap dates were decoded to Date
+                existing = existing.with_columns(pl.col("date").str.strptime(pl.Date, "%Y-%m-%d"))
+            frames = [existing] + frames
 
-                    self.data_handler.write_parquet(
-                        df, sub_directory=file_suffix, filename=f"{symbol}.parquet", metadata={"symbol":symbol, "recieved_dt":dt.now().strftime("%Y-%m-%d %H:%M:%S")}
-                    )
-                    logging.info(f"Saved data for symbol: {symbol}")
+        if not frames:
+            logging.error(f"No data for symbol: {symbol}. Skipping saving.")
+            self._record_units(file_suffix, symbol, fetched_chunks)
+            return
+
+        # Newer chunks come last, so keep="last" lets them overwrite stale rows
+        df = (
+            pl.concat(frames, how="diagonal_relaxed")
+            .unique(subset="date", keep="last", maintain_order=True)
+            .sort("date")
+        )
+
+        metadata = {"symbol": symbol, "recieved_dt": dt.now().strftime("%Y-%m-%d %H:%M:%S")}
+        if complete:
+            # Only advance coverage when every planned chunk came back, otherwise the gaps get replanned next run
+            metadata["covered_from"] = min(filter(None, [stored_metadata.get("covered_from"), chunks[0][0]]))
+            metadata["covered_to"] = max(filter(None, [stored_metadata.get("covered_to"), chunks[-1][1]]))
+        elif "covered_from" in stored_metadata:
+            metadata["covered_from"] = stored_metadata["covered_from"]
+            metadata["covered_to"] = stored_metadata["covered_to"]
+
+        if self.data_handler.write_parquet(df, sub_directory=file_suffix, filename=filename, metadata=metadata):
+            logging.info(f"Saved data for symbol: {symbol}")
+            self._record_units(file_suffix, symbol, fetched_chunks)
+
+    def _record_units(self, file_suffix: str, symbol: str, chunks: List[Optional[tuple[str, str]]]) -> None:
+        if self.journal is not None:
+            for chunk in chunks:
+                self.journal.record(file_suffix, symbol, chunk)
+
+    async def _fetch_all_symbols(
+        self,
+        session: aiohttp.ClientSession,
+        build_url: Callable,
+        process_response: Callable,
+        file_suffix: str,
+        incremental: bool,
+        write_queue: asyncio.Queue,
+    ) -> None:
+        """Fetch every symbol through a bounded worker pool, handing each frame to the writers as it lands."""
+        symbol_queue = asyncio.Queue()
+        for symbol in self.symbols:
+            if self.journal is not None and self.journal.is_done(file_suffix, symbol):
+                continue
+            symbol_queue.put_nowait(symbol)
+
+        async def worker():
+            while not symbol_queue.empty():
+                symbol = symbol_queue.get_nowait()
+                try:
+                    if incremental:
+                        _, df = await self._fetch_incremental(
+                            session, symbol, build_url, process_response, file_suffix
+                        )
+                    else:
+                        _, df = await self._fetch_data(
+                            session, symbol, build_url(symbol), process_response
+                        )
+                except Exception as e:
+                    logging.error(f"Error occurred for symbol: {symbol}. Error: {e}")
+                    continue
+
+                if df is None:
+                    continue  # Already logged as a failed fetch
+
+                if df.height == 0:
+                    logging.error(f"No data for symbol: {symbol}. Skipping saving.")
+                    self._record_units(file_suffix, symbol, [None])
+                    continue
+
+                await write_queue.put(partial(self._save_symbol, symbol, df, file_suffix))
+
+        num_workers = min(self.max_concurrency, symbol_queue.qsize())
+        await asyncio.gather(*[worker() for _ in range(num_workers)])
+
+    def _save_symbol(self, symbol: str, df: pl.DataFrame, file_suffix: str) -> None:
+        metadata = {"symbol": symbol, "recieved_dt": dt.now().strftime("%Y-%m-%d %H:%M:%S")}
+        if "date" in df.columns and df["date"].null_count() < df.height:
+            # Lets the next incremental refresh find the last date without reading the file
+            metadata["covered_from"] = str(df["date"].min())[:10]
+            metadata["covered_to"] = str(df["date"].max())[:10]
+        if self.data_handler.write_parquet(
+            df, sub_directory=file_suffix, filename=f"{symbol}.parquet", metadata=metadata
+        ):
+            logging.info(f"Saved data for symbol: {symbol}")
+            self._record_units(file_suffix, symbol, [None])
+
+    async def _writer(self, write_queue: asyncio.Queue, executor: ThreadPoolExecutor) -> None:
+        """Run queued writes on the thread pool so parquet encoding overlaps with network waits."""
+        loop = asyncio.get_running_loop()
+        while True:
+            write = await write_queue.get()
+            if write is None:
+                return
+            try:
+                await loop.run_in_executor(executor, write)
+            except Exception as e:
+                logging.error(f"Failed to write data. Error: {e}")
+
+    async def _fetch_all_data(
+        self,
+        build_url: Callable,
+        process_response: Callable,
+        file_suffix: str,
+        date_chunker: Optional[Callable] = False,
+        incremental: bool = False,
+    ) -> None:
+        write_queue = asyncio.Queue(maxsize=self.write_queue_size)
+        with ThreadPoolExecutor(max_workers=self.writer_threads) as executor:
+            writers = [
+                asyncio.create_task(self._writer(write_queue, executor))
+                for _ in range(self.writer_threads)
+            ]
+            try:
+                async with self.session() as session:
+                    if date_chunker:
+                        await self._fetch_all_chunks(
+                            session, build_url, process_response, file_suffix, date_chunker, write_queue
+                        )
+                    else:
+                        await self._fetch_all_symbols(
+                            session, build_url, process_response, file_suffix, incremental, write_queue
+                        )
+            finally:
+                # Let the writers drain whatever is still queued, then stop
+                for _ in writers:
+                    await write_queue.put(None)
+                await asyncio.gather(*writers)
 
     def update_data(
         self,
@@ -305,17 +1034,18 @@ class DataGatherer:
         process_response: Callable,
         file_suffix: str,
         date_chunker: Optional[Callable] = None,
+        incremental: bool = False,
     ) -> Optional[asyncio.Future]:
         if asyncio.get_event_loop().is_running():
             return asyncio.ensure_future(
                 self._fetch_all_data(
-                    build_url, process_response, file_suffix, date_chunker
+                    build_url, process_response, file_suffix, date_chunker, incremental
                 )
             )
         else:
             return asyncio.run(
                 self._fetch_all_data(
-                    build_url, process_response, file_suffix, date_chunker
+                    build_url, process_response, file_suffix, date_chunker, incremental
                 )
             )
 
@@ -326,21 +1056,21 @@ class GenericDataHandler:
         self.sub_directory = sub_directory
         self.data_cache = defaultdict(pl.DataFrame)
 
-    def read_raw_data(self, sub_directory):
-        """Load raw data from the data store and cache it."""
-        all_data = self.data_store.read_all_in_directory(sub_directory, return_metadata=True)
+    def read_raw_data(self, sub_directory, columns=None):
+        """Load raw data from the data store and cache it, optionally only decoding the given columns."""
+        all_data = self.data_store.read_all_in_directory(sub_directory, return_metadata=True, columns=columns)
         # Cache data using sub_directory as key
         self.data_cache[sub_directory] = all_data
         return all_data
 
-    async def gather_and_store_data(self, build_url, process_data):
+    async def gather_and_store_data(self, build_url, process_data, incremental=False):
         """Fetch data for all symbols and store it."""
         await self.data_gatherer._fetch_all_data(
-            build_url, process_data, self.sub_directory
+            build_url, process_data, self.sub_directory, incremental=incremental
         )
 
-    def update_data(self, build_url, process_data):
-        """Run the async gathering and storing process."""
+    def update_data(self, build_url, process_data, incremental=False):
+        """Run the async gathering and storing process. Incremental only pulls rows newer than what is stored."""
         try:
             loop = asyncio.get_event_loop()
             if loop.is_running():
@@ -348,32 +1078,33 @@ class GenericDataHandler:
                     "Cannot run 'update_data' while another event loop is running"
                 )
             else:
-                loop.run_until_complete(self.gather_and_store_data(build_url, process_data))
+                loop.run_until_complete(self.gather_and_store_data(build_url, process_data, incremental))
         except RuntimeError as e:
             print(f"RuntimeError: {e}")
             raise e
 
     def _get_list_of_field_frames(self, key, field):
-        """Fetch and process data for a specific field using cached data."""
+        """(symbol, frame) pairs holding date and a specific field, from the cached data."""
         if key not in self.data_cache:
             raise ValueError(f"No data available for key: {key}")
 
         all_frames = self.data_cache[key]
-        dfs = []
-        for frame_name, frame_data in all_frames.items():
-            symbol = frame_data["metadata"]["symbol"]
-            underlying_data = frame_data["data"]
-            data = underlying_data[["date", field]].rename({field: symbol})
-            dfs.append(data)
-        return dfs
+        return [
+            (frame_data["metadata"]["symbol"], frame_data["data"].select(["date", field]))
+            for frame_data in all_frames.values()
+        ]
 
     def get_field(self, key, field):
-        """Get a merged DataFrame of a specific field across all symbols."""
-        list_of_frames = self._get_list_of_field_frames(key, field)
-        if not list_of_frames:
-            return pl.DataFrame()
-        merged_df = list_of_frames[0]
-        for df in list_of_frames[1:]:
-            merged_df = merged_df.join(df, how="full", on="date", coalesce=True)
-        no_duplicates_df = merged_df.unique(keep="first", subset="date")
-        return no_duplicates_df.sort("date")
+        """Get a wide DataFrame of a specific field across all symbols, stacked long and pivoted once."""
+        return build_field_panel(self._get_list_of_field_frames(key, field), field)
+
+    def get_dataset_field(self, endpoint, field):
+        """Wide DataFrame of a field across all symbols, pivoted straight from the endpoint's long dataset."""
+        long_df = (
+            self.data_store.scan_dataset(endpoint, columns=[field])
+            .with_columns(pl.col("symbol").cast(pl.String))
+            # Symbol order, so the columns come out as they did from the per-symbol directory
+            .sort(["symbol", "date"])
+            .collect()
+        )
+        return pivot_long_panel(long_df, field)
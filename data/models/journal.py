@@ -0,0 +1,57 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime as dt
+from typing import Optional
+
+from constants import ROOT_DIR
+
+
+class GatherJournal:
+    """Append-only record of the (endpoint, symbol, chunk) units a refresh run has finished.
+
+    A fresh run truncates the journal, a resumed run loads it so only the missing units get rescheduled.
+    """
+
+    def __init__(self, path: str = os.path.join(ROOT_DIR, "data", "gather_journal.jsonl"), resume: bool = False):
+        self.path = path
+        self.completed = set()
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            self._load()
+            logging.info(f"Resuming run, {len(self.completed)} units already completed")
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+
+    @staticmethod
+    def _unit(endpoint: str, symbol: str, chunk: Optional[tuple] = None) -> tuple:
+        return endpoint, symbol, tuple(chunk) if chunk else None
+
+    def _load(self) -> None:
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line can be cut short if we died mid-write
+                    continue
+                self.completed.add(self._unit(entry["endpoint"], entry["symbol"], entry["chunk"]))
+
+    def is_done(self, endpoint: str, symbol: str, chunk: Optional[tuple] = None) -> bool:
+        return self._unit(endpoint, symbol, chunk) in self.completed
+
+    def record(self, endpoint: str, symbol: str, chunk: Optional[tuple] = None) -> None:
+        """Mark a unit as completed, flushed straight away so it survives a crash."""
+        entry = {
+            "endpoint": endpoint,
+            "symbol": symbol,
+            "chunk": list(chunk) if chunk else None,
+            "completed_dt": dt.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.completed.add(self._unit(endpoint, symbol, chunk))
@@ -1,5 +1,7 @@
 import polars as pl
 from data.models.general import GenericDataHandler
+from data.utils import build_date_chunks
+from data.models.decoding import decode_records, MARKET_CAP_SCHEMA
 import logging
 import asyncio
 
@@ -7,7 +9,7 @@ import asyncio
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 class MarketCapDataHandler(GenericDataHandler):
-    def __init__(self, data_gatherer, data_store, interval, sub_directory, start_date):
+    def __init__(self, data_gatherer, data_store, interval, sub_directory, start_date, chunk_days=500):
         super().__init__(data_gatherer, data_store, sub_directory)
         self.interval = interval
         self.api_key = data_gatherer.api_key
@@ -16,7 +18,24 @@ class MarketCapDataHandler(GenericDataHandler):
             "&to={end_date}&apikey={api_key}"
         )
         self.start_date = start_date
-    # TODO: Make it check for the data, load, check lasat date, and only get new chunks (make this method general - Append method)
+        self.chunk_days = chunk_days  # FMP caps how much history one market cap request returns
+
+    def plan_date_chunks(self, symbol):
+        """Date chunks still needed for a symbol, skipping any already covered by the stored file."""
+        chunks = build_date_chunks(self.start_date, chunk_days=self.chunk_days)
+        filename = f"{symbol}.parquet"
+        if not self.data_store.exists(self.sub_directory, filename):
+            return chunks
+
+        metadata = self.data_store.read_metadata(self.sub_directory, filename)
+        covered_from, covered_to = metadata.get("covered_from"), metadata.get("covered_to")
+        if not covered_from or not covered_to:
+            return chunks
+
+        # Coverage is stored as ISO date strings like the chunk bounds, so comparing the strings compares the dates.
+        # Always refetch the chunk holding covered_to, it was still open when we stored it
+        return [chunk for chunk in chunks if chunk[0] < covered_from or chunk[1] >= covered_to]
+
     def build_url(self, symbol, date_chunk):
         """Build the URL for fetching data."""
         return self.endpoint_url.format(
@@ -31,18 +50,21 @@ class MarketCapDataHandler(GenericDataHandler):
         """Process the raw market cap data."""
         return self.__process_raw_marketcap(data)
 
-    def __process_raw_marketcap(self, data):
-        """Convert raw data into a Polars DataFrame."""
-        if len(data) > 1:
-            df = pl.DataFrame(data)
-            df = df.select(
-                pl.col("marketCap").cast(pl.Float64).alias("marketCap"),
-                pl.col("date"),
-            )
+    def __process_raw_marketcap(self, raw):
+        """Decode the raw market cap response into typed columns."""
+        df = decode_records(raw, MARKET_CAP_SCHEMA)
+        if df.height > 1:
+            df = df.select(pl.col("marketCap"), pl.col("date").str.strptime(pl.Date, "%Y-%m-%d"))
         else:
             df = pl.DataFrame()
         return df
 
+    async def backfill_market_caps(self):
+        """Fetch every missing date chunk for every symbol and stitch them into the stored files."""
+        await self.data_gatherer._fetch_all_data(
+            self.build_url, self._process_data, self.sub_directory, date_chunker=self.plan_date_chunks
+        )
+
     def synchronously_backfill_market_caps(self):
         """Run the async gathering and storing process."""
         try:
@@ -50,21 +72,15 @@ class MarketCapDataHandler(GenericDataHandler):
             if loop.is_running():
                 raise RuntimeError("Cannot run 'update_data' while another event loop is running")
             else:
-                combined_results = loop.run_until_complete(self.gather_and_store_data())
+                combined_results = loop.run_until_complete(self.backfill_market_caps())
                 return combined_results
         except RuntimeError as e:
             print(f"RuntimeError: {e}")
             raise e
 
-    def build_processed_market_caps(self, key):
-        """Build and store processed market cap data."""
-        if key not in self.data_cache:
-            raise ValueError(f"No data available for key: {key}")
-
-        field = "marketCap"
-        market_cap_df = self.get_field(key, field)
-        market_cap_df = market_cap_df.with_columns(pl.col("date").str.strptime(pl.Datetime))
-        sorted_df = market_cap_df.sort(by="date")
+    def build_processed_market_caps(self, endpoint="marketcap"):
+        """Build and store the wide processed market cap frame from the market cap dataset."""
+        sorted_df = self.get_dataset_field(endpoint, "marketCap")
 
         self.data_store.write_parquet(sorted_df, "processed/market_data", "marketcap.parquet")
         self.data_cache["processed_marketcap"] = sorted_df
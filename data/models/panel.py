@@ -0,0 +1,125 @@
+from datetime import date
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+import polars as pl
+
+from data.models.ratios import add_ratios
+from data.utils import pivot_long_panel
+
+PANEL_DIRECTORY = "core_data"
+PANEL_FILENAME = "panel.parquet"
+
+# Wide core_data frames folded into the panel, file -> panel column
+PANEL_FIELDS = {
+    "prices.parquet": "price",
+    "total_return.parquet": "total_return",
+    "marketcap.parquet": "market_cap",
+    "ShareholdersEquity.parquet": "shareholders_equity",
+    "revenue.parquet": "revenue",
+    "OperatingCashFlow.parquet": "operating_cash_flow",
+    "DilutedNOS.parquet": "diluted_nos",
+}
+
+
+class PanelStore:
+    """The canonical long panel: one table keyed by (date, symbol), sorted that way, one column per field.
+
+    Fields are unpivoted once when the panel is built and ratios are added as columns, so nothing downstream
+    has to melt wide frames and join them back together. Wide date x symbol views are built on demand.
+    """
+
+    def __init__(self, data_store):
+        self.data_store = data_store
+
+    def _unpivot(self, wide: pl.LazyFrame, column: str) -> pl.LazyFrame:
+        return wide.unpivot(index="date", variable_name="symbol", value_name=column).with_columns(
+            pl.col("symbol").cast(pl.String)
+        )
+
+    @staticmethod
+    def _shared_grid(wides: Dict[str, pl.LazyFrame]) -> Optional[List[str]]:
+        """The symbols, if every wide frame has the same dates in the same order and the same symbol columns."""
+        frames = list(wides.values())
+        symbols = [col for col in frames[0].collect_schema().names() if col != "date"]
+        if any(set(frame.collect_schema().names()) != {"date", *symbols} for frame in frames[1:]):
+            return None
+        dates = pl.collect_all([frame.select("date") for frame in frames])
+        if any(not other.equals(dates[0]) for other in dates[1:]):
+            return None
+        return symbols
+
+    def build(self) -> pl.DataFrame:
+        """Unpivot every available wide field into one (date, symbol) table, add the ratios and store the panel."""
+        wides = {
+            column: self.data_store.scan(PANEL_DIRECTORY, filename)
+            for filename, column in PANEL_FIELDS.items()
+            if self.data_store.exists(PANEL_DIRECTORY, filename)
+        }
+        if not wides:
+            raise ValueError(f"None of {list(PANEL_FIELDS)} exist in {PANEL_DIRECTORY}, nothing to build a panel from")
+
+        symbols = self._shared_grid(wides)
+        if symbols is not None:
+            # standardise_data reindexes everything onto the base frame, so normally the unpivoted frames line
+            # up row for row and the fields can just be stacked side by side, no joins needed
+            long_frames = pl.collect_all([
+                self._unpivot(wide.select("date", *symbols), column) for column, wide in wides.items()
+            ])
+            panel = pl.concat(
+                [long_frames[0]] + [frame.drop("date", "symbol") for frame in long_frames[1:]], how="horizontal"
+            ).lazy()
+        else:
+            frames = [self._unpivot(wide, column) for column, wide in wides.items()]
+            panel = frames[0]
+            for frame in frames[1:]:
+                panel = panel.join(frame, on=["date", "symbol"], how="full", coalesce=True)
+
+        panel = (
+            add_ratios(panel)
+            # The wide frames share one date grid, so a stock is all nulls before it listed, drop those rows
+            .filter(pl.any_horizontal(pl.col(list(wides)).is_not_null()))
+            .sort(["date", "symbol"])
+            # Not streaming, the streaming engine segfaults on full joins (polars 1.4)
+            .collect()
+        )
+
+        self.data_store.write_parquet(panel, PANEL_DIRECTORY, PANEL_FILENAME, log=True)
+        return panel
+
+    def scan(
+            self,
+            columns: Optional[List[str]] = None,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+            symbols: Optional[List[str]] = None,
+            mirror: bool = True,
+    ) -> pl.LazyFrame:
+        """Lazily scan the panel, by default from its memory mapped IPC mirror, keeping date and symbol."""
+        panel = self.data_store.scan(PANEL_DIRECTORY, PANEL_FILENAME, mirror=mirror)
+        if start_date is not None:
+            panel = panel.filter(pl.col("date") >= start_date)
+        if end_date is not None:
+            panel = panel.filter(pl.col("date") <= end_date)
+        if symbols is not None:
+            panel = panel.filter(pl.col("symbol").is_in(symbols))
+        if columns is not None:
+            panel = panel.select(["date", "symbol"] + [col for col in columns if col not in ("date", "symbol")])
+        return panel
+
+    def wide(
+            self,
+            field: str,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+            symbols: Optional[List[str]] = None,
+            engine: Optional[str] = None,
+    ) -> Union[pl.DataFrame, pd.DataFrame]:
+        """A date x symbol view of one field, pivoted from the panel for code that wants wide frames."""
+        long_df = self.scan([field], start_date, end_date, symbols).collect()
+        wide_df = pivot_long_panel(long_df.with_columns(pl.col("symbol").cast(pl.String)), field)
+        if not wide_df.is_empty():
+            wide_df = wide_df.select("date", *sorted(col for col in wide_df.columns if col != "date"))
+        if (engine or self.data_store.engine) == "pandas":
+            return wide_df.to_pandas()
+        return wide_df
@@ -0,0 +1,80 @@
+from datetime import date, datetime as dt
+from typing import List, Optional, Tuple
+
+import pyarrow.parquet as pq
+
+
+def comparable_bound(bound, like):
+    """Coerce a filter bound to the type the column statistics come back as."""
+    if isinstance(like, dt):
+        return bound if isinstance(bound, dt) else dt.combine(bound, dt.min.time())
+    if isinstance(like, date):
+        return bound.date() if isinstance(bound, dt) else bound
+    if isinstance(like, str):
+        return str(bound)[:10]
+    return bound
+
+
+def _column_statistics(row_group, column_index: Optional[int]):
+    if column_index is None:
+        return None
+    statistics = row_group.column(column_index).statistics
+    return statistics if statistics is not None and statistics.has_min_max else None
+
+
+def prune_row_groups(
+    parquet_file: pq.ParquetFile,
+    start_date=None,
+    end_date=None,
+    symbols: Optional[List[str]] = None,
+) -> List[int]:
+    """Row groups whose date/symbol statistics say they could hold matching rows.
+
+    Conservative: a row group with no statistics for a filtered column is always kept.
+    """
+    metadata = parquet_file.metadata
+    names = parquet_file.schema_arrow.names
+    date_index = names.index("date") if "date" in names else None
+    symbol_index = names.index("symbol") if "symbol" in names else None
+    sorted_symbols = sorted(symbols) if symbols is not None else None
+
+    keep = []
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+
+        date_stats = _column_statistics(row_group, date_index)
+        if date_stats is not None:
+            if start_date is not None and date_stats.max < comparable_bound(start_date, date_stats.max):
+                continue
+            if end_date is not None and date_stats.min > comparable_bound(end_date, date_stats.min):
+                continue
+
+        symbol_stats = _column_statistics(row_group, symbol_index)
+        if symbol_stats is not None and sorted_symbols is not None:
+            if not any(symbol_stats.min <= symbol <= symbol_stats.max for symbol in sorted_symbols):
+                continue
+
+        keep.append(i)
+    return keep
+
+
+def column_chunk_ranges(
+    parquet_file: pq.ParquetFile,
+    row_groups: List[int],
+    columns: Optional[List[str]] = None,
+) -> List[Tuple[int, int]]:
+    """[start, end) byte ranges of the column chunks a read of these row groups and columns will touch."""
+    metadata = parquet_file.metadata
+    ranges = []
+    for i in row_groups:
+        row_group = metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            column = row_group.column(j)
+            if columns is not None and column.path_in_schema.split(".")[0] not in columns:
+                continue
+            # The dictionary page, when there is one, sits ahead of the data pages
+            start = column.data_page_offset
+            if column.has_dictionary_page and column.dictionary_page_offset:
+                start = min(start, column.dictionary_page_offset)
+            ranges.append((start, start + column.total_compressed_size))
+    return ranges
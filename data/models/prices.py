@@ -1,77 +1,54 @@
 # PricesDataHandler.py
 import polars as pl
 from data.models.general import GenericDataHandler
-from data.utils import pct_change
-from constants import FLOAT_FIELDS_PRICES, DATA_START_DATE
+from data.models.decoding import decode_records, PRICES_SCHEMA
+from data.models.trading_calendar import TradingCalendar
+from constants import DATA_START_DATE
 
 class PricesDataHandler(GenericDataHandler):
     def __init__(self, data_gatherer, data_store, interval, sub_directory):
         super().__init__(data_gatherer, data_store, sub_directory)
         self.interval = interval
         self.api_key = data_gatherer.api_key
-        self.endpoint_url = "https://financialmodelingprep.com/api/v3/{interval}/{symbol}?from=1900-01-01&apikey={api_key}"
+        self.endpoint_url = "https://financialmodelingprep.com/api/v3/{interval}/{symbol}?from={start_date}&apikey={api_key}"
 
-    def build_url(self, symbol):
+    def build_url(self, symbol, start_date="1900-01-01"):
         """Build the URL for fetching data."""
         return self.endpoint_url.format(
-            interval=self.interval, symbol=symbol, api_key=self.api_key
+            interval=self.interval, symbol=symbol, start_date=start_date, api_key=self.api_key
         )
 
-    def process_raw_prices(self, data):
-        """Process the raw prices data."""
-        for record in data.get("historical", []):
-            for field in FLOAT_FIELDS_PRICES:
-                record[field] = float(record.get(field, 0))
-        df = pl.DataFrame(data["historical"])
-        df = df.with_columns(pl.col("date").str.strptime(pl.Datetime))
+    def process_raw_prices(self, raw):
+        """Decode the raw prices response into typed columns."""
+        df = decode_records(raw, PRICES_SCHEMA, record_key="historical")
+        df = df.with_columns(pl.col("date").str.strptime(pl.Date, "%Y-%m-%d"))
         return df
 
     def _process_data(self, data):
         return self.process_raw_prices(data)
 
-    def _build_adj_close_frame(self, key):
-        """Build a frame for adjusted close prices."""
-        field = "adjClose"
-        prices_df = self.get_field(key, field)
-        sorted_df = prices_df.sort(by="date")
-        self.data_store.write_parquet(sorted_df, "processed/market_data", "prices.parquet", metadata=None)
-        self.data_cache["processed_prices"] = sorted_df
+    def build_processed_prices(self, endpoint="prices", returns_endpoint="returns"):
+        """Build the wide adjusted close frame from the prices dataset, and total return from the returns engine's
+        one day returns rather than recomputing them."""
+        prices = self.get_dataset_field(endpoint, "adjClose")
+        total_returns = self.get_dataset_field(returns_endpoint, "return_1d")
 
-    def _generate_total_returns(self):
-        processed_prices = self.data_cache["processed_prices"]
-        total_returns = pct_change(processed_prices, lookback=1)
-        self.data_store.write_parquet(total_returns, "processed/market_data", "total_return.parquet")
-        self.data_cache["total_return"] = total_returns
-
-    def build_processed_prices(self, key):
-        self._build_adj_close_frame(key)
-        self._generate_total_returns()
-
-
-    def _generate_total_returns(self):
-        processed_prices = self.data_cache["processed_prices"]
-        # Calculate total returns
-        total_returns = pct_change(processed_prices, lookback=1)  # Calculate pct_change over 1 period
-        # Save total returns
-        self.data_store.write_parquet(total_returns,  "processed/market_data", "total_return.parquet", metadata=None)
+        self.data_store.write_parquet(prices, "processed/market_data", "prices.parquet", metadata=None)
+        self.data_store.write_parquet(total_returns, "processed/market_data", "total_return.parquet", metadata=None)
         # Also add to cache to pick up later
+        self.data_cache["processed_prices"] = prices
         self.data_cache["total_return"] = total_returns
 
-    def build_processed_prices(self, key):
-        self._build_adj_close_frame(key)
-        self._generate_total_returns()
-
     def build_base_frame(self, start_date = DATA_START_DATE):
         # Builds a base dataframe that everything is reindexed by to keep everything the same shape
-        # Load total returns
-        total_returns = self.data_store.read_parquet("processed/market_data", "total_return.parquet")
-
-        total_returns_sliced = total_returns.filter(pl.col('date') >= start_date)
-
-
-        filtered_df = total_returns_sliced.filter(
-            pl.any_horizontal(pl.col(pl.Float32, pl.Float64).is_not_nan())
+        # Its dates are the trading calendar's sessions, rather than whichever rows of total_return aren't all NaN
+        calendar = TradingCalendar.from_store(self.data_store)
+        total_return = (
+            self.data_store.scan("processed/market_data", "total_return.parquet")
+            .filter(pl.col('date') >= start_date)
+            .collect()
         )
+        filtered_df = calendar.grid(start_date).join(total_return, on="date", how="left")
 
         self.data_store.write_parquet(filtered_df,  "core_data", "base_frame.parquet", metadata=None)
 
@@ -1,9 +1,10 @@
 import polars as pl
 from collections import defaultdict
-from tqdm import tqdm
-from datetime import datetime as dt
+import logging
 import os
-import pandas as pd
+from pathlib import Path
+from data.utils import pivot_long_panel
+from data.models.trading_calendar import TradingCalendar
 
 data_field_map = {
     "revenuefromcontractwithcustomerexcludingassessedtax": "Revenue_1",
@@ -20,6 +21,10 @@ TTM_FIELDS = [
 
 NON_TIMESERIES_FRAMES = ["all_profiles"]
 
+# Statements for every symbol and period, each mapped to the SEC filing that published it
+STATEMENTS_ENDPOINT = "statements"
+STATEMENT_PERIOD_COLUMN = "statement_period"
+
 
 class FinancialDataProcessor:
     def __init__(self, data_store, periods=["annual", "quarterly"]):
@@ -31,7 +36,9 @@ class FinancialDataProcessor:
 
     def read_raw_data(self, sub_directory):
         """Load raw data from the data store and cache it."""
-        all_data = self.data_store.real_all_in_directory(sub_directory)
+        all_data = {
+            name: frame_data["data"] for name, frame_data in self.data_store.read_all_in_directory(sub_directory).items()
+        }
         # Cache data using sub_directory as key
         self.data_cache[sub_directory] = all_data
         return all_data
@@ -41,58 +48,72 @@ class FinancialDataProcessor:
         parts = base_path.split("/")
         return parts[-1].replace(string_to_replace, "")
 
-    def add_metadata_to_statements(self, period):
-        # Load financial statments
-        statements = self.read_raw_data(f"financial_statements/{period}")
-        # Load relevant SEC mapping
-        sec_name = "10-K" if period == "annual" else "10-Q"
-        sec_filings = self.read_raw_data(f"financial_statements/SEC/{sec_name}")
-
-        for file_name in tqdm(statements.keys()):
-            try:
-                stock_symbol = self.extract_ticker(file_name, f"{period}_")
-
-                financials = statements[file_name].with_columns(
-                    pl.col("date").str.strptime(pl.Date)
+    @staticmethod
+    def sec_type(period):
+        return "10-K" if period == "annual" else "10-Q"
+
+    def add_metadata_to_statements(self, periods=None):
+        """Map every statement to the first SEC filing after its period end, for all symbols and periods at once.
+
+        One forward join_asof by (symbol, SEC type) does the lot, the result is written as the statements dataset.
+        """
+        periods = periods or self.periods
+        statements = [
+            self.data_store.read_directory_long(f"financial_statements/{period}") for period in periods
+        ]
+        filings = [
+            self.data_store.read_directory_long(f"financial_statements/SEC/{self.sec_type(period)}")
+            for period in periods
+        ]
+        if all(df is None for df in statements):
+            logging.error(f"No financial statements found for {periods}")
+            return
+
+        statements = pl.concat(
+            [
+                df.with_columns(
+                    pl.lit(period).alias(STATEMENT_PERIOD_COLUMN), pl.lit(self.sec_type(period)).alias("sec_type")
                 )
-                date_mapper = sec_filings[
-                    f"financial_statements/SEC/{sec_name}_{stock_symbol}"
-                ].with_columns(
-                    pl.col("fillingDate").str.strptime(
-                        pl.Datetime, format="%Y-%m-%d %H:%M:%S"
-                    )
-                )
-                date_mapper = date_mapper.with_columns(
-                    pl.col("fillingDate").dt.date().alias("fillingDate")
-                )
-
-                # Sort sec_filings by 'fillingDate' to facilitate efficient lookups
-                date_mapper = date_mapper.sort("fillingDate")
-
-                # Create an empty DataFrame to store the results
-                # Perform a cross join and filter to get only future filingDates
-                merged_df = financials.join(
-                    date_mapper, on="symbol", how="left"
-                ).filter(pl.col("fillingDate") > pl.col("date"))
-
-                # Group by 'date' and 'symbol' to get the smallest future filingDate
-                result = merged_df.group_by(["date", "symbol"]).agg(
-                    pl.col("fillingDate").min().alias("closest_filing_date")
+                for period, df in zip(periods, statements)
+                if df is not None
+            ],
+            how="diagonal_relaxed",
+        )
+        filings = pl.concat(
+            [
+                df.select(
+                    "symbol",
+                    pl.lit(self.sec_type(period)).alias("sec_type"),
+                    pl.col("fillingDate").str.strptime(pl.Datetime, format="%Y-%m-%d %H:%M:%S").dt.date()
+                    .alias("closest_filing_date"),
                 )
+                for period, df in zip(periods, filings)
+                if df is not None
+            ]
+        ).unique().sort("closest_filing_date")
+
+        # Filings strictly after the statement date, so match forward from the day after
+        mapped = (
+            statements.with_columns((pl.col("date") + pl.duration(days=1)).alias("_day_after"))
+            .sort("_day_after")
+            .join_asof(
+                filings,
+                left_on="_day_after",
+                right_on="closest_filing_date",
+                by=["symbol", "sec_type"],
+                strategy="forward",
+            )
+            .drop("_day_after", "sec_type")
+        )
 
-                # Merge the result back with financials
-                final_df = financials.join(result, on=["date", "symbol"], how="left")
+        unmapped = mapped.filter(pl.col("closest_filing_date").is_null())["symbol"].unique().sort()
+        if len(unmapped) > 0:
+            logging.warning(
+                f"{len(unmapped)} symbols have statements with no later SEC filing, check both are gathered: "
+                f"{', '.join(unmapped.head(20))}"
+            )
 
-                self.data_store.write_parquet(
-                    final_df,
-                    f"financial_statements/pre_processed/{period}",
-                    f"{stock_symbol}.parquet",
-                    log=False,
-                )
-            except KeyError:
-                print(
-                    f"Symbol: {stock_symbol} failed, check if it is missing in the statements or filings data, both are required"
-                )
+        self.data_store.write_dataset(mapped, STATEMENTS_ENDPOINT, mode="overwrite")
 
     # Fields are mapped here
     # https: // www.sec.gov / ix?doc = / Archives / edgar / data / 1018724 / 000101
@@ -101,29 +122,26 @@ class FinancialDataProcessor:
 
     def read_processed_financials(self, directory):
         """Load raw data from the data store and cache it."""
-        all_data = self.data_store.real_all_in_directory(directory)
+        all_data = self.data_store.read_all_in_directory(directory)
 
-        # Rename keys for easier use
+        # Rename keys for easier use, e.g. "processed/financials/quarterly_Revenue_1.parquet" -> "Revenue_1"
         renamed_data_cache = {}
         for data_name, data in all_data.items():
-            clean_name = data_name.replace(f"{directory}_", "")
-            renamed_data_cache[clean_name] = data
+            clean_name = Path(data_name.replace(f"{directory}_", "")).stem
+            renamed_data_cache[clean_name] = data["data"]
 
         self.data_cache["financials"] = renamed_data_cache
 
     def read_processed_market_data(self, sub_directory):
-        all_data = self.data_store.real_all_in_directory(
-            f"{sub_directory}", parquet_suffix=False
-        )
+        all_data = self.data_store.read_all_in_directory(sub_directory)
         DO_NOT_LOAD = ["all_profiles"]
         renamed_data_cache = {}
         for data_name, data in all_data.items():
-            # clean_name = data_name.split("/")[-1].split(".")[0] # MAC TODO: Centralise this... is a breaking change
-            clean_name = data_name.split("\\")[-1].split(".")[0] # Windows
+            clean_name = Path(data_name.replace(f"{sub_directory}_", "")).stem
             if clean_name in DO_NOT_LOAD:
                 pass
             else:
-                renamed_data_cache[clean_name] = data
+                renamed_data_cache[clean_name] = data["data"]
 
         self.data_cache["market"] = renamed_data_cache
 
@@ -137,93 +155,70 @@ class FinancialDataProcessor:
         self.read_processed_market_data(market_processed_data)
 
     def _get_single_stock_field_daily(self, period, field):
-        processed_financials = self.read_raw_data(
-            f"financial_statements/pre_processed/{period}"
-        )
-
         # E.G PYPL REVENUE AND SALES TO PRICE!why
         # TODO: FIX PAYPAL - Combining like this isnt best, should we take the max?
         # TODO: AAPLE ALSO WRONG - something going weong ehre
 
         field = field.lower()
 
-        field_data_store = []
-        for stock, data in {k:v for k,v in processed_financials.items() if "AAPL" in k}.items():
-            stock_symbol = self.extract_ticker(stock, f"{period}_")
-
-            quarterly_data_only = data.filter(
-                pl.col("documenttype") == "10-Q"
-            )  # TODO: Handle better/ actually handle...
-
-            if field in quarterly_data_only.columns:
-                field_data = quarterly_data_only.select(["closest_filing_date", field])
-
-                sorted_df = field_data.sort(by="closest_filing_date")
-
-                # Apply TTM if we need/want it
-                if field in TTM_FIELDS and period == "quarterly":
-                    # TODO: add more checks that sequential etc.
-                    sorted_df = sorted_df.with_columns(
-                        pl.col(field)
-                        .rolling_sum(window_size=4, min_periods=4)
-                        .alias(field)
-                    )
-
-                # TODO: get rid of this dependancy, build ourselves from prices
-                business_days = pd.date_range(
-                    start=sorted_df["closest_filing_date"].min(),
-                    end=dt.today().date(),
-                    freq="B",
-                )
-
-                df_business_days = pl.DataFrame({"date": business_days})
-                df_business_days = df_business_days.with_columns(
-                    pl.col("date").cast(pl.Date)
-                )
+        # Every stock's filings come out of the statements dataset as one long frame, which is pivoted and
+        # forward filled once rather than building a daily frame per stock and outer joining them all together
+        statements = self.data_store.scan_dataset(STATEMENTS_ENDPOINT)
+        if field not in statements.collect_schema().names():
+            return None
+
+        long_df = (
+            statements.filter(
+                pl.col(STATEMENT_PERIOD_COLUMN) == period,
+                # Annual statements come from 10-Ks, quarterly ones from 10-Qs
+                pl.col("documenttype") == self.sec_type(period),
+            )
+            .select(pl.col("closest_filing_date").alias("date"), "symbol", pl.col(field).alias("value"))
+            # Fields vary by company, drop the stocks that never report this one
+            .filter(pl.col("value").is_not_null().any().over("symbol"))
+            .collect()
+        )
 
-                df_daily = df_business_days.join(
-                    sorted_df,
-                    left_on="date",
-                    right_on="closest_filing_date",
-                    how="left",
-                ).select([pl.col("date"), pl.all().exclude("date").forward_fill()])
+        if long_df.height > 0:
+            # TODO: [MAYCAP-8] Find out why some stocks have more than one filing on the same date, for now
+            # the first is kept per (date, symbol) before the TTM so the window is four distinct quarters
+            long_df = (
+                long_df.unique(subset=["date", "symbol"], keep="first", maintain_order=True)
+                .sort(["symbol", "date"], maintain_order=True)
+            )
 
-                # Rename col
-                df_daily = df_daily.rename(
-                    {
-                        field: stock_symbol,
-                    }
+            # Apply TTM if we need/want it
+            if field in TTM_FIELDS and period == "quarterly":
+                # TODO: add more checks that sequential etc.
+                long_df = long_df.with_columns(
+                    pl.col("value").rolling_sum(window_size=4, min_periods=4).over("symbol")
                 )
 
-                field_data_store.append(df_daily)
-
-        if len(field_data_store) > 0:
-            merged_df = field_data_store[0]
-            for df in field_data_store[1:]:
-                merged_df = merged_df.join(df, on="date", how="outer", coalesce=True)
-
-            # DILUTED NOS:
-            #                       A          AAL  ...        ZBRA          ZTS
-            # date                                  ...
-            # 2015-02-27  338000000.0  737100000.0  ...  51251000.0  501610000.0
-            # 2023-07-26  297000000.0  718890000.0  ...  51748069.0  464600000.0
-            # 2024-07-25  294000000.0  720712000.0  ...  51790501.0  458800000.0
-            # 2024-07-25  294000000.0  720712000.0  ...  51790501.0  458800000.0
-            # 2024-07-25  294000000.0  720712000.0  ...  51790501.0  458800000.0
-            # 2024-07-25  294000000.0  720712000.0  ...  51790501.0  458800000.0
-            # 2024-07-25  294000000.0  720712000.0  ...  51790501.0  458800000.0
+            # Filings land on any day, move each to the session it's first tradeable on so weekend and holiday
+            # filings aren't lost joining onto the calendar, if two land on the same session the later one wins
+            calendar = TradingCalendar.from_store(self.data_store)
+            long_df = (
+                long_df.with_columns(calendar.next_session(long_df["date"], inclusive=True))
+                .drop_nulls("date")
+                .unique(subset=["date", "symbol"], keep="last", maintain_order=True)
+            )
 
-            no_duplicates_df = merged_df.unique(
-                keep="first", subset="date"
-            )  # TODO: [MAYCAP-8] This isn't causing any issues as the data checks out,
-            # but valuable to know why and how the duplicates are being introduced
+            filings_df = pivot_long_panel(long_df, "value")
 
-            return no_duplicates_df.sort(by="date")
+            # Stocks with a later first filing just stay null until it, as they did on their own grid
+            return calendar.forward_fill_onto(filings_df)
+        return None
 
     def build_single_field_frames(self, period):
         processed_data = {}
         for field in data_field_map.keys():
             processed_data[field] = self._get_single_stock_field_daily(period, field)
+            if processed_data[field] is None:
+                # Still write the file, so the stage's outputs exist and it isn't rerun every time
+                logging.warning(
+                    f"No {period} statements report {field}, writing {data_field_map[field]} with no symbols"
+                )
+                processed_data[field] = TradingCalendar.from_store(self.data_store).grid()
 
         for data_name, data_data in processed_data.items():
             data_nice_name = data_field_map[data_name]
@@ -235,44 +230,40 @@ class FinancialDataProcessor:
             )
         return processed_data
 
-    def _find_common_dates_and_columns(
-        self, dataframes: list[pl.DataFrame]
-    ) -> tuple[pl.Series, list[str]]:
-        all_dates = []
-        all_columns = []
-        for df in dataframes:
-            # Force date column to no timestamp
-
-            df_date = df.with_columns(pl.col("date").dt.date().alias("date"))
-            # Get unique dates from the current DataFrame
-            all_dates.extend(df_date["date"].to_list())
-            all_columns.extend(df.columns)
-
-        unique_dates = sorted(list(set(all_dates)))
-        unique_columns = sorted(
-            list(set(list([x for x in all_columns if x != "date"])))
-        )
-        return unique_dates, unique_columns  #
-
-    def _reindex_dataframes_to_base(
-        self, dataframes_dict, common_dates: pl.Series, common_columns: list[str]
-    ) -> list[pl.DataFrame]:
-        # Parse to pandas first
-        base_frame = (
-            self.data_store.read_parquet("core_data", "base_frame.parquet")
-            .to_pandas()
-            .set_index("date")
-        )
+    def _reindex_dataframes_to_base(self, dataframes_dict) -> dict[str, pl.DataFrame]:
+        """Conform every frame to the base frame's dates and symbols, null wherever a frame has no value.
+
+        One lazy left join per frame onto the base dates, all collected together, rather than a round trip through
+        pandas reindex_like. Like reindex_like, symbols the base frame doesn't have are dropped.
+        """
+        base_frame = self.data_store.scan("core_data", "base_frame.parquet")
+        base_schema = base_frame.collect_schema()
+        base_symbols = [col for col in base_schema.names() if col != "date"]
+        base_dates = base_frame.select("date")
+
         reindexed_frames = {}
         for dataframe_name, dataframe in dataframes_dict.items():
-
-            pandas_df = dataframe.to_pandas().set_index("date")
-            reindexed_df = pl.from_pandas(
-                pandas_df.reindex_like(base_frame).reset_index()
+            columns = set(dataframe.columns)
+            reindexed_frames[dataframe_name] = (
+                base_dates.join(
+                    dataframe.lazy().with_columns(pl.col("date").cast(base_schema["date"])),
+                    on="date",
+                    how="left",
+                    validate="m:1",  # reindex_like refused duplicate dates too, rather than silently adding rows
+                )
+                .select(
+                    "date",
+                    *[
+                        pl.col(symbol) if symbol in columns else pl.lit(None, dtype=pl.Float64).alias(symbol)
+                        for symbol in base_symbols
+                    ],
+                )
+                # The pandas round trip turned NaN into null, keep it that way
+                .with_columns(pl.col(pl.Float32, pl.Float64).fill_nan(None))
             )
-            reindexed_frames[dataframe_name] = reindexed_df
 
-        return reindexed_frames
+        collected = pl.collect_all(list(reindexed_frames.values()))
+        return dict(zip(reindexed_frames, collected))
 
     def standardise_data(self, processed_dir, financials_dir, period, markets_dir):
         self.read_all_data_to_clean(processed_dir, financials_dir, period, markets_dir)
@@ -289,14 +280,7 @@ class FinancialDataProcessor:
 
             timseries_data_dict = {k:v for k,v in all_data_dict.items() if k in timeseries_data_keys}
 
-            # Pass the combined list to the function
-            unique_dates, unique_columns = self._find_common_dates_and_columns(
-                timseries_data_dict.values()
-                )
-
-            financial_data_dict = self._reindex_dataframes_to_base(
-                timseries_data_dict, unique_dates, unique_columns
-            )
+            financial_data_dict = self._reindex_dataframes_to_base(timseries_data_dict)
 
             for data_name, data in financial_data_dict.items():
                 # Now just save into local store, to make loading ez
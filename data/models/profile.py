@@ -1,5 +1,6 @@
 import polars as pl
 from data.models.general import GenericDataHandler
+from data.models.decoding import decode_records, PROFILE_SCHEMA
 
 
 class ProfileDataHandler(GenericDataHandler):
@@ -15,9 +16,9 @@ class ProfileDataHandler(GenericDataHandler):
             interval="profile", symbol=symbol, api_key=self.api_key
         )
 
-    def process_response(self, data):
-        """Process the raw API response and convert it to a Polars DataFrame."""
-        return pl.DataFrame(data)
+    def process_response(self, raw):
+        """Decode the raw API response into a Polars DataFrame with the declared profile schema."""
+        return decode_records(raw, PROFILE_SCHEMA)
 
     def update_profile_data(self):
         """Run the async gathering and storing process for profile data."""
@@ -26,18 +27,12 @@ class ProfileDataHandler(GenericDataHandler):
     def combine_and_save_all_profiles(self):
         """Combine all profile data and save it."""
         if "profiles" not in self.data_cache:
-            self.read_raw_data()
+            self.read_raw_data("profiles")
 
-        # Apply schema to all profile data
-        schema = self.data_cache["profiles"]["profiles_MCD"].schema
-        self.data_cache["profiles"] = self.apply_schema_to_frames(
-            schema, self.data_cache["profiles"]
-        )
-
-        # Concatenate all profiles
-        combined_frame = self.concat_frames(self.data_cache["profiles"])
+        # Profiles are decoded against PROFILE_SCHEMA, so files only differ where older ones predate it
+        frames = [frame_data["data"] for frame_data in self.data_cache["profiles"].values()]
+        combined_frame = pl.concat(frames, how="diagonal_relaxed")
 
         # Save combined profiles
-        return self.save_processed_data(
-            combined_frame, "processed/market_data", "all_profiles.parquet"
-        )
+        self.data_store.write_parquet(combined_frame, "processed/market_data", "all_profiles.parquet")
+        return combined_frame
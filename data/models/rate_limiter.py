@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+
+class TokenBucketRateLimiter:
+    """Async token bucket counted in requests per minute, shared by everything using one DataGatherer."""
+
+    def __init__(self, requests_per_minute: int, burst: Optional[int] = None):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.requests_per_minute = requests_per_minute
+        self.rate = requests_per_minute / 60.0  # tokens per second
+        # Default burst is roughly a second's worth of budget, so we never dump a whole minute at once
+        self.burst = burst or max(1, requests_per_minute // 60)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._epoch = 0  # Bumped on every pause so queued reservations know to re-queue
+
+    def _reserve(self) -> float:
+        """Take a token (possibly going into debt) and return how long the caller must wait for it."""
+        now = time.monotonic()
+        if now > self._last:
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+        self._tokens -= 1
+        # _last can sit in the future while paused, tokens only start refilling from there
+        return (self._last - now) + max(0.0, -self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Wait until a request is allowed to go out."""
+        while True:
+            epoch = self._epoch
+            delay = self._reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if epoch == self._epoch:
+                return
+            # A 429 landed while we were queued and wiped the queue, take a fresh slot after the pause
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds`. Overlapping pauses are merged, so a burst of 429s backs off once."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            # Already backing off, 429s from requests that were in flight don't stack up
+            return
+        logging.warning(f"Rate limit hit, pausing all requests for {seconds} seconds.")
+        self._paused_until = now + seconds
+        self._last = self._paused_until
+        self._tokens = 0.0
+        self._epoch += 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
@@ -0,0 +1,92 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+import pandas as pd
+import polars as pl
+
+
+def _frame_bytes(value: Any) -> int:
+    if isinstance(value, tuple):
+        return sum(_frame_bytes(item) for item in value)
+    if isinstance(value, pl.DataFrame):
+        return value.estimated_size()
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    return 0
+
+
+def _copy_if_mutable(value: Any) -> Any:
+    # Polars frames are immutable so can be shared, pandas ones would let one caller corrupt the cached copy
+    if isinstance(value, tuple):
+        return tuple(_copy_if_mutable(item) for item in value)
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class ReadCache:
+    """In-process LRU cache of frames read from the store, bounded by their in-memory size.
+
+    Keys include the file's mtime and size, so a rewritten file is never served stale.
+    """
+
+    def __init__(self, max_bytes: int = 1024**3):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_if_mutable(self._entries[key][0])
+            self.misses += 1
+
+        # Load outside the lock so other threads aren't held up behind a slow read
+        value = loader()
+        size = _frame_bytes(value)
+        if value is None or size > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self.current_bytes += size
+                while self.current_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self.current_bytes -= evicted_size
+                    self.evictions += 1
+        return _copy_if_mutable(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        logging.info(
+            f"Read cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+            f"{stats['entries']} entries, {stats['bytes'] / 1024**2:.1f}/{stats['max_bytes'] / 1024**2:.0f} MB"
+        )
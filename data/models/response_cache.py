@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from constants import ROOT_DIR
+
+# Seconds a cached response stays fresh, keyed by FMP endpoint
+DEFAULT_TTLS = {
+    "historical-price-full": 12 * 60 * 60,
+    "historical-market-capitalization": 12 * 60 * 60,
+    "profile": 7 * 24 * 60 * 60,
+    "financial-statement-full-as-reported": 24 * 60 * 60,
+    "sec_filings": 24 * 60 * 60,
+    "sp500_constituent": 24 * 60 * 60,
+}
+DEFAULT_TTL = 24 * 60 * 60
+
+HEADER = struct.Struct("<d")  # When the response was fetched, ahead of the compressed body
+
+
+class ResponseCache:
+    """On-disk cache of raw API responses, keyed by URL with the API key stripped.
+
+    Entries are zlib compressed, expire per endpoint, and the least recently used ones are evicted once the
+    cache grows past max_bytes. In offline mode every entry is served regardless of age and misses never hit the
+    network.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = os.path.join(ROOT_DIR, "data", "http_cache"),
+        ttls: Optional[Dict[str, int]] = None,
+        max_bytes: int = 2 * 1024**3,
+        offline: bool = False,
+        compression_level: int = 6,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.compression_level = compression_level
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Sized lazily, the first write scans the directory once
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def normalise_url(url: str) -> str:
+        """Drop the apikey so keys are shareable and never leak the secret to disk."""
+        parts = urlsplit(url)
+        query = [(k, v) for k, v in parse_qsl(parts.query) if k.lower() != "apikey"]
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    @staticmethod
+    def endpoint(url: str) -> str:
+        # e.g. /api/v3/historical-price-full/AAPL -> historical-price-full
+        path_parts = [part for part in urlsplit(url).path.split("/") if part]
+        return path_parts[2] if len(path_parts) > 2 else path_parts[-1]
+
+    def _path(self, url: str) -> Path:
+        key = hashlib.sha256(self.normalise_url(url).encode()).hexdigest()
+        return self.cache_dir / key[:2] / f"{key}.zz"
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Return the cached body for url, or None if it's missing or stale."""
+        path = self._path(url)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        (fetched_at,) = HEADER.unpack_from(payload)
+        ttl = self.ttls.get(self.endpoint(url), DEFAULT_TTL)
+        if not self.offline and time.time() - fetched_at > ttl:
+            self.misses += 1
+            return None
+
+        # mtime tracks last use, which is what eviction orders by
+        os.utime(path)
+        self.hits += 1
+        return zlib.decompress(payload[HEADER.size:])
+
+    def put(self, url: str, raw: bytes) -> None:
+        path = self._path(url)
+        path.parent.mkdir(exist_ok=True)
+        payload = HEADER.pack(time.time()) + zlib.compress(raw, self.compression_level)
+
+        # Write then rename, so a crash mid-write never leaves a truncated entry behind
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        previous_size = path.stat().st_size if path.exists() else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*/*.zz"))
+            else:
+                self._total_bytes += len(payload) - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until we're back under 90% of the cap."""
+        entries = sorted(
+            ((p.stat().st_mtime, p.stat().st_size, p) for p in self.cache_dir.glob("*/*.zz")),
+            key=lambda entry: entry[0],
+        )
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                path.unlink()
+                self._total_bytes -= size
+            except FileNotFoundError:
+                pass
+        logging.info(f"Evicted response cache down to {self._total_bytes / 1024**2:.1f} MB")
@@ -0,0 +1,165 @@
+import logging
+from datetime import date, timedelta
+from typing import List, Sequence, Union
+
+import polars as pl
+
+from data.models.general import _partition_year
+
+RETURN_HORIZONS = (1, 5, 21, 63, 252)  # trading days: day, week, month, quarter, year
+
+
+class ReturnsEngine:
+    """Simple and log returns over several horizons for every symbol, kept as a long (date, symbol) dataset.
+
+    Horizons count rows, i.e. trading days each symbol actually has prices for, like pct_change does.
+    update() only prices the new rows, using just enough history behind them for the longest horizon.
+    """
+
+    def __init__(
+        self,
+        data_store,
+        prices_endpoint: str = "prices",
+        price_column: str = "adjClose",
+        horizons: Sequence[int] = RETURN_HORIZONS,
+        endpoint: str = "returns",
+    ):
+        self.data_store = data_store
+        self.prices_endpoint = prices_endpoint
+        self.price_column = price_column
+        self.horizons = tuple(sorted(horizons))
+        self.endpoint = endpoint
+
+    def compute(self, prices: Union[pl.DataFrame, pl.LazyFrame]) -> pl.LazyFrame:
+        """Every horizon's simple and log return from long (date, symbol, price) rows, in one vectorised pass.
+
+        Rows are sorted by symbol then date and shifted as one column, a row only gets an h day return when
+        its symbol has at least h earlier rows, so returns never straddle two symbols.
+        """
+        price = pl.col(self.price_column)
+        log_price = price.log()
+        row = pl.col("_row")
+        return (
+            prices.lazy()
+            .select("date", "symbol", self.price_column)
+            .sort(["symbol", "date"])
+            .with_columns(pl.int_range(pl.len()).over("symbol").alias("_row"))
+            .with_columns(
+                [pl.when(row >= h).then(price.diff(h) / price.shift(h)).alias(f"return_{h}d") for h in self.horizons]
+                + [pl.when(row >= h).then(log_price.diff(h)).alias(f"log_return_{h}d") for h in self.horizons]
+            )
+            .drop("_row")
+        )
+
+    def build(self) -> int:
+        """Recompute returns over the full price history and overwrite the stored dataset."""
+        returns = self.compute(self.data_store.scan_dataset(self.prices_endpoint, columns=[self.price_column]))
+        returns = returns.collect()
+        self.data_store.write_dataset(returns, self.endpoint, mode="overwrite")
+        return returns.height
+
+    def _last_stored_date(self):
+        dataset_key = self.data_store._dataset_key(self.endpoint)
+        partitions = self.data_store.storage.list_recursive(dataset_key, ".parquet")
+        if not partitions:
+            return None
+        # Only the newest partition can hold the last date
+        latest_year = max(_partition_year(key) for key in partitions)
+        return (
+            self.data_store.scan_dataset(self.endpoint, columns=[], start_date=date(latest_year, 1, 1))
+            .select(pl.col("date").max())
+            .collect()
+            .item()
+        )
+
+    def update(self) -> int:
+        """Append returns for price rows newer than the stored returns, returning how many rows were added.
+
+        Only the new rows plus a lookback tail are read and priced. If the stored prices at the tail have
+        moved (e.g. re-adjusted for a split or dividend) the history is stale, so it falls back to build().
+        Symbols whose history up to the last stored date isn't what their returns were built from (new to the
+        universe with back history, or extended backwards) get their full history priced instead.
+        """
+        last_date = self._last_stored_date()
+        if last_date is None:
+            logging.info(f"No stored {self.endpoint}, building from the full price history")
+            return self.build()
+
+        stale_symbols = self._stale_symbols(last_date)
+
+        longest = self.horizons[-1]
+        # Calendar days comfortably covering the longest horizon in trading days, holidays and all
+        tail_start = last_date - timedelta(days=longest * 2)
+        prices = self.data_store.read_dataset(self.prices_endpoint, columns=[self.price_column], start_date=tail_start)
+
+        new_prices = prices.filter(pl.col("date") > last_date, ~pl.col("symbol").is_in(stale_symbols))
+        if new_prices.height == 0 and not stale_symbols:
+            logging.info(f"{self.endpoint} already up to date to {last_date}")
+            return 0
+
+        history = prices.filter(pl.col("date") <= last_date)
+        if not self._history_unchanged(history.filter(pl.col("date") == last_date), last_date):
+            logging.info(f"Prices on {last_date} have changed since {self.endpoint} were built, rebuilding")
+            return self.build()
+
+        appended = []
+        if new_prices.height > 0:
+            # The longest horizon's worth of rows behind the new ones, per symbol
+            symbols = new_prices["symbol"].unique()
+            tail = history.filter(
+                pl.col("symbol").is_in(symbols),
+                pl.col("date").rank("ordinal", descending=True).over("symbol") <= longest,
+            )
+            appended.append(
+                self.compute(pl.concat([tail, new_prices], how="vertical_relaxed"))
+                .filter(pl.col("date") > last_date)
+                .collect()
+            )
+        if stale_symbols:
+            logging.info(
+                f"Pricing the full history of {len(stale_symbols)} symbols new or changed in {self.prices_endpoint}"
+            )
+            appended.append(
+                self.compute(
+                    self.data_store.read_dataset(
+                        self.prices_endpoint, columns=[self.price_column], symbols=stale_symbols
+                    )
+                ).collect()
+            )
+
+        appended = pl.concat(appended, how="vertical_relaxed")
+        self.data_store.write_dataset(appended, self.endpoint, mode="upsert")
+        return appended.height
+
+    def _coverage(self, endpoint: str, last_date) -> pl.LazyFrame:
+        return (
+            self.data_store.scan_dataset(endpoint, columns=[], end_date=last_date)
+            .group_by("symbol")
+            .agg(pl.len().alias("rows"))
+        )
+
+    def _stale_symbols(self, last_date) -> List[str]:
+        """Symbols whose prices up to last_date don't line up row for row with their stored returns.
+
+        compute() keeps a row per price row, so a symbol missing from the returns or with a different row count
+        (back history added or backfilled) needs its whole history priced, the tail alone would skip it.
+        """
+        prices, stored = pl.collect_all([
+            self._coverage(self.prices_endpoint, last_date), self._coverage(self.endpoint, last_date)
+        ])
+        compared = prices.join(stored, on="symbol", how="left", suffix="_stored")
+        return compared.filter(pl.col("rows").ne_missing(pl.col("rows_stored")))["symbol"].sort().to_list()
+
+    def _history_unchanged(self, last_prices: pl.DataFrame, last_date) -> bool:
+        """True if the closes the stored returns end on are still the closes in the price history.
+
+        Like the incremental fetch, one settled date is enough to spot a re-adjustment for splits and dividends,
+        those rewrite every earlier adjusted close.
+        """
+        stored = self.data_store.read_dataset(
+            self.endpoint, columns=[self.price_column], start_date=last_date, end_date=last_date
+        )
+        compared = last_prices.join(stored, on=["date", "symbol"], how="inner", suffix="_stored")
+        return compared.height == stored.height and compared.select(
+            (pl.col(self.price_column) == pl.col(f"{self.price_column}_stored")).all()
+        ).item()
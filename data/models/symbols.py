@@ -1,25 +1,60 @@
+import json
+import logging
+import os
 import requests
-from _secrets import FMP_API_KEY
+from constants import ROOT_DIR
 import time
 
-URL = f"https://financialmodelingprep.com/api/v3/sp500_constituent?apikey={FMP_API_KEY}"
+URL = "https://financialmodelingprep.com/api/v3/sp500_constituent?apikey={api_key}"
+CACHE_PATH = os.path.join(ROOT_DIR, "data", "sp500_symbols.json")
+CACHE_TTL = 24 * 60 * 60  # Constituents change a handful of times a year, once a day is plenty
 
 
-def get_sp500_symbols():
+def fetch_sp500_symbols(max_attempts=5):
+    # Only needed when we actually hit the API, so stores that just read never need the key
+    from _secrets import FMP_API_KEY
+
+    attempt = 0
     while True:
+        attempt += 1
         try:
-            response = requests.get(URL)
+            response = requests.get(URL.format(api_key=FMP_API_KEY), timeout=30)
             if response.status_code == 200:
                 data = response.json()
                 return [item["symbol"] for item in data]
             else:
                 response.raise_for_status()
         except requests.exceptions.HTTPError as e:
-            if response.status_code == 429:  # Too Many Requests
+            if response.status_code == 429 and attempt < max_attempts:  # Too Many Requests
                 print("Rate limit hit, retrying in 10 seconds...")
                 time.sleep(10)
             else:
                 raise e  # For other HTTP errors, re-raise the exception
         except requests.exceptions.RequestException as e:
+            if attempt >= max_attempts:
+                raise e
             print(f"An error occurred: {e}")
             time.sleep(10)  # Retry after 10 seconds for other errors
+
+
+def get_sp500_symbols(cache_path=CACHE_PATH, ttl=CACHE_TTL):
+    """S&P 500 constituents, served from the on-disk cache while it's fresh and only fetched when it's stale."""
+    cached = None
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if time.time() - cached["fetched_at"] < ttl:
+            return cached["symbols"]
+
+    try:
+        # With a stale list to fall back on, don't sit through the retry loop
+        symbols = fetch_sp500_symbols(max_attempts=1 if cached else 5)
+    except requests.exceptions.RequestException as e:
+        if cached is None:
+            raise e
+        logging.warning(f"Could not refresh S&P 500 constituents, using cached list. Error: {e}")
+        return cached["symbols"]
+
+    with open(cache_path, "w") as f:
+        json.dump({"fetched_at": time.time(), "symbols": symbols}, f)
+    return symbols
@@ -1,6 +1,15 @@
 import numpy as np
 import polars as pl
 from collections import defaultdict
+from data.models.panel import PanelStore
+
+# Panel columns the factor model uses, and what it calls them
+TORIKANO_RATIO_COLUMNS = {
+    "ptb": "book_price",
+    "stp": "sales_price",
+    "cftp": "cf_price",
+    "market_cap": "market_cap",
+}
 
 
 class TorikanoDataProcessor:
@@ -29,50 +38,27 @@ class TorikanoDataProcessor:
             values="indicator",
         )
 
-        binary_df = binary_df.fill_null(0)
+        binary_df = self.data_store.dtype_policy.apply(binary_df.fill_null(0))
         self.sectors = binary_df
         return binary_df
 
-    def build_returns_df(self):
-        returns = self.data_store.read_parquet("core_data", "total_return.parquet")
-        returns_melted = self.melt_data_and_rename(returns, "asset_returns")
+    def scan_panel(self, columns, start_date=None):
+        """Lazily scan panel columns (via its IPC mirror) already in long (date, symbol) form, renamed as we use them."""
+        panel = PanelStore(self.data_store).scan(list(columns), start_date=start_date)
+        return panel.rename(columns)
 
-        self.asset_returns = returns_melted
-        return returns_melted
+    def build_returns_df(self, start_date=None):
+        returns = self.scan_panel({"total_return": "asset_returns"}, start_date)
 
-    def melt_data_and_rename(self, dataframe, value_column_name):
-        metled_frame = dataframe.melt(id_vars="date")
-        metled_frame = metled_frame.rename(
-            {"variable": "symbol", "value": value_column_name}
-        )
-        return metled_frame
-
-    def build_ratio_dfs(self):
-        ptb = self.data_store.read_parquet("core_data", "ptb.parquet")
-        ptb_melt = self.melt_data_and_rename(ptb, "book_price")
-        stp = self.data_store.read_parquet("core_data", "stp.parquet")
-        stp_melt = self.melt_data_and_rename(stp, "sales_price")
-        cftp = self.data_store.read_parquet("core_data", "cftp.parquet")
-        cftp_melt = self.melt_data_and_rename(cftp, "cf_price")
-        mkt_cap = self.data_store.read_parquet("core_data", "marketcap.parquet")
-        mkt_cap_melt = self.melt_data_and_rename(mkt_cap, "market_cap")
+        self.asset_returns = returns
+        return returns
 
+    def build_ratio_dfs(self, start_date=None):
         return {
-            "ptb": ptb_melt,
-            "stp": stp_melt,
-            "cftp": cftp_melt,
-            "market_cap": mkt_cap_melt,
+            name: self.scan_panel({name: column}, start_date)
+            for name, column in TORIKANO_RATIO_COLUMNS.items()
         }
 
-    def combine_all_data(self, ptb, stp, cfp, mkt_cap, asset_returns):
-        # Join all DataFrames on 'date' and 'symbol'
-        combined_df = ptb.join(stp, on=["date", "symbol"], how="left")
-        combined_df = combined_df.join(cfp, on=["date", "symbol"], how="left")
-        combined_df = combined_df.join(mkt_cap, on=["date", "symbol"], how="left")
-        combined_df = combined_df.join(asset_returns, on=["date", "symbol"], how="left")
-
-        return combined_df
-
     def fill_nan(
         self, df: pl.DataFrame | pl.LazyFrame, columns: tuple[str, ...], sort_col: str
     ):
@@ -120,7 +106,7 @@ class TorikanoDataProcessor:
         """
         try:
             # eagerly check all `features`, `sort_col`, `over_col` present: can't catch ColumNotFoundError in lazy context
-            assert all(c in df.columns for c in features + (sort_col, over_col))
+            assert all(c in df.collect_schema().names() for c in features + (sort_col, over_col))
             return (
                 df.lazy()
                 .with_columns([pl.col(f).cast(float).alias(f) for f in features])
@@ -159,12 +145,9 @@ class TorikanoDataProcessor:
             ) from e
 
     def build_required_data(self, start_date):
-        returns = self.build_returns_df()
-        ratios = self.build_ratio_dfs()
-        all_data = self.combine_all_data(
-            ratios["ptb"], ratios["stp"], ratios["cftp"], ratios["market_cap"], returns
-        )
-        filtered_df = all_data.filter(pl.col("date") >= start_date)
+        # Every field is already a column of the long panel, so this is one lazy scan with the date filter
+        # pushed down, rather than a melt per wide frame joined back together on (date, symbol)
+        filtered_df = self.scan_panel({**TORIKANO_RATIO_COLUMNS, "total_return": "asset_returns"}, start_date)
         filtered_df = self.sanitise_data_types(
             filtered_df,
             features=(
@@ -177,5 +160,6 @@ class TorikanoDataProcessor:
             sort_col="date",
             over_col="symbol",
             fill_cols=("book_price", "sales_price", "cf_price", "market_cap"),
-        ).collect()
+        )
+        filtered_df = filtered_df.collect(streaming=True)
         return filtered_df
@@ -0,0 +1,102 @@
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+import polars as pl
+
+# One calendar per (store, prices endpoint), rebuilt only when the stored prices change
+_CALENDARS: Dict[Tuple[str, str], Tuple[tuple, "TradingCalendar"]] = {}
+_CALENDARS_LOCK = threading.Lock()
+
+
+class TradingCalendar:
+    """The sessions the market actually traded, taken from the dates we hold prices for.
+
+    Every daily grid and forward fill should come from here, so derived frames all share one date index.
+    Helpers take a Series of dates and return one.
+    """
+
+    def __init__(self, sessions: pl.Series):
+        self.sessions = sessions.cast(pl.Date).unique().sort().rename("date")
+
+    @classmethod
+    def from_store(cls, data_store, endpoint: str = "prices") -> "TradingCalendar":
+        """The calendar of the stored price dataset, cached per process until any of its partitions change."""
+        dataset_key = data_store._dataset_key(endpoint)
+        storage = data_store.storage
+        fingerprint = tuple((key, storage.stat(key)) for key in storage.list_recursive(dataset_key, ".parquet"))
+        if not fingerprint:
+            raise ValueError(f"No stored {endpoint} dataset to build a trading calendar from")
+
+        cache_key = (data_store.folder_path, endpoint)
+        with _CALENDARS_LOCK:
+            cached = _CALENDARS.get(cache_key)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+
+        sessions = data_store.scan_dataset(endpoint, columns=[]).select(pl.col("date").unique()).collect()["date"]
+        calendar = cls(sessions)
+        logging.info(f"Built trading calendar of {len(calendar)} sessions from {calendar.first} to {calendar.last}")
+        with _CALENDARS_LOCK:
+            _CALENDARS[cache_key] = (fingerprint, calendar)
+        return calendar
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    @property
+    def first(self) -> date:
+        return self.sessions[0]
+
+    @property
+    def last(self) -> date:
+        return self.sessions[-1]
+
+    def grid(self, start: Optional[date] = None, end: Optional[date] = None) -> pl.DataFrame:
+        """Every session in [start, end] as a one column "date" frame, to join daily data onto."""
+        sessions = self.sessions
+        # Bounds are often datetimes (DATA_START_DATE), sessions are dates
+        start = start.date() if isinstance(start, datetime) else start
+        end = end.date() if isinstance(end, datetime) else end
+        if start is not None:
+            sessions = sessions.filter(sessions >= start)
+        if end is not None:
+            sessions = sessions.filter(sessions <= end)
+        return sessions.to_frame()
+
+    def next_session(self, dates: pl.Series, inclusive: bool = False) -> pl.Series:
+        """The first session after each date, or on it with inclusive=True. Null past the last session."""
+        index = self.sessions.search_sorted(dates, side="left" if inclusive else "right")
+        return self._sessions_at(index).rename(dates.name)
+
+    def _sessions_at(self, index: pl.Series) -> pl.Series:
+        in_range = (index >= 0) & (index < len(self.sessions))
+        # gather needs valid positions, out of range ones are pointed at 0 and nulled afterwards
+        return (
+            pl.DataFrame({"index": index, "in_range": in_range})
+            .select(
+                pl.when(pl.col("in_range"))
+                .then(pl.lit(self.sessions).gather(pl.when(pl.col("in_range")).then(pl.col("index")).otherwise(0)))
+                .alias("date")
+            )
+            .to_series()
+        )
+
+    def forward_fill_onto(
+            self, df: pl.DataFrame, date_column: str = "date", start: Optional[date] = None, end: Optional[date] = None
+    ) -> pl.DataFrame:
+        """Spread a frame of irregular session dates (e.g. filings) onto the daily grid and forward fill it.
+
+        Rows dated off the calendar would be lost by the join, snap them with next_session first.
+        Grid starts at the frame's first date unless start is given.
+        """
+        if df.height == 0:
+            return df
+        start = start if start is not None else df[date_column].min()
+        return (
+            self.grid(start, end)
+            .rename({"date": date_column})
+            .join(df, on=date_column, how="left")
+            .select([pl.col(date_column), pl.all().exclude(date_column).forward_fill()])
+        )
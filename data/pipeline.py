@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class Stage:
+    """A processing step and the store-relative files/directories it reads and writes."""
+
+    def __init__(self, name: str, func: Callable, inputs: List[str], outputs: List[str]):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.outputs = outputs
+
+    def depends_on(self, other: "Stage") -> bool:
+        """True if any of our inputs is, contains, or sits inside one of the other stage's outputs."""
+        return any(
+            _overlaps(input_path, output_path)
+            for input_path in self.inputs
+            for output_path in other.outputs
+        )
+
+
+def _overlaps(a: str, b: str) -> bool:
+    a, b = os.path.normpath(a), os.path.normpath(b)
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+class PipelineRunner:
+    """Runs stages in dependency order, in parallel where they're independent, skipping any whose inputs
+    haven't changed since their last successful run.
+    """
+
+    def __init__(self, folder_path: str, stages: List[Stage], max_workers: int = 4, force: bool = False):
+        self.folder_path = folder_path
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers
+        self.force = force
+        self.state_path = os.path.join(folder_path, "pipeline_state.json")
+        self.state = self._load_state()
+        self._lock = threading.Lock()
+
+        self.dependencies = {
+            stage.name: {other.name for other in stages if other is not stage and stage.depends_on(other)}
+            for stage in stages
+        }
+
+    def _load_state(self) -> Dict[str, str]:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self) -> None:
+        with self._lock:
+            with open(self.state_path, "w") as f:
+                json.dump(self.state, f, indent=2)
+
+    def fingerprint(self, paths: List[str]) -> str:
+        """Hash of (path, size, mtime) for every file under paths. Stat only, so cheap even on big directories."""
+        digest = hashlib.sha256()
+        for path in sorted(paths):
+            full_path = os.path.join(self.folder_path, path)
+            if os.path.isdir(full_path):
+                files = sorted(
+                    os.path.join(root, name) for root, _, names in os.walk(full_path) for name in names
+                )
+            else:
+                files = [full_path]
+            for file in files:
+                if os.path.exists(file):
+                    stat = os.stat(file)
+                    digest.update(f"{file}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+                else:
+                    digest.update(f"{file}|missing".encode())
+        return digest.hexdigest()
+
+    def _is_up_to_date(self, stage: Stage, fingerprint: str) -> bool:
+        outputs_exist = all(os.path.exists(os.path.join(self.folder_path, path)) for path in stage.outputs)
+        return not self.force and outputs_exist and self.state.get(stage.name) == fingerprint
+
+    def _run_stage(self, stage: Stage) -> bool:
+        """Run a stage if needed, returns whether it actually ran."""
+        fingerprint = self.fingerprint(stage.inputs)
+        if self._is_up_to_date(stage, fingerprint):
+            logging.info(f"Skipping stage {stage.name}: inputs unchanged")
+            return False
+
+        logging.info(f"Running stage {stage.name}")
+        stage.func()
+        with self._lock:
+            self.state[stage.name] = fingerprint
+        self._save_state()
+        return True
+
+    def run(self) -> Dict[str, str]:
+        """Run every stage, returns each stage's outcome: ran, skipped, failed or blocked."""
+        outcomes = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(outcomes) < len(self.stages):
+                scheduled = True
+                while scheduled:
+                    # Keep passing over the stages, blocking one can settle others further down the graph
+                    scheduled = False
+                    for name, stage in self.stages.items():
+                        if name in outcomes or name in running.values():
+                            continue
+                        upstream = self.dependencies[name]
+                        if any(outcomes.get(dep) in ("failed", "blocked") for dep in upstream):
+                            logging.error(f"Not running stage {name}: an upstream stage failed")
+                            outcomes[name] = "blocked"
+                            scheduled = True
+                        elif all(dep in outcomes for dep in upstream):
+                            running[executor.submit(self._run_stage, stage)] = name
+                            scheduled = True
+
+                if not running:
+                    if len(outcomes) < len(self.stages):
+                        raise ValueError(f"Stages have a dependency cycle: {set(self.stages) - set(outcomes)}")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        outcomes[name] = "ran" if future.result() else "skipped"
+                    except Exception as e:
+                        logging.error(f"Stage {name} failed: {e}")
+                        outcomes[name] = "failed"
+        return outcomes
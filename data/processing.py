@@ -1,73 +1,113 @@
-from data.models.processed_financials import FinancialDataProcessor
+import os
+from data.models.processed_financials import FinancialDataProcessor, data_field_map
 import click
+import polars as pl
 from data.models.general import DataGatherer, DataStore
-from _secrets import FMP_API_KEY
-from data.models.ratios import AccountingRatioBuilder
+from data.models.dtype_policy import DtypePolicy, FLOAT32_FRAMES
+from data.models.panel import PanelStore, PANEL_FIELDS
+from data.models.returns import ReturnsEngine
 from data.models.prices import PricesDataHandler
 from data.models.profile import ProfileDataHandler
 from data.models.market_cap import MarketCapDataHandler
+from data.pipeline import PipelineRunner, Stage
 from datetime import datetime as dt
 
-PRE_PROCESS_FINANCIAL_STATEMENTS = True
+FINANCIAL_FIELD_FILES = [f"processed/financials/quarterly/{name}.parquet" for name in data_field_map.values()]
+MARKET_DATA_FILES = [f"processed/market_data/{name}.parquet" for name in ["prices", "total_return", "marketcap"]]
 
 
+def build_stages(data_store, data_gatherer):
+    """Every processing step, with the files it reads and writes so the runner can order and skip them."""
+    prices_data_handler = PricesDataHandler(data_gatherer, data_store, interval="historical-price-full", sub_directory="prices")
+    market_cap_data_handler = MarketCapDataHandler(data_gatherer, data_store, start_date=dt(1990,1, 1), interval="historical-market-capitalization", sub_directory="marketcap_v2")
+    profiles_data_handler = ProfileDataHandler(data_gatherer, data_store)
+    financial_statements_processor = FinancialDataProcessor(data_store)
+    panel_store = PanelStore(data_store)
+    returns_engine = ReturnsEngine(data_store)
+
+    def combine_and_save_all_profiles():
+        profiles_data_handler.read_raw_data("profiles")
+        profiles_data_handler.combine_and_save_all_profiles()
+
+    def standardise_data():
+        financial_statements_processor.standardise_data("processed", "financials", "quarterly", "market_data")
+        # TODO: FIX REVENUE< WHICH IS COMING DOWN AS YTD
+        financial_statements_processor.post_process_financial_data()
+
+    return [
+        Stage("build_price_dataset", lambda: data_store.build_dataset_from_directory("prices", "prices"),
+              inputs=["prices"],
+              outputs=["dataset/prices"]),
+        Stage("build_market_cap_dataset", lambda: data_store.build_dataset_from_directory("marketcap_v2", "marketcap"),
+              inputs=["marketcap_v2"],
+              outputs=["dataset/marketcap"]),
+        # Multi-horizon returns, only the new price rows are priced once the dataset exists. Its one day return
+        # is the processed total_return, and so the panel's
+        Stage("update_returns", returns_engine.update,
+              inputs=["dataset/prices"],
+              outputs=["dataset/returns"]),
+        # The wide frames are pivoted from the datasets rather than re-reading every per-symbol file
+        Stage("build_processed_prices", prices_data_handler.build_processed_prices,
+              inputs=["dataset/prices", "dataset/returns"],
+              outputs=["processed/market_data/prices.parquet", "processed/market_data/total_return.parquet"]),
+        Stage("build_base_frame", prices_data_handler.build_base_frame,
+              inputs=["dataset/prices", "processed/market_data/total_return.parquet"],
+              outputs=["core_data/base_frame.parquet"]),
+        Stage("combine_and_save_all_profiles", combine_and_save_all_profiles,
+              inputs=["profiles"],
+              outputs=["processed/market_data/all_profiles.parquet"]),
+        Stage("build_processed_market_caps", market_cap_data_handler.build_processed_market_caps,
+              inputs=["dataset/marketcap"],
+              outputs=["processed/market_data/marketcap.parquet"]),
+        Stage("add_metadata_to_statements", financial_statements_processor.add_metadata_to_statements,
+              inputs=["financial_statements"],
+              outputs=["dataset/statements"]),
+        # Note: Some stocks dont have data for financials, so we start to drop columns here
+        # For the US, no semi-annual reporting, so quarterly only
+        Stage("build_single_field_frames", lambda: financial_statements_processor.build_single_field_frames("quarterly"),
+              inputs=["dataset/prices", "dataset/statements"],
+              outputs=FINANCIAL_FIELD_FILES),
+        Stage("standardise_data", standardise_data,
+              inputs=["core_data/base_frame.parquet"] + MARKET_DATA_FILES + FINANCIAL_FIELD_FILES,
+              outputs=[f"core_data/{os.path.basename(path)}" for path in MARKET_DATA_FILES + FINANCIAL_FIELD_FILES]
+                      + ["core_data/revenue.parquet"]),
+        # Long (date, symbol) panel of every field, with the accounting ratios as columns
+        Stage("build_panel", panel_store.build,
+              inputs=[f"core_data/{filename}" for filename in PANEL_FIELDS],
+              outputs=["core_data/panel.parquet"]),
+        Stage("build_core_data_mirror", data_store.build_core_data_mirror,
+              inputs=["core_data"],
+              outputs=["ipc_mirror/core_data"]),
+    ]
+
 
 @click.command()
 @click.option('--folder', default='local_store', help='Folder where data files are stored.')
 @click.option('--engine', default='polars', help='Engine to use for reading/writing data (polars or pandas).')
-def process_data(folder, engine):
-    """Process data for a specific field and merge all symbol data."""
-    # Initialize General DataHandlers
-    data_store = DataStore(base_location='data/local_store', engine="polars")
-    data_gatherer = DataGatherer(api_key=FMP_API_KEY, symbols=data_store.symbols, rate_limit=275, data_handler=data_store, max_retries=3)
+@click.option('--force', is_flag=True, default=False, help='Rebuild every stage even if its inputs are unchanged.')
+@click.option('--workers', default=4, help='How many independent stages to run at once.')
+@click.option('--read-cache-mb', default=2048, help='Memory budget for re-used reads within the run, 0 disables it.')
+def process_data(folder, engine, force, workers, read_cache_mb):
+    """Rebuild whichever processing stages new data has touched."""
+    from _secrets import FMP_API_KEY  # Only the CLI needs it, build_stages can be imported without a key
 
-    """"
-    TODO
-    - Prices
-    - Market Cap
-    - Profiles
-    - Financial Statmenets
-    
-    """
+    # Initialize General DataHandlers
+    data_store = DataStore(
+        base_location='data/local_store',
+        engine="polars",
+        read_cache_bytes=read_cache_mb * 1024**2,
+        dtype_policy=DtypePolicy(float32_frames=FLOAT32_FRAMES),
+    )
+    data_gatherer = DataGatherer(api_key=FMP_API_KEY, symbols=None, rate_limit=275, data_handler=data_store, max_retries=3)
 
-    # Initialize Specific DataHandler
-    # PRICES -------------------------------
-    prices_data_handler = PricesDataHandler(data_gatherer, data_store, interval="historical-price-full", sub_directory="price")
-    # # MARKET CAP -------------------------------
-    # market_cap_data_handler = MarketCapDataHandler(data_gatherer, data_store, start_date=dt(1990,1, 1), interval="historical-market-capitalization", sub_directory="marketcap_v2")
-    # # # PROFILES ----------------------------------
-    # profiles_data_handler = ProfileDataHandler(data_gatherer, data_store)
-    # # # FINANCIAL STATEMENTS ----------------------
-    # financial_statements_processor = FinancialDataProcessor(data_store)
-    # # # RATIOS ------------------------------------
-    # ratios = AccountingRatioBuilder(data_store)
-    # #
-    # # # Run post-processing to get in format we want
-    prices_data_handler.read_raw_data("prices")
-    prices_data_handler.build_processed_prices("prices")
-    prices_data_handler.build_base_frame()
-    #
-    # profiles_data_handler.read_raw_data("profiles")
-    # profiles_data_handler.combine_and_save_all_profiles()
-    # # #
-    # market_cap_data_handler.read_raw_data("marketcap_v2")
-    # market_cap_data_handler.build_processed_market_caps("marketcap_v2")
-    # #
-    # # KEY RATIOS ----------------------
-    # # Note: Some stocks dont have data for financials, so we start to drop columns here
-    # if PRE_PROCESS_FINANCIAL_STATEMENTS:
-    #     # For the US, no semi-annual reporting
-    #     # financial_statements_processor.add_metadata_to_statements("annual")
-    #     # financial_statements_processor.add_metadata_to_statements("quarterly")
-    #     # TODO: FIX REVENUE< WHICH IS COMING DOWN AS YTD
-    #     # NONETHELESS DOESNT EXPLAIN WHY MOMO BROKEN
-    #     financial_statements_processor.build_single_field_frames("quarterly")
-    #
-    # # Load processed financial statements
-    # financial_statements_processor.standardise_data("processed", "financials", "quarterly", "market_data")
-    # financial_statements_processor.post_process_financial_data()
-    #
-    # ratios.build_ratios()
+    runner = PipelineRunner(data_store.folder_path, build_stages(data_store, data_gatherer), max_workers=workers, force=force)
+    # Stages join categorical symbols from different frames, which needs them to share one string cache
+    with pl.StringCache():
+        outcomes = runner.run()
+    for stage_name, outcome in outcomes.items():
+        click.echo(f"{stage_name}: {outcome}")
+    if data_store.read_cache is not None:
+        data_store.read_cache.log_stats()
 
 if __name__ == '__main__':
     process_data()
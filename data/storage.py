@@ -1,5 +1,427 @@
+import hashlib
+import io
 import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, Union
+
+import pyarrow as pa
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+MULTIPART_CHUNKSIZE = 16 * 1024**2  # Also the part size local ETags are computed with, so the two must match
+FOOTER_PREFETCH = 64 * 1024  # Parquet footers are almost always smaller, so opening a file costs one GET
+COALESCE_GAP = 256 * 1024  # Ranges closer than this are fetched as one request, cheaper than another round trip
+
+
+class LocalStorage:
+    """Files under a root folder on the local file system, the default DataStore backend.
+
+    Keys are "/" separated paths relative to the root, e.g. "prices/AAPL.parquet".
+    """
+
+    is_local = True
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def uri(self, key: str) -> str:
+        return self.path(key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def stat(self, key: str) -> Tuple[int, int]:
+        """(size, version) of a key, the version changes whenever the contents do."""
+        stat = os.stat(self.path(key))
+        return stat.st_size, stat.st_mtime_ns
+
+    def list(self, prefix: str, suffix: str = "") -> List[str]:
+        """Keys directly under a prefix "directory", not recursive."""
+        directory = self.path(prefix)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            f"{prefix.rstrip('/')}/{name}"
+            for name in os.listdir(directory)
+            if name.endswith(suffix) and os.path.isfile(os.path.join(directory, name))
+        )
+
+    def list_recursive(self, prefix: str, suffix: str = "") -> List[str]:
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.root).replace(os.sep, "/")
+            for root, _, names in os.walk(self.path(prefix))
+            for name in names
+            if name.endswith(suffix)
+        )
+
+    def open_input(self, key: str) -> str:
+        # Readers take the path straight, so pyarrow can memory map and read ranges itself
+        return self.path(key)
+
+    def open_ranged(self, key: str) -> str:
+        # Local files are random access already
+        return self.path(key)
+
+    def scan_source(self, key: str) -> Tuple[str, Optional[dict]]:
+        """Source and storage options to hand a lazy Polars scan, keys may contain globs."""
+        return self.path(key), None
+
+    @contextmanager
+    def open_output(self, key: str):
+        """Yields somewhere to write the object to, it only appears under key once the block exits cleanly."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            yield tmp_path
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def delete(self, key: str) -> None:
+        if os.path.isfile(self.path(key)):
+            os.remove(self.path(key))
+
+    def delete_prefix(self, prefix: str) -> None:
+        path = self.path(prefix)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+
+def local_etag(filepath: str, chunksize: int = MULTIPART_CHUNKSIZE) -> str:
+    """The ETag S3 will report for this file once uploaded with our transfer config.
+
+    Plain MD5 below the multipart threshold, otherwise the MD5 of the part MD5s suffixed with the part count.
+    """
+    with open(filepath, "rb") as f:
+        part_digests = [hashlib.md5(block).digest() for block in iter(lambda: f.read(chunksize), b"")]
+    if os.path.getsize(filepath) < chunksize:
+        # Single part upload, the ETag is just the MD5 of the whole file
+        return (part_digests[0] if part_digests else hashlib.md5(b"").digest()).hex()
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+
+def _file_sha256(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class S3Storage:
+    """Objects in an S3 bucket under an optional prefix, same key layout and API as LocalStorage.
+
+    Transfers above MULTIPART_CHUNKSIZE go multipart with parts moved in parallel, writes are uploaded straight from
+    memory. The client is only created on first use, so importing or constructing this never touches AWS.
+    """
+
+    is_local = False
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        client=None,
+        max_concurrency: int = 10,
+        multipart_chunksize: int = MULTIPART_CHUNKSIZE,
+        **client_kwargs,
+    ):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self._client = client
+        self.client_kwargs = client_kwargs
+        self.multipart_chunksize = multipart_chunksize
+        self.max_concurrency = max_concurrency
+        self._transfer_config = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client("s3", **self.client_kwargs)
+        return self._client
+
+    @property
+    def transfer_config(self):
+        if self._transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+
+            self._transfer_config = TransferConfig(
+                multipart_threshold=self.multipart_chunksize,
+                multipart_chunksize=self.multipart_chunksize,
+                max_concurrency=self.max_concurrency,
+                use_threads=True,
+            )
+        return self._transfer_config
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._object_key(key)}"
+
+    def _key(self, object_key: str) -> str:
+        return object_key[len(self.prefix) + 1:] if self.prefix else object_key
+
+    def _head(self, key: str) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise e
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def stat(self, key: str) -> Tuple[int, str]:
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(self.uri(key))
+        return head["ContentLength"], head["ETag"].strip('"')
+
+    def _list_objects(self, prefix: str, recursive: bool) -> List[dict]:
+        object_prefix = self._object_key(prefix.rstrip("/")) + "/" if prefix else (f"{self.prefix}/" if self.prefix else "")
+        paginator = self.client.get_paginator("list_objects_v2")
+        kwargs = {"Bucket": self.bucket, "Prefix": object_prefix}
+        if not recursive:
+            kwargs["Delimiter"] = "/"
+        return [obj for page in paginator.paginate(**kwargs) for obj in page.get("Contents", [])]
+
+    def list(self, prefix: str, suffix: str = "") -> List[str]:
+        """Keys directly under a prefix "directory", not recursive."""
+        return sorted(
+            self._key(obj["Key"]) for obj in self._list_objects(prefix, recursive=False) if obj["Key"].endswith(suffix)
+        )
+
+    def list_etags(self, prefix: str = "", suffix: str = "") -> Dict[str, str]:
+        """key -> ETag for every object under prefix, recursively, from the listing alone."""
+        return {
+            self._key(obj["Key"]): obj["ETag"].strip('"')
+            for obj in self._list_objects(prefix, recursive=True)
+            if obj["Key"].endswith(suffix)
+        }
+
+    def list_recursive(self, prefix: str, suffix: str = "") -> List[str]:
+        return sorted(self.list_etags(prefix, suffix))
+
+    def open_ranged(self, key: str, max_workers: int = 8) -> "RangedS3File":
+        """Open an object for random access by ranged GETs, only the bytes actually read get downloaded."""
+        return RangedS3File(self, key, max_workers)
+
+    def open_input(self, key: str) -> io.BytesIO:
+        """Download an object into memory, large ones in parallel ranged parts."""
+        buffer = io.BytesIO()
+        self.client.download_fileobj(self.bucket, self._object_key(key), buffer, Config=self.transfer_config)
+        buffer.seek(0)
+        return buffer
+
+    def scan_source(self, key: str) -> Tuple[str, Optional[dict]]:
+        # Polars reads S3 natively, with its own ranged requests, so lazy scans never pull whole objects.
+        # Anything not passed explicitly is picked up from the environment, same as boto3 does
+        option_names = {
+            "aws_access_key_id": "aws_access_key_id",
+            "aws_secret_access_key": "aws_secret_access_key",
+            "aws_session_token": "aws_session_token",
+            "region_name": "aws_region",
+            "endpoint_url": "aws_endpoint_url",
+        }
+        storage_options = {
+            option_names[name]: value for name, value in self.client_kwargs.items() if name in option_names and value
+        }
+        return self.uri(key), storage_options or None
+
+    @contextmanager
+    def open_output(self, key: str):
+        """Yields an in-memory sink, uploaded (multipart above the threshold) once the block exits cleanly."""
+        sink = pa.BufferOutputStream()
+        yield sink
+        self.write_bytes(key, sink.getvalue())
+
+    def write_bytes(self, key: str, data: Union[bytes, pa.Buffer]) -> None:
+        self.client.upload_fileobj(
+            io.BytesIO(data),
+            self.bucket,
+            self._object_key(key),
+            ExtraArgs={"Metadata": {"sha256": hashlib.sha256(data).hexdigest()}},
+            Config=self.transfer_config,
+        )
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def delete_prefix(self, prefix: str) -> None:
+        object_keys = [obj["Key"] for obj in self._list_objects(prefix, recursive=True)]
+        for i in range(0, len(object_keys), 1000):  # delete_objects takes at most 1000 keys a call
+            self.client.delete_objects(
+                Bucket=self.bucket, Delete={"Objects": [{"Key": key} for key in object_keys[i:i + 1000]]}
+            )
+
+    def _unchanged(self, key: str, filepath: str, remote_etag: Optional[str]) -> bool:
+        """Whether the local file matches the remote object, by ETag, falling back to the sha256 we upload with."""
+        if remote_etag is None:
+            return False
+        if remote_etag == local_etag(filepath, self.multipart_chunksize):
+            return True
+        if "-" in remote_etag:
+            # Multipart ETags depend on the part size used, so a differing one doesn't prove the contents differ
+            head = self._head(key)
+            remote_sha256 = (head or {}).get("Metadata", {}).get("sha256")
+            return remote_sha256 is not None and remote_sha256 == _file_sha256(filepath)
+        return False
+
+    def _local_files(self, local_root: str, prefix: str, suffix: str) -> Dict[str, str]:
+        local_files = {}
+        for root, _, names in os.walk(os.path.join(local_root, *[part for part in prefix.split("/") if part])):
+            for name in names:
+                if name.endswith(suffix):
+                    filepath = os.path.join(root, name)
+                    local_files[os.path.relpath(filepath, local_root).replace(os.sep, "/")] = filepath
+        return local_files
+
+    def sync_from_local(self, local_root: str, prefix: str = "", suffix: str = ".parquet", max_workers: int = 8) -> List[str]:
+        """Upload every local file under prefix whose contents differ from the bucket, returns the keys pushed."""
+        remote_etags = self.list_etags(prefix, suffix)
+        local_files = self._local_files(local_root, prefix, suffix)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            unchanged = list(executor.map(
+                lambda item: self._unchanged(item[0], item[1], remote_etags.get(item[0])), local_files.items()
+            ))
+            changed = [key for key, same in zip(local_files, unchanged) if not same]
+
+            def upload(key):
+                filepath = local_files[key]
+                self.client.upload_file(
+                    filepath,
+                    self.bucket,
+                    self._object_key(key),
+                    ExtraArgs={"Metadata": {"sha256": _file_sha256(filepath)}},
+                    Config=self.transfer_config,
+                )
+
+            list(executor.map(upload, changed))
+
+        logging.info(f"Synced {len(changed)} of {len(local_files)} files to s3://{self.bucket}/{self._object_key(prefix)}")
+        return changed
+
+    def sync_to_local(self, local_root: str, prefix: str = "", suffix: str = ".parquet", max_workers: int = 8) -> List[str]:
+        """Download every object under prefix that's missing or different locally, returns the keys pulled."""
+        remote_etags = self.list_etags(prefix, suffix)
+        local_files = self._local_files(local_root, prefix, suffix)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            unchanged = list(executor.map(
+                lambda key: key in local_files and self._unchanged(key, local_files[key], remote_etags[key]),
+                remote_etags,
+            ))
+            changed = [key for key, same in zip(remote_etags, unchanged) if not same]
+
+            def download(key):
+                filepath = os.path.join(local_root, *key.split("/"))
+                os.makedirs(os.path.dirname(filepath), exist_ok=True)
+                tmp_path = f"{filepath}.{os.getpid()}.tmp"
+                self.client.download_file(self.bucket, self._object_key(key), tmp_path, Config=self.transfer_config)
+                os.replace(tmp_path, filepath)
+
+            list(executor.map(download, changed))
+
+        logging.info(f"Synced {len(changed)} of {len(remote_etags)} objects from s3://{self.bucket}/{self._object_key(prefix)}")
+        return changed
+
+
+class RangedS3File(io.RawIOBase):
+    """Seekable read-only file over an S3 object, reads are served by ranged GETs.
+
+    The tail is fetched on open so the parquet footer comes for free, and prefetch() pulls a known set of ranges
+    (e.g. the column chunks of the row groups we need) concurrently, before pyarrow asks for them one by one.
+    """
+
+    def __init__(self, storage: S3Storage, key: str, max_workers: int = 8):
+        super().__init__()
+        self.storage = storage
+        self.key = key
+        self.max_workers = max_workers
+        self.size = storage.stat(key)[0]
+        self.position = 0
+        self.requests = 0
+        self.bytes_fetched = 0
+        self._blocks: List[Tuple[int, bytes]] = []
+        self.prefetch([(max(0, self.size - FOOTER_PREFETCH), self.size)])
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        return self.position
+
+    def _get_range(self, start: int, end: int) -> bytes:
+        """GET bytes [start, end)."""
+        response = self.storage.client.get_object(
+            Bucket=self.storage.bucket, Key=self.storage._object_key(self.key), Range=f"bytes={start}-{end - 1}"
+        )
+        data = response["Body"].read()
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        return data
+
+    def prefetch(self, ranges: List[Tuple[int, int]]) -> None:
+        """Fetch [start, end) ranges concurrently, merging neighbours into single requests."""
+        merged = []
+        for start, end in sorted((max(0, start), min(self.size, end)) for start, end in ranges if end > start):
+            if merged and start - merged[-1][1] <= COALESCE_GAP:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        missing = [(start, end) for start, end in merged if self._cached(start, end) is None]
+        if not missing:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            blocks = list(executor.map(lambda r: (r[0], self._get_range(*r)), missing))
+        self._blocks.extend(blocks)
+
+    def _cached(self, start: int, end: int) -> Optional[bytes]:
+        for block_start, data in self._blocks:
+            if block_start <= start and end <= block_start + len(data):
+                return data[start - block_start:end - block_start]
+        return None
+
+    def read(self, size: int = -1) -> bytes:
+        end = self.size if size is None or size < 0 else min(self.size, self.position + size)
+        if end <= self.position:
+            return b""
+        data = self._cached(self.position, end)
+        if data is None:
+            data = self._get_range(self.position, end)
+        self.position = end
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
@@ -1,15 +1,59 @@
 import polars as pl
+from datetime import datetime as dt, timedelta
 
 def pct_change(dataframe, lookback):
-    def percentage_change(data):
-        return data.diff(lookback) / data.shift(lookback)
-
+    """Percentage change over lookback rows for every column but date, works on DataFrames and LazyFrames."""
+    columns = dataframe.collect_schema().names()
     pct_change = dataframe.with_columns([
-        percentage_change(dataframe[col]).alias(f"{col}") for col in dataframe.columns if col != 'date'
+        (pl.col(col).diff(lookback) / pl.col(col).shift(lookback)).alias(col) for col in columns if col != 'date'
     ])
 
     return pct_change
 
 
 def apply_schema(df, schema):
-    return df.with_columns([pl.col(col).cast(dtype) for col, dtype in schema.items()])
\ No newline at end of file
+    return df.with_columns([pl.col(col).cast(dtype) for col, dtype in schema.items()])
+
+
+def build_date_chunks(start_date, end_date=None, chunk_days=500):
+    """Split [start_date, end_date] into consecutive, non-overlapping (from, to) date strings of chunk_days each."""
+    end_date = end_date or dt.today()
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        chunks.append((chunk_start.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d")))
+        chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def pivot_long_panel(long_df, value_column, date_column="date", symbol_column="symbol"):
+    """Pivot a long (date, symbol, value) frame wide, one column per symbol, in a single pass.
+
+    Duplicate (date, symbol) rows are resolved explicitly by the pivot, keeping the first, rather than by
+    a unique on date after the fact.
+    """
+    if long_df.is_empty():
+        return pl.DataFrame()
+    wide = long_df.pivot(on=symbol_column, index=date_column, values=value_column, aggregate_function="first")
+    return wide.sort(date_column)
+
+
+def build_field_panel(symbol_frames, field, date_column="date"):
+    """Wide panel of field across symbols from an iterable of (symbol, frame) pairs.
+
+    Each frame is tagged with its symbol and stacked into one long frame, which is pivoted once.
+    """
+    long_frames = [
+        frame.select(
+            pl.col(date_column),
+            pl.lit(symbol, dtype=pl.String).alias("symbol"),
+            pl.col(field).alias("value"),
+        )
+        for symbol, frame in symbol_frames
+    ]
+    if not long_frames:
+        return pl.DataFrame()
+    # Relaxed so a symbol whose field came back as ints still stacks with the float ones
+    long_df = pl.concat(long_frames, how="vertical_relaxed")
+    return pivot_long_panel(long_df, "value", date_column=date_column)
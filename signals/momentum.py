@@ -10,11 +10,12 @@ def simple_trend_signal(daily_returns, slow_lookback, fast_lookback, vol_lookbac
 
 
 # Load total returns
-from data.storage import DataHandler  # Assume this is the module where your DataHandler class is defined
+from data.models.general import DataStore
 
-data_handler = DataHandler(folder_name="local_store")
+data_store = DataStore(base_location="data/local_store", engine="pandas")
 
-tr = data_handler.read_parquet("total_return", engine="pandas").set_index("date")
+# Memory mapped IPC mirror, no parquet decompression on every run
+tr = data_store.read_mirror("core_data", "total_return.parquet").set_index("date")
 
 
 LOOKBACKS_MONTHS = [1, 3, 6, 12]
@@ -0,0 +1,53 @@
+from datetime import date
+
+import numpy as np
+import polars as pl
+import pytest
+
+from data.models.general import DataStore
+from data.models.processed_financials import data_field_map
+
+
+@pytest.fixture
+def data_store(tmp_path):
+    # Absolute base_location, so the store lives entirely under tmp_path
+    return DataStore(base_location=str(tmp_path / "store"), universe_provider=lambda: [])
+
+
+def _random_walk_prices(symbols, start=date(2020, 1, 1), days=300, seed=0) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pl.date_range(start, date(start.year + 10, 1, 1), eager=True)
+    dates = dates.filter(dates.dt.weekday() <= 5).head(days)
+    return pl.concat([
+        pl.DataFrame({
+            "date": dates,
+            "symbol": symbol,
+            "adjClose": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates)))),
+        })
+        for symbol in symbols
+    ])
+
+
+@pytest.fixture
+def make_prices():
+    """Builds long (date, symbol, adjClose) random walks on weekdays, one per symbol."""
+    return _random_walk_prices
+
+
+@pytest.fixture
+def processed_store(data_store, make_prices):
+    """A store holding the wide processed/ frames standardise_data reads, plus the base frame."""
+    wide = make_prices(["AAA", "BBB", "CCC"], days=60).pivot(on="symbol", index="date", values="adjClose")
+    for name in ["prices", "total_return", "marketcap"]:
+        data_store.write_parquet(wide, "processed/market_data", f"{name}.parquet")
+    data_store.write_parquet(wide.select("date", "AAA"), "processed/market_data", "all_profiles.parquet")
+    for name in data_field_map.values():
+        # Financials only cover some of the symbols and start later
+        data_store.write_parquet(
+            wide.select("date", "AAA", "BBB").tail(40), "processed/financials/quarterly", f"{name}.parquet"
+        )
+    # The base frame drops the first few dates and has a symbol nothing else holds
+    data_store.write_parquet(
+        wide.tail(50).with_columns(pl.lit(None, dtype=pl.Float64).alias("DDD")), "core_data", "base_frame.parquet"
+    )
+    return data_store
@@ -0,0 +1,30 @@
+import os
+import sqlite3
+
+from data.models.catalog import CATALOG_FILENAME
+
+
+def test_catalog_is_only_created_on_first_write(data_store, make_prices):
+    catalog_path = os.path.join(data_store.folder_path, CATALOG_FILENAME)
+    assert data_store.catalog.files() == []
+    assert not os.path.exists(catalog_path)
+
+    data_store.write_dataset(make_prices(["AAA"]), "prices")
+    assert os.path.exists(catalog_path)
+    assert [entry["path"] for entry in data_store.catalog.files("dataset/prices")] == [
+        "dataset/prices/year=2020/part-0.parquet", "dataset/prices/year=2021/part-0.parquet"
+    ]
+
+
+def test_catalog_errors_never_fail_a_dataset_write(data_store, make_prices, monkeypatch):
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    data_store.write_dataset(make_prices(["AAA", "BBB"]), "prices")
+    monkeypatch.setattr(data_store.catalog, "record_existing", locked)
+    monkeypatch.setattr(data_store.catalog, "remove", locked)
+    # Short enough to leave the 2021 partition stale, so its entry has to be removed too
+    prices = make_prices(["AAA", "BBB"], days=100)
+
+    data_store.write_dataset(prices, "prices")
+    assert data_store.scan_dataset("prices").collect().height == prices.height
@@ -0,0 +1,49 @@
+from datetime import date
+
+import polars as pl
+import pytest
+
+
+def test_read_dataset_matches_scan_dataset(data_store, make_prices):
+    data_store.write_dataset(make_prices(["AAA", "BBB", "CCC"]), "prices")
+    query = dict(columns=["adjClose"], symbols=["AAA", "CCC"], start_date=date(2020, 6, 1), end_date=date(2021, 1, 31))
+
+    read = data_store.read_dataset("prices", **query)
+    scanned = data_store.scan_dataset("prices", **query).sort(["symbol", "date"]).collect()
+    assert read.equals(scanned)
+
+    # Nothing matching still comes back with the columns
+    empty = data_store.read_dataset("prices", columns=["adjClose"], start_date=date(2030, 1, 1))
+    assert empty.height == 0
+    assert empty.columns == ["date", "symbol", "adjClose"]
+    assert data_store.read_dataset("missing").equals(pl.DataFrame())
+
+
+def test_overwrite_replaces_partitions_in_place(data_store, make_prices, monkeypatch):
+    data_store.write_dataset(make_prices(["AAA", "BBB"], start=date(2019, 1, 1), days=600), "prices")
+    old = data_store.read_dataset("prices")
+
+    # A write that dies on its second partition leaves the rest of the old dataset readable
+    open_output = data_store.storage.open_output
+    written = []
+    def fail_second(key):
+        written.append(key)
+        if len(written) == 2:
+            raise OSError("disk full")
+        return open_output(key)
+    monkeypatch.setattr(data_store.storage, "open_output", fail_second)
+
+    new = make_prices(["AAA", "BBB"], start=date(2019, 1, 1), days=300, seed=1)
+    with pytest.raises(OSError):
+        data_store.write_dataset(new, "prices")
+    partly = data_store.read_dataset("prices")
+    assert partly.filter(pl.col("date").dt.year() == 2019).equals(new.filter(pl.col("date").dt.year() == 2019))
+    assert partly.filter(pl.col("date").dt.year() >= 2020).equals(old.filter(pl.col("date").dt.year() >= 2020))
+
+    # Once every partition is written, years the new frame doesn't reach are dropped
+    monkeypatch.setattr(data_store.storage, "open_output", open_output)
+    data_store.write_dataset(new, "prices")
+    assert data_store.read_dataset("prices").equals(new.sort(["symbol", "date"]))
+    assert data_store.storage.list_recursive("dataset/prices", ".parquet") == [
+        "dataset/prices/year=2019/part-0.parquet", "dataset/prices/year=2020/part-0.parquet"
+    ]
@@ -0,0 +1,33 @@
+import polars as pl
+import pyarrow.parquet as pq
+
+from data.models.dtype_policy import DtypePolicy, FLOAT32_FRAMES
+from data.models.general import DataStore
+
+
+def _store(tmp_path, dtype_policy):
+    return DataStore(base_location=str(tmp_path), universe_provider=lambda: [], dtype_policy=dtype_policy)
+
+
+def test_float32_frames_and_compact_dtypes(tmp_path, make_prices):
+    data_store = _store(tmp_path, DtypePolicy(float32_frames=FLOAT32_FRAMES))
+    wide = make_prices(["AAA", "BBB"], days=20).pivot(on="symbol", index="date", values="adjClose")
+    wide = wide.with_columns(pl.col("date").cast(pl.Datetime))
+    data_store.write_parquet(wide, "core_data", "total_return.parquet")
+    data_store.write_parquet(wide, "core_data", "prices.parquet")
+
+    total_return = data_store.read("core_data", "total_return.parquet")
+    assert total_return.schema == {"date": pl.Date, "AAA": pl.Float32, "BBB": pl.Float32}
+    prices = data_store.read("core_data", "prices.parquet")
+    assert prices.schema == {"date": pl.Date, "AAA": pl.Float64, "BBB": pl.Float64}
+    # Importing the policy leaves the process wide string cache alone, the CLI entry points scope it
+    assert not pl.using_string_cache()
+
+
+def test_write_dataset_uses_policy_compression(tmp_path, make_prices):
+    data_store = _store(tmp_path, DtypePolicy(compression="snappy", compression_level=None))
+    data_store.write_dataset(make_prices(["AAA"], days=20), "prices")
+
+    key = data_store.storage.list_recursive(data_store._dataset_key("prices"), ".parquet")[0]
+    metadata = pq.ParquetFile(data_store.storage.path(key)).metadata
+    assert metadata.row_group(0).column(0).compression == "SNAPPY"
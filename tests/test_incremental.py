@@ -0,0 +1,57 @@
+import asyncio
+
+import polars as pl
+import pytest
+
+from data.models.general import DataGatherer
+
+
+def _build_url(symbol, start_date="1900-01-01"):
+    return f"prices/{symbol}?from={start_date}"
+
+
+@pytest.fixture
+def gatherer(data_store, make_prices):
+    prices = make_prices(["AAA"], days=300)
+    data_gatherer = DataGatherer(api_key="unused", symbols=["AAA"], rate_limit=60, data_handler=data_store)
+    # Stored up to day 250, FMP holds all 300 days
+    data_gatherer._save_symbol("AAA", prices.head(250).drop("symbol"), "prices")
+    data_gatherer.remote = prices.drop("symbol")
+    data_gatherer.requested = []
+
+    async def fetch_data(session, symbol, url, process_response):
+        data_gatherer.requested.append(url)
+        start_date = url.split("from=")[1]
+        return symbol, data_gatherer.remote.filter(pl.col("date") >= pl.lit(start_date).str.to_date())
+
+    data_gatherer._fetch_data = fetch_data
+    return data_gatherer
+
+
+def _fetch(data_gatherer):
+    return asyncio.run(data_gatherer._fetch_incremental(None, "AAA", _build_url, None, "prices"))[1]
+
+
+def test_incremental_fetch_starts_from_the_covered_to_metadata(gatherer, data_store):
+    metadata = data_store.read_metadata("prices", "AAA.parquet")
+    assert metadata["covered_to"] == str(gatherer.remote["date"][249])
+
+    full_reads = []
+    read = data_store.read
+    data_store.read = lambda *args, **kwargs: full_reads.append(args) or read(*args, **kwargs)
+    # Re-serialised by FMP, a few ulps off, which isn't a re-adjustment
+    gatherer.remote = gatherer.remote.with_columns(pl.col("adjClose") * (1 + 1e-12))
+
+    merged = _fetch(gatherer)
+    assert gatherer.requested == [_build_url("AAA", gatherer.remote["date"][248])]
+    assert merged.height == 300
+    # The last date came from the metadata, the whole file is only read for the merge
+    assert len(full_reads) == 1
+
+
+def test_incremental_fetch_refetches_a_readjusted_history(gatherer):
+    gatherer.remote = gatherer.remote.with_columns(pl.col("adjClose") * 0.5)
+
+    merged = _fetch(gatherer)
+    assert gatherer.requested[-1] == _build_url("AAA")
+    assert merged.equals(gatherer.remote)
@@ -0,0 +1,48 @@
+import asyncio
+
+from data.models.general import DataGatherer
+from data.models.journal import GatherJournal
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+
+def _run(data_store, make_prices, journal, failing=()):
+    """One gather over SYMBOLS, returning which symbols it went out for."""
+    gatherer = DataGatherer(api_key="unused", symbols=SYMBOLS, rate_limit=60, data_handler=data_store, journal=journal)
+    requested = []
+
+    async def fetch_data(session, symbol, url, process_response):
+        requested.append(symbol)
+        return symbol, None if symbol in failing else make_prices([symbol], days=20).drop("symbol")
+
+    gatherer._fetch_data = fetch_data
+    asyncio.run(gatherer._fetch_all_data(lambda symbol: symbol, None, "prices"))
+    return sorted(requested)
+
+
+def test_resumed_run_skips_journaled_units_and_redoes_failed_ones(data_store, make_prices, tmp_path):
+    journal_path = str(tmp_path / "gather_journal.jsonl")
+
+    assert _run(data_store, make_prices, GatherJournal(journal_path), failing={"BBB"}) == SYMBOLS
+    assert not data_store.exists("prices", "BBB.parquet")
+
+    # Only the unit that failed goes out again
+    assert _run(data_store, make_prices, GatherJournal(journal_path, resume=True)) == ["BBB"]
+    assert data_store.exists("prices", "BBB.parquet")
+    assert _run(data_store, make_prices, GatherJournal(journal_path, resume=True)) == []
+
+    # A run that isn't resumed starts the journal over
+    assert _run(data_store, make_prices, GatherJournal(journal_path)) == SYMBOLS
+
+
+def test_a_line_cut_short_by_a_crash_is_ignored(tmp_path):
+    journal_path = str(tmp_path / "gather_journal.jsonl")
+    journal = GatherJournal(journal_path)
+    journal.record("marketcap", "AAA", ("2020-01-01", "2021-05-15"))
+    with open(journal_path, "a") as f:
+        f.write('{"endpoint": "marketcap", "symbol": "BB')
+
+    resumed = GatherJournal(journal_path, resume=True)
+    assert resumed.is_done("marketcap", "AAA", ("2020-01-01", "2021-05-15"))
+    assert not resumed.is_done("marketcap", "AAA", ("2021-05-16", "2022-09-28"))
+    assert not resumed.is_done("marketcap", "BBB")
@@ -0,0 +1,81 @@
+import re
+from datetime import datetime as dt, timedelta
+
+import polars as pl
+
+from data.models.general import DataGatherer
+from data.models.market_cap import MarketCapDataHandler
+
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _handler(data_store, start_date):
+    data_gatherer = DataGatherer(api_key="unused", symbols=["AAA"], rate_limit=60, data_handler=data_store)
+    return MarketCapDataHandler(
+        data_gatherer, data_store, interval="unused", sub_directory="marketcap_v2", start_date=start_date,
+        chunk_days=500,
+    )
+
+
+def _market_caps(chunk):
+    days = pl.date_range(dt.strptime(chunk[0], "%Y-%m-%d"), dt.strptime(chunk[1], "%Y-%m-%d"), "1d", eager=True)
+    return pl.DataFrame({"marketCap": 1e9, "date": days})
+
+
+def test_chunks_run_back_to_back_up_to_today(data_store):
+    today = dt.today()
+    chunks = _handler(data_store, today - timedelta(days=1200)).plan_date_chunks("AAA")
+
+    assert chunks[0][0] == (today - timedelta(days=1200)).strftime("%Y-%m-%d")
+    assert chunks[-1][1] == today.strftime("%Y-%m-%d")
+    spans = [(dt.strptime(start, "%Y-%m-%d"), dt.strptime(end, "%Y-%m-%d")) for start, end in chunks]
+    # 500 days inclusive each, the last one cut short at today, and each starting the day after the last ended
+    assert [(end - start).days + 1 for start, end in spans] == [500, 500, 201]
+    assert all(nxt[0] - prev[1] == timedelta(days=1) for prev, nxt in zip(spans, spans[1:]))
+
+
+def test_covered_ranges_are_skipped(data_store):
+    handler = _handler(data_store, dt.today() - timedelta(days=1200))
+    first, second, third = handler.plan_date_chunks("AAA")
+
+    # A run that stored the first two chunks and died before the third
+    handler.data_gatherer._save_chunked_symbol(
+        "AAA", [_market_caps(first), _market_caps(second)], [first, second], [first, second],
+        complete=True, file_suffix="marketcap_v2",
+    )
+
+    # Coverage is compared as strings against the chunk bounds, so it has to stay ISO formatted
+    metadata = data_store.read_metadata("marketcap_v2", "AAA.parquet")
+    assert (metadata["covered_from"], metadata["covered_to"]) == (first[0], second[1])
+    assert ISO_DATE.match(metadata["covered_from"]) and ISO_DATE.match(metadata["covered_to"])
+
+    # The chunk ending on covered_to is fetched again in case it was still open when stored
+    assert handler.plan_date_chunks("AAA") == [second, third]
+
+
+def test_responses_decode_dates_to_date(data_store):
+    handler = _handler(data_store, dt.today())
+    raw = (
+        b'[{"symbol": "AAA", "date": "2024-01-05", "marketCap": 2.0},'
+        b' {"symbol": "AAA", "date": "2024-01-04", "marketCap": 1.0}]'
+    )
+
+    assert handler._process_data(raw).schema == {"marketCap": pl.Float64, "date": pl.Date}
+
+
+def test_files_without_coverage_are_planned_in_full(data_store):
+    handler = _handler(data_store, dt.today() - timedelta(days=1200))
+    chunks = handler.plan_date_chunks("AAA")
+    # As stored before coverage was tracked, with String dates
+    legacy = _market_caps(chunks[0]).with_columns(pl.col("date").dt.strftime("%Y-%m-%d"))
+    data_store.write_parquet(legacy, "marketcap_v2", "AAA.parquet", metadata={"symbol": "AAA"})
+
+    assert handler.plan_date_chunks("AAA") == chunks
+
+    # Stitching new chunks in brings the old rows over to Date
+    handler.data_gatherer._save_chunked_symbol(
+        "AAA", [_market_caps(chunks[1])], chunks, chunks, complete=False, file_suffix="marketcap_v2"
+    )
+    stored = data_store.read("marketcap_v2", "AAA.parquet")
+    assert stored.schema["date"] == pl.Date
+    assert stored.height == 1000 and stored["date"].is_sorted()
@@ -0,0 +1,45 @@
+import polars as pl
+
+from data.models.general import DataGatherer
+from data.models.market_cap import MarketCapDataHandler
+from data.models.prices import PricesDataHandler
+from data.pipeline import PipelineRunner
+from data.processing import build_stages
+from data.utils import pct_change
+
+MARKET_DATA_STAGES = [
+    "build_price_dataset", "build_market_cap_dataset", "update_returns", "build_processed_prices",
+    "build_processed_market_caps",
+]
+
+
+def test_wide_market_frames_are_pivoted_from_the_datasets(data_store, make_prices):
+    # Per-symbol files as the gatherer leaves them, one symbol's history starting later than the others
+    for offset, symbol in enumerate(["CCC", "AAA", "BBB"]):
+        prices = make_prices([symbol], days=80, seed=offset).drop("symbol").tail(80 - 10 * offset)
+        data_store.write_parquet(prices, "prices", f"{symbol}.parquet", metadata={"symbol": symbol})
+        market_caps = prices.select(pl.col("date").cast(pl.String), (pl.col("adjClose") * 1e6).alias("marketCap"))
+        data_store.write_parquet(market_caps, "marketcap_v2", f"{symbol}.parquet", metadata={"symbol": symbol})
+
+    data_gatherer = DataGatherer(api_key="unused", symbols=[], rate_limit=60, data_handler=data_store)
+    stages = [stage for stage in build_stages(data_store, data_gatherer) if stage.name in MARKET_DATA_STAGES]
+    assert PipelineRunner(data_store.folder_path, stages, max_workers=1).run() == {
+        name: "ran" for name in MARKET_DATA_STAGES
+    }
+
+    # The same frames the per-symbol directories used to be pivoted into
+    prices_handler = PricesDataHandler(data_gatherer, data_store, interval="unused", sub_directory="prices")
+    prices_handler.read_raw_data("prices", columns=["date", "adjClose"])
+    prices = prices_handler.get_field("prices", "adjClose").sort("date")
+    assert data_store.read("processed/market_data", "prices.parquet").equals(prices)
+    # Total return is the returns engine's one day return, which matches pct_change without gaps in the history
+    assert data_store.read("processed/market_data", "total_return.parquet").equals(pct_change(prices, lookback=1))
+
+    market_cap_handler = MarketCapDataHandler(
+        data_gatherer, data_store, interval="unused", sub_directory="marketcap_v2", start_date=None
+    )
+    market_cap_handler.read_raw_data("marketcap_v2", columns=["date", "marketCap"])
+    expected = market_cap_handler.get_field("marketcap_v2", "marketCap").with_columns(
+        pl.col("date").str.strptime(pl.Date, "%Y-%m-%d")
+    )
+    assert data_store.read("processed/market_data", "marketcap.parquet").equals(expected.sort("date"))
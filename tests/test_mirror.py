@@ -0,0 +1,40 @@
+import os
+
+import polars as pl
+
+
+def _write_wide(data_store, make_prices, days):
+    wide = make_prices(["AAA", "BBB"], days=days).pivot(on="symbol", index="date", values="adjClose")
+    data_store.write_parquet(wide, "core_data", "prices.parquet")
+    return wide
+
+
+def test_rebuilds_never_replace_a_mapped_mirror(data_store, make_prices, monkeypatch):
+    first = _write_wide(data_store, make_prices, days=20)
+    mapped = data_store.read_mirror("core_data", "prices.parquet", engine="polars")
+    first_path = data_store.ensure_mirror("core_data", "prices.parquet")
+    assert mapped.equals(first)
+
+    # Windows won't delete a file that's still mapped
+    remove = os.remove
+    def remove_unless_mapped(path):
+        if path == first_path:
+            raise PermissionError(path)
+        remove(path)
+    monkeypatch.setattr(os, "remove", remove_unless_mapped)
+
+    second = _write_wide(data_store, make_prices, days=30)
+    assert data_store.read_mirror("core_data", "prices.parquet", engine="polars").equals(second)
+    second_path = data_store.ensure_mirror("core_data", "prices.parquet")
+    assert second_path != first_path and os.path.exists(first_path)
+    assert mapped.equals(first)
+
+    # Once it's released the next rebuild clears it out
+    monkeypatch.setattr(os, "remove", remove)
+    third = _write_wide(data_store, make_prices, days=40)
+    third_path = data_store.ensure_mirror("core_data", "prices.parquet")
+    assert os.listdir(os.path.dirname(third_path)) == [os.path.basename(third_path)]
+
+    # pandas gets a copy of the same frame
+    frame = data_store.read_mirror("core_data", "prices.parquet", engine="pandas")
+    assert pl.from_pandas(frame).with_columns(pl.col("date").cast(pl.Date)).equals(third)
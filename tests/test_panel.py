@@ -0,0 +1,65 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from data.models.panel import PANEL_DIRECTORY, PANEL_FIELDS, PanelStore
+from data.models.processed_financials import FinancialDataProcessor
+
+
+def _old_ratio(numerator: pl.DataFrame, denominator: pl.DataFrame) -> pl.DataFrame:
+    # AccountingRatioBuilder._ratio, from before the panel
+    symbols = [col for col in numerator.columns if col != "date" and col in denominator.columns]
+    return numerator.join(denominator, on="date", how="left", suffix="_denominator").select(
+        "date", *[(pl.col(symbol) / pl.col(f"{symbol}_denominator")).alias(symbol) for symbol in symbols]
+    )
+
+
+def _old_melt_and_join(data_store) -> pl.DataFrame:
+    """The panel the way it used to be built: wide ratio frames, each field melted, joined on (date, symbol)."""
+    wides = {
+        column: data_store.read("core_data", filename)
+        for filename, column in PANEL_FIELDS.items()
+        if data_store.exists(PANEL_DIRECTORY, filename)
+    }
+    wides["ptb"] = _old_ratio(wides["market_cap"], wides["shareholders_equity"])
+    wides["stp"] = _old_ratio(wides["revenue"], wides["market_cap"])
+    wides["cftp"] = _old_ratio(wides["operating_cash_flow"], wides["market_cap"])
+
+    melted = [
+        wide.unpivot(index="date", variable_name="symbol", value_name=column) for column, wide in wides.items()
+    ]
+    panel = melted[0]
+    for frame in melted[1:]:
+        panel = panel.join(frame, on=["date", "symbol"], how="full", coalesce=True)
+    fields = [column for column in wides if column not in ("ptb", "stp", "cftp")]
+    return panel.filter(pl.any_horizontal(pl.col(fields).is_not_null())).sort(["date", "symbol"])
+
+
+@pytest.fixture
+def core_data_store(processed_store):
+    processor = FinancialDataProcessor(processed_store)
+    processor.standardise_data("processed", "financials", "quarterly", "market_data")
+    processor.post_process_financial_data()
+    return processed_store
+
+
+def _compare(panel: pl.DataFrame, expected: pl.DataFrame) -> None:
+    assert_frame_equal(
+        panel.with_columns(pl.col("symbol").cast(pl.String)),
+        expected.select(panel.columns).with_columns(pl.col("symbol").cast(pl.String)),
+    )
+
+
+def test_build_matches_melt_and_join(core_data_store):
+    panel = PanelStore(core_data_store).build()
+    _compare(panel, _old_melt_and_join(core_data_store))
+    assert {"ptb", "stp", "cftp"} <= set(panel.columns)
+
+
+def test_build_matches_melt_and_join_off_the_shared_grid(core_data_store):
+    # A frame with its own dates and symbols takes the join path instead of stacking
+    marketcap = core_data_store.read("core_data", "marketcap.parquet")
+    core_data_store.write_parquet(marketcap.drop("BBB").head(30), "core_data", "marketcap.parquet")
+
+    panel = PanelStore(core_data_store).build()
+    _compare(panel, _old_melt_and_join(core_data_store))
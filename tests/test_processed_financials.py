@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+import polars as pl
+
+from data.models.processed_financials import FinancialDataProcessor, data_field_map
+
+
+def test_standardise_data_conforms_frames_to_base(processed_store):
+    processor = FinancialDataProcessor(processed_store)
+    processor.standardise_data("processed", "financials", "quarterly", "market_data")
+    processor.post_process_financial_data()
+
+    base = processed_store.read_parquet("core_data", "base_frame.parquet")
+    for name in ["prices", "total_return", "marketcap", "revenue", *data_field_map.values()]:
+        frame = processed_store.read_parquet("core_data", f"{name}.parquet")
+        assert frame.columns == base.columns, name
+        assert frame["date"].equals(base["date"]), name
+    assert not processed_store.exists("core_data", "all_profiles.parquet")
+
+    revenue = processed_store.read_parquet("core_data", "Revenue_1.parquet")
+    assert revenue["CCC"].null_count() == revenue.height
+    assert revenue["AAA"].head(10).null_count() == 10
+    assert revenue["AAA"].tail(40).null_count() == 0
+
+
+def test_single_field_frame_holds_every_reporting_symbol(data_store, make_prices):
+    data_store.write_dataset(make_prices(["AAPL", "MSFT", "XOM"], days=300), "prices")
+    quarter_ends = [date(2020, 3, 31), date(2020, 6, 30), date(2020, 9, 30)]
+    statements = pl.DataFrame({
+        "date": quarter_ends * 3,
+        "symbol": ["AAPL"] * 3 + ["MSFT"] * 3 + ["XOM"] * 3,
+        "statement_period": "quarterly",
+        "documenttype": "10-Q",
+        # Filed about a month after the quarter ends, some on weekends
+        "closest_filing_date": [d + timedelta(days=30 + i) for i in range(3) for d in quarter_ends],
+        "stockholdersequity": [1.0, 2.0, 3.0, 10.0, 20.0, 30.0, None, None, None],
+    })
+    data_store.write_dataset(statements, "statements")
+
+    daily = FinancialDataProcessor(data_store)._get_single_stock_field_daily("quarterly", "stockholdersequity")
+
+    # XOM never reports the field, so it's dropped
+    assert daily.columns == ["date", "AAPL", "MSFT"]
+    assert daily.tail(1).select("AAPL", "MSFT").row(0) == (3.0, 30.0)
+
+
+def test_single_field_frames_cover_annual_filings_and_missing_fields(data_store, make_prices):
+    data_store.write_dataset(make_prices(["AAA"], days=300), "prices")
+    statements = pl.DataFrame({
+        "date": [date(2019, 12, 31), date(2020, 3, 31)],
+        "symbol": "AAA",
+        "statement_period": ["annual", "quarterly"],
+        "documenttype": ["10-K", "10-Q"],
+        "closest_filing_date": [date(2020, 2, 3), date(2020, 5, 4)],
+        "stockholdersequity": [5.0, 6.0],
+    })
+    data_store.write_dataset(statements, "statements")
+
+    FinancialDataProcessor(data_store).build_single_field_frames("annual")
+
+    equity = data_store.read("processed/financials/annual", "ShareholdersEquity.parquet")
+    assert equity["AAA"].drop_nulls().unique().to_list() == [5.0]
+    # Fields nobody reports still get a file, on the calendar with no symbols
+    revenue = data_store.read("processed/financials/annual", "Revenue_1.parquet")
+    assert revenue.columns == ["date"]
+    assert revenue.height == 300
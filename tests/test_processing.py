@@ -0,0 +1,18 @@
+from data.models.general import DataGatherer
+from data.pipeline import PipelineRunner
+from data.processing import build_stages
+
+DOWNSTREAM_STAGES = ["standardise_data", "build_panel", "build_core_data_mirror"]
+
+
+def test_standardise_data_and_downstream_stages_run(processed_store):
+    data_gatherer = DataGatherer(api_key="unused", symbols=[], rate_limit=60, data_handler=processed_store)
+    stages = [stage for stage in build_stages(processed_store, data_gatherer) if stage.name in DOWNSTREAM_STAGES]
+
+    runner = PipelineRunner(processed_store.folder_path, stages, max_workers=1)
+    assert runner.run() == {name: "ran" for name in DOWNSTREAM_STAGES}
+    assert processed_store.exists("core_data", "panel.parquet")
+
+    # Nothing changed, so a second run skips the lot
+    rerun = PipelineRunner(processed_store.folder_path, stages, max_workers=1)
+    assert rerun.run() == {name: "skipped" for name in DOWNSTREAM_STAGES}
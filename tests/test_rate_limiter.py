@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from data.models import rate_limiter
+from data.models.rate_limiter import TokenBucketRateLimiter
+
+
+class FakeClock:
+    """Stands in for time.monotonic and asyncio.sleep, sleeping just moves the clock on."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self.on_sleep = None
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        if self.on_sleep is not None:
+            self.on_sleep()
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(rate_limiter, "asyncio", SimpleNamespace(sleep=clock.sleep))
+    return clock
+
+
+def _acquire(limiter, times=1):
+    async def run():
+        for _ in range(times):
+            await limiter.acquire()
+    asyncio.run(run())
+
+
+def test_burst_then_steady_rate(clock):
+    limiter = TokenBucketRateLimiter(600)  # 10 a second, a second's worth of burst
+    assert limiter.burst == 10
+
+    _acquire(limiter, 10)
+    assert clock.sleeps == []
+
+    _acquire(limiter, 3)
+    assert clock.sleeps == pytest.approx([0.1, 0.1, 0.1])
+
+
+def test_refill_is_capped_at_the_burst(clock):
+    limiter = TokenBucketRateLimiter(600)
+    _acquire(limiter, 10)
+
+    clock.now += 0.5
+    _acquire(limiter, 5)
+    assert clock.sleeps == []
+
+    # A long idle spell only banks a burst's worth
+    clock.now += 60
+    _acquire(limiter, 11)
+    assert clock.sleeps == pytest.approx([0.1])
+
+
+def test_pause_requeues_waiting_requests_after_it(clock):
+    limiter = TokenBucketRateLimiter(600)
+    _acquire(limiter, 10)
+
+    # A 429 lands while the next request is queued for its slot
+    def hit_429():
+        clock.on_sleep = None
+        limiter.pause(2)
+    clock.on_sleep = hit_429
+
+    _acquire(limiter)
+    # It woke at 0.1s into a 2s pause, so it re-queued for the end of the pause plus one token
+    assert clock.sleeps == pytest.approx([0.1, 1.9 + 0.1])
+
+
+def test_overlapping_pauses_back_off_once(clock):
+    limiter = TokenBucketRateLimiter(600)
+    limiter.pause(2)
+    clock.now += 1
+    limiter.pause(2)  # From a request that was already in flight
+    assert limiter._epoch == 1
+
+    _acquire(limiter)
+    assert clock.sleeps == pytest.approx([1 + 0.1])
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucketRateLimiter(0)
@@ -0,0 +1,22 @@
+from data.models.general import DataStore
+
+
+def test_read_all_in_directory_goes_through_the_read_cache(tmp_path, make_prices):
+    data_store = DataStore(base_location=str(tmp_path), universe_provider=lambda: [], read_cache_bytes=64 * 1024**2)
+    for symbol in ["AAA", "BBB"]:
+        data_store.write_parquet(make_prices([symbol]), "prices", f"{symbol}.parquet")
+
+    first = data_store.read_all_in_directory("prices")
+    second = data_store.read_all_in_directory("prices")
+    assert data_store.read_cache.stats()["hits"] == 2
+    assert all(second[name]["data"].equals(first[name]["data"]) for name in first)
+
+    # A rewritten file misses, the untouched one is still served from memory
+    data_store.write_parquet(make_prices(["AAA"], days=10), "prices", "AAA.parquet")
+    third = data_store.read_all_in_directory("prices")
+    assert third["prices_AAA.parquet"]["data"].height == 10
+    assert data_store.read_cache.stats()["hits"] == 3
+
+    # Reading other columns is a different entry
+    data_store.read_all_in_directory("prices", columns=["date", "adjClose"])
+    assert data_store.read_cache.stats()["hits"] == 3
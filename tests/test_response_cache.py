@@ -0,0 +1,70 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import numpy as np
+
+from data.models import response_cache
+from data.models.general import DataGatherer
+from data.models.response_cache import ResponseCache
+
+PRICES_URL = "https://financialmodelingprep.com/api/v3/historical-price-full/AAA?from=2020-01-01&apikey={key}"
+PROFILE_URL = "https://financialmodelingprep.com/api/v3/profile/AAA?apikey={key}"
+
+
+def test_apikey_is_stripped_before_hashing(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    cache.put(PRICES_URL.format(key="SECRET"), b"[]")
+
+    assert cache.normalise_url(PRICES_URL.format(key="SECRET")) == PRICES_URL.split("&apikey")[0]
+    # Any key finds the same entry
+    assert cache.get(PRICES_URL.format(key="OTHER")) == b"[]"
+    assert cache._path(PRICES_URL.format(key="SECRET")) == cache._path(PRICES_URL.format(key="OTHER"))
+
+
+def test_entries_expire_per_endpoint(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(response_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    cache.put(PRICES_URL.format(key="k"), b"prices")
+    cache.put(PROFILE_URL.format(key="k"), b"profile")
+
+    now[0] += 12 * 60 * 60  # Right on the prices TTL, still fresh
+    assert cache.get(PRICES_URL.format(key="k")) == b"prices"
+    now[0] += 1
+    assert cache.get(PRICES_URL.format(key="k")) is None
+    # Profiles keep for a week
+    assert cache.get(PROFILE_URL.format(key="k")) == b"profile"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    body = np.random.default_rng(0).bytes(1000)  # Incompressible, so each entry is ~1 KB on disk
+    cache = ResponseCache(cache_dir=str(tmp_path), max_bytes=3500)
+    urls = {symbol: PRICES_URL.replace("AAA", symbol).format(key="k") for symbol in ["AAA", "BBB", "CCC", "DDD"]}
+    for mtime, symbol in enumerate(["AAA", "BBB", "CCC"]):
+        cache.put(urls[symbol], body)
+        os.utime(cache._path(urls[symbol]), (mtime, mtime))
+
+    # Reading AAA makes it the most recently used, so BBB is the oldest when DDD pushes the cache over
+    assert cache.get(urls["AAA"]) == body
+    cache.put(urls["DDD"], body)
+
+    assert cache.get(urls["BBB"]) is None
+    assert all(cache.get(urls[symbol]) == body for symbol in ["AAA", "CCC", "DDD"])
+
+
+def test_offline_serves_stale_entries_and_never_fetches_misses(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(response_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    cache = ResponseCache(cache_dir=str(tmp_path), offline=True)
+    cache.put(PRICES_URL.format(key="k"), b"prices")
+    now[0] += 365 * 24 * 60 * 60
+    assert cache.get(PRICES_URL.format(key="k")) == b"prices"
+
+    gatherer = DataGatherer(api_key="k", symbols=["BBB"], rate_limit=60, data_handler=None, response_cache=cache)
+    # No session: going to the network would blow up rather than come back as a clean miss
+    symbol, frame = asyncio.run(
+        gatherer._fetch_data(None, "BBB", PRICES_URL.replace("AAA", "BBB").format(key="k"), bytes)
+    )
+    assert (symbol, frame) == ("BBB", None)
@@ -0,0 +1,57 @@
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from data.models.returns import ReturnsEngine
+
+
+def _stored_returns(data_store):
+    return data_store.scan_dataset("returns").collect().sort(["symbol", "date"])
+
+
+def _rebuilt_returns(engine, prices):
+    return engine.compute(prices).collect().sort(["symbol", "date"])
+
+
+def test_incremental_update_matches_rebuild(data_store, make_prices):
+    prices = make_prices(["AAA", "BBB"], days=400)
+    cutoff = prices["date"].unique().sort()[-10]
+    engine = ReturnsEngine(data_store)
+
+    data_store.write_dataset(prices.filter(pl.col("date") <= cutoff), "prices")
+    engine.build()
+    data_store.write_dataset(prices.filter(pl.col("date") > cutoff), "prices", mode="upsert")
+
+    assert engine.update() == 2 * 9
+    assert_frame_equal(_stored_returns(data_store), _rebuilt_returns(engine, prices))
+    assert engine.update() == 0
+
+
+def test_update_prices_full_history_of_new_symbol(data_store, make_prices):
+    # A symbol joining the universe arrives with its back history, not just the days since the last update
+    old = make_prices(["AAA"], days=518)
+    added = make_prices(["BBB"], days=523, seed=1)
+    engine = ReturnsEngine(data_store)
+
+    data_store.write_dataset(old, "prices")
+    engine.build()
+    data_store.write_dataset(added, "prices", mode="upsert")
+
+    assert engine.update() == 523
+    stored = _stored_returns(data_store)
+    assert stored.filter(pl.col("symbol") == "BBB").height == 523
+    assert_frame_equal(stored, _rebuilt_returns(engine, pl.concat([old, added])))
+
+
+def test_update_reprices_history_extended_backwards(data_store, make_prices):
+    prices = make_prices(["AAA", "BBB"], days=400)
+    first_dates = prices["date"].unique().sort()[:100]
+    engine = ReturnsEngine(data_store)
+
+    data_store.write_dataset(
+        prices.filter(~((pl.col("symbol") == "BBB") & pl.col("date").is_in(first_dates))), "prices"
+    )
+    engine.build()
+    data_store.write_dataset(prices, "prices", mode="upsert")
+
+    engine.update()
+    assert_frame_equal(_stored_returns(data_store), _rebuilt_returns(engine, prices))
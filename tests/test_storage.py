@@ -0,0 +1,135 @@
+import io
+import os
+from datetime import date
+
+import numpy as np
+import polars as pl
+import pytest
+from moto import mock_aws
+
+from data.models.general import DataStore
+from data.storage import S3Storage, local_etag
+
+BUCKET = "test-bucket"
+PART_SIZE = 5 * 1024**2  # The smallest part S3 (and moto) accept
+
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    for name, value in [
+        ("AWS_ACCESS_KEY_ID", "testing"),
+        ("AWS_SECRET_ACCESS_KEY", "testing"),
+        ("AWS_DEFAULT_REGION", "us-east-1"),
+    ]:
+        monkeypatch.setenv(name, value)
+    with mock_aws():
+        storage = S3Storage(BUCKET, prefix="store", multipart_chunksize=PART_SIZE)
+        storage.client.create_bucket(Bucket=BUCKET)
+        yield storage
+
+
+def _write_file(path, size, seed=0) -> bytes:
+    data = np.random.default_rng(seed).bytes(size)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return data
+
+
+def test_round_trip(s3_storage):
+    s3_storage.write_bytes("prices/AAA.parquet", b"aaa")
+    with s3_storage.open_output("prices/year=2020/BBB.parquet") as sink:
+        sink.write(b"bbb")
+
+    assert s3_storage.exists("prices/AAA.parquet")
+    assert not s3_storage.exists("prices/CCC.parquet")
+    assert s3_storage.open_input("prices/AAA.parquet").read() == b"aaa"
+    assert s3_storage.stat("prices/AAA.parquet")[0] == 3
+    assert s3_storage.list("prices", ".parquet") == ["prices/AAA.parquet"]
+    assert s3_storage.list_recursive("prices", ".parquet") == ["prices/AAA.parquet", "prices/year=2020/BBB.parquet"]
+    assert s3_storage.uri("prices/AAA.parquet") == f"s3://{BUCKET}/store/prices/AAA.parquet"
+
+    s3_storage.delete("prices/AAA.parquet")
+    assert s3_storage.list_recursive("prices") == ["prices/year=2020/BBB.parquet"]
+    s3_storage.delete_prefix("prices")
+    assert s3_storage.list_recursive("prices") == []
+
+
+def test_sync_skips_unchanged_and_reuploads_changed(s3_storage, tmp_path):
+    local_root = str(tmp_path)
+    _write_file(os.path.join(local_root, "prices", "small.parquet"), 1024)
+    big_path = os.path.join(local_root, "prices", "big.parquet")
+    _write_file(big_path, 2 * PART_SIZE + 1024)
+
+    pushed = s3_storage.sync_from_local(local_root, prefix="prices")
+    assert sorted(pushed) == ["prices/big.parquet", "prices/small.parquet"]
+    # Uploaded in three parts, and our local ETag predicts S3's
+    remote_etag = s3_storage.list_etags("prices")["prices/big.parquet"]
+    assert remote_etag.endswith("-3")
+    assert remote_etag == local_etag(big_path, PART_SIZE)
+
+    assert s3_storage.sync_from_local(local_root, prefix="prices") == []
+
+    _write_file(big_path, 2 * PART_SIZE + 1024, seed=1)
+    assert s3_storage.sync_from_local(local_root, prefix="prices") == ["prices/big.parquet"]
+
+
+def test_sync_falls_back_to_sha256_when_part_size_differs(s3_storage, tmp_path):
+    local_root = str(tmp_path)
+    _write_file(os.path.join(local_root, "prices", "big.parquet"), 2 * PART_SIZE + 1024)
+    s3_storage.sync_from_local(local_root, prefix="prices")
+
+    # Same bucket, different part size, so the multipart ETag can't be predicted and the sha256 decides
+    other = S3Storage(BUCKET, prefix="store", client=s3_storage.client, multipart_chunksize=PART_SIZE * 2)
+    assert other.sync_from_local(local_root, prefix="prices") == []
+
+
+def test_sync_to_local(s3_storage, tmp_path):
+    s3_storage.write_bytes("prices/AAA.parquet", b"aaa")
+    local_root = str(tmp_path)
+
+    assert s3_storage.sync_to_local(local_root, prefix="prices") == ["prices/AAA.parquet"]
+    with open(os.path.join(local_root, "prices", "AAA.parquet"), "rb") as f:
+        assert f.read() == b"aaa"
+    assert s3_storage.sync_to_local(local_root, prefix="prices") == []
+
+
+def test_ranged_file_reads(s3_storage):
+    data = np.random.default_rng(0).bytes(1024**2)
+    s3_storage.write_bytes("blob.bin", data)
+
+    ranged = s3_storage.open_ranged("blob.bin")
+    # The footer prefetch covers the tail, so reading it costs nothing more
+    requests = ranged.requests
+    ranged.seek(-100, io.SEEK_END)
+    assert ranged.read() == data[-100:]
+    assert ranged.requests == requests
+
+    ranged.seek(1000)
+    assert ranged.read(10) == data[1000:1010]
+    assert ranged.tell() == 1010
+    ranged.prefetch([(2000, 3000), (3100, 4000)])
+    requests = ranged.requests
+    ranged.seek(2500)
+    assert ranged.read(1000) == data[2500:3500]
+    assert ranged.requests == requests
+    assert ranged.bytes_fetched < len(data)
+
+
+def test_filtered_read_only_fetches_needed_row_groups(s3_storage, tmp_path, monkeypatch):
+    data_store = DataStore(base_location=str(tmp_path), storage=s3_storage, universe_provider=lambda: [])
+    data_store.dtype_policy.row_group_size = 256
+    dates = pl.date_range(date(2016, 1, 1), date(2020, 12, 31), eager=True)
+    frame = pl.DataFrame({"date": dates}).with_columns(
+        [pl.Series(f"S{i}", np.random.default_rng(i).normal(size=len(dates))) for i in range(50)]
+    )
+    data_store.write_parquet(frame, "core_data", "wide.parquet")
+
+    opened = []
+    open_ranged = s3_storage.open_ranged
+    monkeypatch.setattr(s3_storage, "open_ranged", lambda key: opened.append(open_ranged(key)) or opened[-1])
+    filtered = data_store.read_filtered("core_data", "wide.parquet", columns=["S1"], start_date=date(2020, 12, 1))
+
+    assert filtered.equals(frame.filter(pl.col("date") >= date(2020, 12, 1)).select("S1"))
+    # The footer plus two columns of the last row group, nowhere near the whole object
+    assert opened[0].bytes_fetched < opened[0].size / 5
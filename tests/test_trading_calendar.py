@@ -0,0 +1,49 @@
+from datetime import date, datetime
+
+import polars as pl
+from polars.testing import assert_frame_equal, assert_series_equal
+
+from data.models.trading_calendar import TradingCalendar
+
+# A week with the Wednesday holiday missing
+SESSIONS = [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 4), date(2024, 1, 5), date(2024, 1, 8)]
+
+
+def _dates(*days):
+    return pl.Series("filing_date", [date(2024, 1, day) if day else None for day in days], dtype=pl.Date)
+
+
+def test_next_session():
+    calendar = TradingCalendar(pl.Series(SESSIONS[::-1] + SESSIONS[:1]))
+    assert calendar.sessions.to_list() == SESSIONS
+
+    dates = _dates(1, 3, 6, 8, 9)
+    # Strictly after each date, nothing past the last session
+    assert_series_equal(calendar.next_session(dates), _dates(2, 4, 8, None, None))
+    # On a session stays put, off one moves up to the next
+    assert_series_equal(calendar.next_session(dates, inclusive=True), _dates(1, 4, 8, 8, None))
+
+
+def test_forward_fill_onto_the_session_grid():
+    calendar = TradingCalendar(pl.Series(SESSIONS))
+    filings = pl.DataFrame({"filing_date": _dates(3, 5), "eps": [1.0, 2.0], "shares": [10, None]})
+
+    # Snapped onto sessions first, the grid then starts at the first filing and fills down
+    snapped = filings.with_columns(calendar.next_session(filings["filing_date"], inclusive=True))
+    expected = pl.DataFrame({
+        "filing_date": _dates(4, 5, 8), "eps": [1.0, 2.0, 2.0], "shares": [10, 10, 10],
+    })
+    assert_frame_equal(calendar.forward_fill_onto(snapped, date_column="filing_date"), expected)
+
+    # Bounds clip the grid, datetimes included, and an earlier start leaves leading nulls
+    clipped = calendar.forward_fill_onto(
+        snapped, date_column="filing_date", start=datetime(2024, 1, 2), end=datetime(2024, 1, 5)
+    )
+    assert clipped["filing_date"].to_list() == [date(2024, 1, 2), date(2024, 1, 4), date(2024, 1, 5)]
+    assert clipped["eps"].to_list() == [None, 1.0, 2.0]
+
+    # Rows off the calendar are dropped by the join rather than snapped
+    assert calendar.forward_fill_onto(filings, date_column="filing_date")["eps"].to_list() == [None, 2.0, 2.0]
+
+    empty = filings.clear()
+    assert calendar.forward_fill_onto(empty, date_column="filing_date") is empty